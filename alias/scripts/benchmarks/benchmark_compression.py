@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""Measure the bytes and time saved by compressing the traffic between the
+agent process and the sandbox server.
+
+Opens every URL in the sandbox browser, then fetches its accessibility
+snapshot (`browser_snapshot`) with each content coding and writes it back
+with `write_file`, the two directions of a typical browsing step. Reports
+the median over `--repeat` rounds of the bytes on the wire and the wall
+time until the JSON payload is decoded. Time savings depend on the link,
+over loopback compression only adds its CPU time.
+
+The default pages are public websites, so the sandbox needs internet
+access; pass other URLs otherwise. zstd is measured only if `zstandard`
+is installed.
+
+With `--in-process`, no sandbox is needed: the compression middleware of
+the sandbox server runs in-process behind a FastAPI `TestClient`, which
+answers `read_file` with the content of local files (by default source
+files of this repository) and accepts `write_file`. The bytes are those
+on the wire, the time is the CPU cost of the compression alone.
+
+Usage:
+    python scripts/benchmarks/benchmark_compression.py [URL ...]
+    python scripts/benchmarks/benchmark_compression.py \
+        --url http://host:port/ --token TOKEN
+    python scripts/benchmarks/benchmark_compression.py --in-process [FILE ...]
+
+Without `--url` nor `--in-process`, a new sandbox is started.
+"""
+import argparse
+import gzip
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Callable
+
+from fastapi import Body, FastAPI
+from fastapi.testclient import TestClient
+
+from agentscope_runtime.sandbox.model import ContainerModel
+
+from alias.runtime.alias_sandbox import AliasSandbox, AliasSandboxHttpClient
+from alias.runtime.alias_sandbox.box.routers.compression_utils import (
+    CompressionMiddleware,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_URLS = [
+    "https://en.wikipedia.org/wiki/Python_(programming_language)",
+    "https://github.com/agentscope-ai/agentscope",
+    "https://news.ycombinator.com/",
+]
+_SRC_DIR = Path(__file__).resolve().parents[2] / "src" / "alias"
+DEFAULT_FILES = [
+    _SRC_DIR / "agent" / "tools" / "sandbox_util.py",
+    _SRC_DIR
+    / "runtime"
+    / "alias_sandbox"
+    / "box"
+    / "routers"
+    / "workspace.py",
+    _SRC_DIR.parents[1] / "README.md",
+]
+CODINGS = ["identity", "gzip"] + (["zstd"] if zstandard is not None else [])
+
+_DECODERS: dict[str, Callable[[bytes], bytes]] = {
+    "identity": lambda data: data,
+    "gzip": gzip.decompress,
+    "zstd": lambda data: zstandard.ZstdDecompressor()
+    .stream_reader(data)
+    .read(),
+}
+_ENCODERS: dict[str, Callable[[bytes], bytes]] = {
+    "identity": lambda data: data,
+    "gzip": lambda data: gzip.compress(data, compresslevel=5),
+    "zstd": lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+}
+
+
+def fetch(
+    client: AliasSandboxHttpClient,
+    coding: str,
+    payload: dict,
+) -> tuple[int, float, dict]:
+    """Call a tool asking for `coding`, return the response bytes on the
+    wire, the wall time and the decoded result."""
+    start = time.perf_counter()
+    response = client.session.post(
+        f"{client.base_url}/mcp/call_tool",
+        json=payload,
+        headers={"Accept-Encoding": coding},
+        stream=True,
+        timeout=client.timeout,
+    )
+    response.raise_for_status()
+    raw = response.raw.read(decode_content=False)
+    used = response.headers.get("Content-Encoding", "identity")
+    result = json.loads(_DECODERS[used](raw))
+    return len(raw), time.perf_counter() - start, result
+
+
+def send(
+    client: AliasSandboxHttpClient,
+    coding: str,
+    payload: dict,
+) -> tuple[int, float]:
+    """Call a tool with a request body encoded with `coding`, return the
+    request bytes on the wire and the wall time."""
+    start = time.perf_counter()
+    body = _ENCODERS[coding](json.dumps(payload).encode("utf-8"))
+    headers = {"Accept-Encoding": "identity"}
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    response = client.session.post(
+        f"{client.base_url}/mcp/call_tool",
+        data=body,
+        headers=headers,
+        timeout=client.timeout,
+    )
+    response.raise_for_status()
+    return len(body), time.perf_counter() - start
+
+
+def report(title: str, samples: dict[str, list[tuple[int, float]]]) -> None:
+    baseline_bytes = statistics.median(s[0] for s in samples["identity"])
+    baseline_time = statistics.median(s[1] for s in samples["identity"])
+    print(title)
+    for coding, values in samples.items():
+        size = statistics.median(s[0] for s in values)
+        seconds = statistics.median(s[1] for s in values)
+        print(
+            f"  {coding:<9} {size:>10.0f} B "
+            f"({size / baseline_bytes:6.1%})  "
+            f"{seconds * 1000:8.1f} ms "
+            f"({seconds - baseline_time:+.3f} s)",
+        )
+
+
+def run(client: AliasSandboxHttpClient, urls: list[str], repeat: int) -> None:
+    for url in urls:
+        client.call_tool("browser_navigate", {"url": url})
+        snapshot = {"tool_name": "browser_snapshot", "arguments": {}}
+
+        received = {coding: [] for coding in CODINGS}
+        text = ""
+        for _ in range(repeat):
+            for coding in CODINGS:
+                size, seconds, result = fetch(client, coding, snapshot)
+                received[coding].append((size, seconds))
+                text = result["content"][0]["text"]
+        report(f"{url}: browser_snapshot", received)
+
+        write = {
+            "tool_name": "write_file",
+            "arguments": {
+                "path": "/workspace/benchmark_snapshot.txt",
+                "content": text,
+            },
+        }
+        sent = {coding: [] for coding in CODINGS}
+        for _ in range(repeat):
+            for coding in CODINGS:
+                sent[coding].append(send(client, coding, write))
+        report(f"{url}: write_file ({len(text)} characters)", sent)
+
+
+def in_process_app(texts: dict[str, str]) -> FastAPI:
+    """An app answering `read_file` with `texts` by path, behind the
+    compression middleware of the sandbox server."""
+    app = FastAPI()
+
+    @app.post("/mcp/call_tool")
+    async def call_tool(payload: dict = Body(...)) -> dict:
+        path = payload["arguments"]["path"]
+        if payload["tool_name"] == "read_file":
+            text = texts[path]
+        else:
+            text = f"Successfully wrote to {path}"
+        return {"isError": False, "content": [{"type": "text", "text": text}]}
+
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+
+def fetch_in_process(
+    client: TestClient,
+    coding: str,
+    payload: dict,
+) -> tuple[int, float, dict]:
+    """`fetch` through a `TestClient`."""
+    start = time.perf_counter()
+    with client.stream(
+        "POST",
+        "/mcp/call_tool",
+        json=payload,
+        headers={"Accept-Encoding": coding},
+    ) as response:
+        response.raise_for_status()
+        raw = b"".join(response.iter_raw())
+        used = response.headers.get("Content-Encoding", "identity")
+    result = json.loads(_DECODERS[used](raw))
+    return len(raw), time.perf_counter() - start, result
+
+
+def send_in_process(
+    client: TestClient,
+    coding: str,
+    payload: dict,
+) -> tuple[int, float]:
+    """`send` through a `TestClient`."""
+    start = time.perf_counter()
+    body = _ENCODERS[coding](json.dumps(payload).encode("utf-8"))
+    headers = {"Accept-Encoding": "identity"}
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    response = client.post("/mcp/call_tool", content=body, headers=headers)
+    response.raise_for_status()
+    return len(body), time.perf_counter() - start
+
+
+def run_in_process(paths: list[str], repeat: int) -> None:
+    texts = {
+        str(path): Path(path).read_text(encoding="utf-8") for path in paths
+    }
+    with TestClient(in_process_app(texts)) as client:
+        for path, text in texts.items():
+            read = {"tool_name": "read_file", "arguments": {"path": path}}
+            received = {coding: [] for coding in CODINGS}
+            for _ in range(repeat):
+                for coding in CODINGS:
+                    size, seconds, result = fetch_in_process(
+                        client,
+                        coding,
+                        read,
+                    )
+                    assert result["content"][0]["text"] == text
+                    received[coding].append((size, seconds))
+            report(f"{path}: read_file", received)
+
+            write = {
+                "tool_name": "write_file",
+                "arguments": {"path": path, "content": text},
+            }
+            sent = {coding: [] for coding in CODINGS}
+            for _ in range(repeat):
+                for coding in CODINGS:
+                    sent[coding].append(send_in_process(client, coding, write))
+            report(f"{path}: write_file ({len(text)} characters)", sent)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the compression of sandbox traffic.",
+    )
+    parser.add_argument(
+        "urls",
+        nargs="*",
+        help="Pages to snapshot, or local files with `--in-process`",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--url",
+        help="URL of a running sandbox, a new one is started if not given",
+    )
+    parser.add_argument("--token", help="Runtime token of the sandbox")
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Benchmark the compression middleware without a sandbox",
+    )
+    args = parser.parse_args()
+
+    if args.in_process:
+        run_in_process(args.urls or DEFAULT_FILES, args.repeat)
+        return
+    urls = args.urls or DEFAULT_URLS
+
+    if args.url:
+        model = ContainerModel(
+            session_id="benchmark",
+            container_id="benchmark",
+            container_name="benchmark",
+            url=args.url,
+            ports=[],
+            runtime_token=args.token,
+        )
+        run(AliasSandboxHttpClient(model), urls, args.repeat)
+        return
+
+    with AliasSandbox() as sandbox:
+        run(sandbox.http_client, urls, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
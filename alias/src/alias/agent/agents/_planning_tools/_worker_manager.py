@@ -18,6 +18,7 @@ from agentscope.formatter import FormatterBase, DashScopeChatFormatter
 
 from alias.runtime.alias_sandbox import AliasSandbox
 from alias.agent.tools import AliasToolkit
+from alias.agent.tools.sandbox_util import aworkspace_path_exists
 from alias.agent.agents._react_worker import ReActWorker
 from alias.agent.agents._browser_agent import BrowserAgent
 from alias.agent.utils.constants import (
@@ -80,6 +81,7 @@ def rebuild_reactworker(
         if tool_name not in exclude_tools
     ]
     share_tools(old_toolkit, new_toolkit, tool_list)
+    new_toolkit.bind_kernel_session(worker_info.worker_name)
     model = (
         model
         if model
@@ -103,11 +105,15 @@ def rebuild_reactworker(
 
 async def check_file_existence(file_path: str, toolkit: AliasToolkit) -> bool:
     """
-    Check if a file exists using the read_file tool from the provided toolkit.
+    Check if a file exists in the sandbox of the provided toolkit.
 
-    This function attempts to verify file existence by calling the read_file
-    tool and checking the response for error indicators. It requires the
-    toolkit to have a 'read_file' tool available.
+    Workspace paths of sandboxes with direct access are looked up in the
+    workspace cache of the sandbox, so that checking the files of a
+    directory costs one listing, plus one for every file that the cached
+    listing does not show.
+    Other paths are checked by calling the read_file tool and checking
+    the response for error indicators, which requires the toolkit to have
+    a 'read_file' tool available.
 
     Args:
         file_path (str): The path to the file to check for existence.
@@ -122,6 +128,26 @@ async def check_file_existence(file_path: str, toolkit: AliasToolkit) -> bool:
         - Uses error message detection ("no such file or directory") to
             determine existence
     """
+    if (
+        isinstance(toolkit.sandbox, AliasSandbox)
+        and Path(file_path).is_relative_to("/workspace")
+        and await toolkit.sandbox.ahas_direct_access()
+    ):
+        try:
+            if await aworkspace_path_exists(toolkit.sandbox, file_path):
+                return True
+            # The listing may predate the file, check the sandbox again
+            # before dropping it
+            toolkit.sandbox.workspace_cache.invalidate(
+                os.path.dirname(os.path.normpath(file_path)),
+                recursive=False,
+            )
+            return await aworkspace_path_exists(toolkit.sandbox, file_path)
+        except Exception as e:
+            logger.warning(
+                f"Cannot look up {file_path} in the workspace: {e}",
+            )
+
     # Get read_file tool from AliasToolkit
     if "read_file" in toolkit.tools:
         read_toolkit = toolkit
@@ -439,6 +465,7 @@ class WorkerManager(StateModule):
                 "run_shell_command",
             ],
         )
+        worker_toolkit.bind_kernel_session(worker_name)
 
         with open(
             Path(__file__).parent.parent
@@ -595,7 +622,9 @@ class WorkerManager(StateModule):
                 self.worker_pool[selected_worker_name][0],
             )
             # double-check to ensure the generated files exists
-            for filepath, desc in worker_response.generated_files.items():
+            for filepath, desc in list(
+                worker_response.generated_files.items(),
+            ):
                 if await check_file_existence(
                     filepath,
                     self.worker_full_toolkit,
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=R1724
 import asyncio
-from typing import Any, Callable, Optional
+import dataclasses
+import inspect
+from typing import Any, AsyncGenerator, Callable, Optional
 
 from loguru import logger
 
@@ -14,12 +16,24 @@ from alias.agent.tools.toolkit_hooks import (
 )
 from alias.agent.tools.improved_tools import ImprovedFileOperations
 from alias.agent.tools.tool_blacklist import TOOL_BLACKLIST
+from alias.agent.tools.tool_result_cache import (
+    CACHEABLE_TOOLS,
+    ToolResultCache,
+    shared_tool_result_cache,
+)
+from alias.agent.utils.constants import LONG_TEXT_BUDGET, TOOL_CALL_TIMEOUT
 from alias.agent.tools.toolkit_hooks import read_file_post_hook
 from alias.runtime.alias_sandbox.alias_sandbox import AliasSandbox
 
 
 FilesystemSandbox = AliasSandbox
 
+# Extra seconds given to tools that take their own `timeout` argument,
+# for the round trip and the output to come back
+_TOOL_TIMEOUT_GRACE = 30
+# Tools that may change the workspace however they were registered
+_WORKSPACE_CHANGING_TOOLS = {"run_shell_command", "run_ipython_cell"}
+
 
 class AliasToolkit(Toolkit):
     def __init__(  # pylint: disable=W0102
@@ -28,7 +42,19 @@ class AliasToolkit(Toolkit):
         add_all: bool = False,
         is_browser_toolkit: bool = False,
         tool_blacklist: list = TOOL_BLACKLIST,
+        tool_timeouts: Optional[dict[str, float]] = None,
+        result_cache: Optional[ToolResultCache] = None,
     ):
+        """
+        Args:
+            tool_timeouts (Optional[dict[str, float]]): Seconds to wait for
+                the sandbox tools by name, `TOOL_CALL_TIMEOUT` for the
+                others.
+            result_cache (Optional[ToolResultCache]): Cache of the results
+                of read-only tools. By default, the cache shared by all
+                the toolkits of the sandbox, created on the first call to
+                a cacheable tool if the sandbox has direct access.
+        """
         super().__init__()
         if sandbox is not None:
             self.sandbox = sandbox
@@ -39,6 +65,8 @@ class AliasToolkit(Toolkit):
             self.session_id = None
         self.categorized_functions = {}
         self.tool_blacklist = tool_blacklist
+        self.tool_timeouts = tool_timeouts or {}
+        self.result_cache = result_cache
 
         if add_all:
             # Get tools
@@ -57,6 +85,9 @@ class AliasToolkit(Toolkit):
             self.register_tool_function(
                 file_sys.read_file,
             )
+            self.register_tool_function(
+                file_sys.search_file_contents,
+            )
         self.additional_mcp_clients = []
 
         self.long_text_post_hook = LongTextPostHook(sandbox)
@@ -70,12 +101,24 @@ class AliasToolkit(Toolkit):
         tool_name = json_schema["name"]
 
         def wrap_tool_func(name: str) -> Callable:
-            def wrapper(**kwargs) -> ToolResponse:
+            # Async, so that the tool calls of a reply that are gathered
+            # run concurrently over the pooled connections of the sandbox.
+            # Cancelling the call closes its connection.
+            async def wrapper(**kwargs) -> ToolResponse:
+                timeout = self.tool_timeouts.get(name, TOOL_CALL_TIMEOUT)
+                if isinstance(kwargs.get("timeout"), (int, float)):
+                    timeout = max(
+                        timeout,
+                        kwargs["timeout"] + _TOOL_TIMEOUT_GRACE,
+                    )
                 try:
-                    # Call the sandbox tool with the extracted arguments
-                    result = self.sandbox.call_tool(
+                    # Call the sandbox tool with the extracted arguments,
+                    # results too long for the model stay in the sandbox
+                    result = await self.sandbox.acall_tool(
                         name=name,
                         arguments=kwargs,
+                        spill_threshold=LONG_TEXT_BUDGET,
+                        timeout=timeout,
                     )
                     # Convert the result to ToolResponse format
                     if isinstance(result, dict) and "content" in result:
@@ -105,7 +148,13 @@ class AliasToolkit(Toolkit):
                         ]
 
                     return ToolResponse(
-                        metadata={"success": True, "tool_name": name},
+                        metadata={
+                            "success": not (
+                                isinstance(result, dict)
+                                and result.get("isError", False)
+                            ),
+                            "tool_name": name,
+                        },
                         content=content,
                     )
 
@@ -126,6 +175,8 @@ class AliasToolkit(Toolkit):
                     )
 
             wrapper.__name__ = name
+            # Unless it is read-only, a call may have changed the workspace
+            wrapper.changes_workspace = True
             return wrapper
 
         tool_func = wrap_tool_func(tool_name)
@@ -135,6 +186,72 @@ class AliasToolkit(Toolkit):
             json_schema=json_schema.get("json_schema", {}),
         )
 
+    async def call_tool_function(
+        self,
+        tool_call: ToolUseBlock,
+    ) -> AsyncGenerator[ToolResponse, None]:
+        """Call a tool like `Toolkit.call_tool_function`, reusing the
+        cached result of the same call to a read-only tool."""
+        name = tool_call["name"]
+        tool_func = self.tools.get(name)
+        cache = None
+        if tool_func is not None:
+            cache = await self._get_result_cache(name)
+        if cache is None:
+            return await super().call_tool_function(tool_call)
+
+        if not cache.is_cacheable(name):
+            responses = await super().call_tool_function(tool_call)
+            if name in _WORKSPACE_CHANGING_TOOLS or getattr(
+                tool_func.original_func,
+                "changes_workspace",
+                False,
+            ):
+                return _invalidate_after(responses, cache)
+            return responses
+
+        arguments = _call_arguments(tool_func, tool_call)
+        response = cache.get(name, arguments)
+        if response is not None:
+            return _yield(response)
+        generation = cache.generation
+        responses = await super().call_tool_function(tool_call)
+        return _cache_last(responses, cache, name, arguments, generation)
+
+    async def _get_result_cache(
+        self,
+        name: str,
+    ) -> Optional[ToolResultCache]:
+        if self.result_cache is not None or self.sandbox is None:
+            return self.result_cache
+        if name not in CACHEABLE_TOOLS:
+            # Another toolkit of the sandbox may have cached results
+            return shared_tool_result_cache(self.sandbox, create=False)
+        # Path-keyed results need the workspace events, which cannot be
+        # followed without direct access
+        if not await self.sandbox.ahas_direct_access():
+            return None
+        self.result_cache = await asyncio.to_thread(
+            shared_tool_result_cache,
+            self.sandbox,
+        )
+        return self.result_cache
+
+    def bind_kernel_session(self, session_id: str) -> None:
+        """
+        Run the `run_ipython_cell` calls of this toolkit in an IPython
+        kernel of their own, so that agents sharing the sandbox do not
+        share variables or interleave their output.
+        """
+        tool = self.tools.get("run_ipython_cell")
+        if tool is None:
+            return
+        # Copy the shared registration so other toolkits are not affected
+        self.tools["run_ipython_cell"] = dataclasses.replace(
+            tool,
+            preset_kwargs={**tool.preset_kwargs, "session_id": session_id},
+        )
+
     def _add_tool_postprocessing_func(self) -> None:
         long_text_hook = LongTextPostHook(self.sandbox)
         for tool_func, _ in self.tools.items():
@@ -182,6 +299,55 @@ class AliasToolkit(Toolkit):
                 await client.close()
 
 
+def _call_arguments(tool_func: Any, tool_call: ToolUseBlock) -> dict:
+    """The arguments of a tool call, with the defaults of the function."""
+    kwargs = {
+        **tool_func.preset_kwargs,
+        **(tool_call.get("input", {}) or {}),
+    }
+    try:
+        signature = inspect.signature(tool_func.original_func)
+        if any(p.kind == p.VAR_KEYWORD for p in signature.parameters.values()):
+            return kwargs
+        bound = signature.bind(**kwargs)
+    except (TypeError, ValueError):
+        return kwargs
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+async def _yield(response: ToolResponse) -> AsyncGenerator[ToolResponse, None]:
+    yield response
+
+
+async def _invalidate_after(
+    responses: AsyncGenerator[ToolResponse, None],
+    cache: ToolResultCache,
+) -> AsyncGenerator[ToolResponse, None]:
+    try:
+        async for response in responses:
+            yield response
+    finally:
+        # The tool runs while its responses are consumed. Do not wait for
+        # the events of its changes, the next call may read them right
+        # away, and reads that started meanwhile are not stored.
+        cache.invalidate()
+
+
+async def _cache_last(
+    responses: AsyncGenerator[ToolResponse, None],
+    cache: ToolResultCache,
+    name: str,
+    arguments: dict,
+    generation: int,
+) -> AsyncGenerator[ToolResponse, None]:
+    response = None
+    async for response in responses:
+        yield response
+    if response is not None:
+        cache.put(name, arguments, response, generation)
+
+
 async def test_toolkit():
     with FilesystemSandbox() as sandbox:
         toolkit = AliasToolkit(sandbox)
@@ -111,17 +111,38 @@ class ImprovedFileOperations:
 
             file_extension = os.path.splitext(file_path)[1].lower()
             if file_extension in TEXT_EXTENSIONS:
-                # First, read the entire file using the original read_file tool
+                # Only transfer the requested lines, located by the line
+                # index the sandbox keeps for the file, if it can be
+                # reached directly
+                if await self.sandbox.ahas_direct_access():
+                    client = self.sandbox.async_http_client
+                    lines_res = await client.read_workspace_file_lines(
+                        file_path,
+                        offset=offset or 0,
+                        limit=limit,
+                    )
+                    if not lines_res.get("isError", False):
+                        return _lines_tool_response(
+                            file_path,
+                            lines_res,
+                            whole_file=offset is None and limit is None,
+                        )
+
+                # Otherwise (e.g. outside /workspace), read the entire file
+                # using the original read_file tool
                 params = {
                     "path": file_path,
                 }
                 # Call the original read_file tool
-                tool_res = self.sandbox.call_tool(
+                tool_res = await self.sandbox.acall_tool(
                     name="read_file",
                     arguments=params,
                 )
             elif file_extension in TO_MARKDOWN_SUPPORT_MAPPING:
-                tool_res = _transfer_to_markdown_text(file_path, self.sandbox)
+                tool_res = await _transfer_to_markdown_text(
+                    file_path,
+                    self.sandbox,
+                )
             else:
                 tool_res = {}
 
@@ -177,8 +198,8 @@ class ImprovedFileOperations:
             start_line = offset or 0  # 0-based index
             end_line = start_line + (limit or total_lines)
 
-            # Validate range
-            if start_line >= total_lines:
+            # Validate range, an empty file can be read from its start
+            if start_line >= total_lines and start_line > 0:
                 return ToolResponse(
                     metadata={"success": False, "error": "Invalid range"},
                     content=[
@@ -262,8 +283,166 @@ class ImprovedFileOperations:
                 ],
             )
 
+    async def search_file_contents(
+        self,
+        pattern: str,
+        path: str = "/workspace",
+        regex: bool = False,
+        ignore_case: bool = False,
+        context_lines: int = 0,
+        include: Optional[list[str]] = None,
+        max_results: int = 100,
+    ) -> ToolResponse:
+        """
+        Search the content of the files under a path for a text or regular
+        expression, like `grep -rn`, without reading the files. Binary
+        files are skipped. Prefer this over reading whole files to locate
+        information in large files.
+
+        Args:
+            pattern (str): The text (or regular expression) to search for.
+            path (str, optional):
+                The file or directory to search in. Default is /workspace.
+            regex (bool, optional):
+                Whether `pattern` is a regular expression. Default is False.
+            ignore_case (bool, optional):
+                Whether to ignore case. Default is False.
+            context_lines (int, optional):
+                The number of lines to show before and after each match.
+                Default is 0.
+            include (list[str], optional):
+                Only search files matching one of these globs,
+                e.g. ["*.py", "*.md"].
+            max_results (int, optional):
+                The maximum number of matches to return. Default is 100.
+
+        Returns:
+            ToolResponse:
+                The matching lines as `path:line_number:line`, context lines
+                as `path-line_number-line`.
+        """
+        try:
+            lines, stats = [], {}
+            client = self.sandbox.async_http_client
+            async for item in client.iter_search_workspace(
+                pattern,
+                paths=[path],
+                regex=regex,
+                ignore_case=ignore_case,
+                context=context_lines,
+                include=include,
+                max_matches=max_results,
+            ):
+                if item["type"] == "end":
+                    stats = item
+                    continue
+                if context_lines and lines:
+                    lines.append("--")
+                first = item["line_number"] - len(item["before"])
+                for i, line in enumerate(item["before"]):
+                    lines.append(f"{item['path']}-{first + i}-{line}")
+                lines.append(
+                    f"{item['path']}:{item['line_number']}:{item['line']}",
+                )
+                for i, line in enumerate(item["after"], start=1):
+                    lines.append(
+                        f"{item['path']}-{item['line_number'] + i}-{line}",
+                    )
+
+            summary = (
+                f"Found {stats.get('matches', 0)} matches in "
+                f"{stats.get('files_matched', 0)} files "
+                f"({stats.get('files_searched', 0)} files searched)."
+            )
+            if stats.get("truncated"):
+                summary += (
+                    " Results were truncated, narrow down the search or "
+                    "increase `max_results`."
+                )
+            return ToolResponse(
+                metadata={"success": True, **stats},
+                content=[
+                    TextBlock(
+                        type="text",
+                        text="\n".join(lines) or "No matches.",
+                    ),
+                    TextBlock(
+                        type="text",
+                        text=summary,
+                    ),
+                ],
+            )
+        except Exception as e:
+            logger.error(f"Error searching {path}: {str(e)}")
+            return ToolResponse(
+                metadata={"success": False, "error": str(e)},
+                content=[
+                    TextBlock(
+                        type="text",
+                        text=f"Error searching '{path}': {str(e)}",
+                    ),
+                ],
+            )
+
+
+def _lines_tool_response(
+    file_path: str,
+    lines_res: dict,
+    whole_file: bool = False,
+) -> ToolResponse:
+    total_lines = lines_res["total_lines"]
+    if whole_file:
+        return ToolResponse(
+            metadata={"success": True, "total_lines": total_lines},
+            content=[
+                TextBlock(
+                    type="text",
+                    text=lines_res["content"],
+                ),
+            ],
+        )
+
+    start_line = lines_res["offset"]
+    # Reading an empty file from its start is an empty read, not an error
+    if start_line >= total_lines and start_line > 0:
+        return ToolResponse(
+            metadata={"success": False, "error": "Invalid range"},
+            content=[
+                TextBlock(
+                    type="text",
+                    text=f"Error: Start line {start_line} is "
+                    f"beyond file length ({total_lines} lines).",
+                ),
+            ],
+        )
 
-def _transfer_to_markdown_text(
+    end_line = start_line + lines_res["lines_read"]
+    summary = (
+        f"Read lines {start_line}-{end_line} of "
+        f"{total_lines} total lines from '{file_path}'"
+    )
+    return ToolResponse(
+        metadata={
+            "success": True,
+            "total_lines": total_lines,
+            "start_line": start_line + 1,
+            "end_line": end_line,
+            "lines_read": lines_res["lines_read"],
+        },
+        content=[
+            TextBlock(
+                type="text",
+                text=lines_res["content"],
+            ),
+            TextBlock(
+                type="text",
+                text=summary,
+            ),
+        ],
+    )
+
+
+async def _transfer_to_markdown_text(
     file_path: str,
     sandbox: AliasSandbox = None,
 ) -> dict:
@@ -285,7 +464,7 @@ def _transfer_to_markdown_text(
         "uri": "file:" + file_path,
     }
     try:
-        result = sandbox.call_tool(  # pylint: disable=W0621
+        result = await sandbox.acall_tool(  # pylint: disable=W0621
             name="convert_to_markdown",
             arguments=params,
         )
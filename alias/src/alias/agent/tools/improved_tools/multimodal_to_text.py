@@ -1,33 +1,38 @@
 # -*- coding: utf-8 -*-
-from io import BytesIO
 import os
-import base64
 import tempfile
-import requests
 import dashscope
 from agentscope.tool import ToolResponse
 from agentscope.message import TextBlock
 
 from alias.agent.tools.sandbox_util import (
-    get_workspace_file,
+    download_workspace_file,
     download_workspace_file_from_oss,
 )
 from alias.runtime.alias_sandbox import AliasSandbox
 
+# Larger workspace files are not fetched for the multi-modal models
+MAX_MEDIA_FILE_BYTES = 100 * 1024 * 1024
 
-def _get_binary_buffer(
-    sandbox: AliasSandbox,
-    audio_file_url: str,
-):
-    if audio_file_url.startswith(("http://", "https://")):
-        response = requests.get(audio_file_url)
-        response.raise_for_status()
-        audio_buffer = BytesIO(response.content)
-    else:
-        audio_buffer = BytesIO(
-            base64.b64decode(get_workspace_file(sandbox, audio_file_url)),
-        )
-    return audio_buffer
+
+def _download_to_temp_file(sandbox: AliasSandbox, file_path: str) -> str:
+    """Stream a workspace file into a local temporary file, return its
+    path. The caller deletes it."""
+    with tempfile.NamedTemporaryFile(
+        delete=False,
+        suffix=os.path.splitext(file_path)[1],
+    ) as temp_file:
+        temp_path = temp_file.name
+    download_result = download_workspace_file(
+        sandbox,
+        file_path,
+        temp_path,
+        max_bytes=MAX_MEDIA_FILE_BYTES,
+    )
+    if download_result.get("isError", False):
+        os.unlink(temp_path)
+        raise RuntimeError(download_result["content"][0]["text"])
+    return temp_path
 
 
 class DashScopeMultiModalTools:
@@ -76,19 +81,11 @@ class DashScopeMultiModalTools:
                 audio_source = audio_file_url
             else:
                 # For local files, save to a temporary file
-                audio_buffer = _get_binary_buffer(
-                    sandbox=self.sandbox,
-                    audio_file_url=audio_file_url,
+                audio_source = _download_to_temp_file(
+                    self.sandbox,
+                    audio_file_url,
                 )
 
-                # Create a temporary file
-                with tempfile.NamedTemporaryFile(
-                    delete=False,
-                    suffix=os.path.splitext(audio_file_url)[1],
-                ) as temp_file:
-                    temp_file.write(audio_buffer.getvalue())
-                    audio_source = temp_file.name
-
             messages = [
                 {
                     "role": "system",
@@ -189,18 +186,7 @@ class DashScopeMultiModalTools:
             image_source = image_url
         else:
             # For local files, save to a temporary file
-            image_buffer = _get_binary_buffer(
-                self.sandbox,
-                image_url,
-            )
-
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(
-                delete=False,
-                suffix=".mp3",
-            ) as temp_file:
-                temp_file.write(image_buffer.getvalue())
-                image_source = temp_file.name
+            image_source = _download_to_temp_file(self.sandbox, image_url)
 
         contents = []
         # Convert image paths according to the model requirements
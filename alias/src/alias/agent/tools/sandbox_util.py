@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import base64
-import io
+import fnmatch
+import hashlib
 import json
 import os
+import shlex
 import tarfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional
 
+import requests
 from loguru import logger
 
 from agentscope_runtime.common.container_clients.docker_client import (  # noqa: E501  # pylint: disable=C0301
@@ -65,6 +71,11 @@ TEXT_EXTENSIONS = {
     ".rtf",
 }
 
+# Records what `download_complete_workspace` saved, to skip it next time
+WORKSPACE_MANIFEST = ".workspace_manifest.json"
+DOWNLOAD_WORKERS = 8
+_HASH_CHUNK_SIZE = 1024 * 1024
+
 
 def _valid_workspace_path(workspace_path: str) -> bool:
     try:
@@ -79,6 +90,18 @@ def _valid_workspace_path(workspace_path: str) -> bool:
         return False
 
 
+def _invalid_path(argument: str) -> dict:
+    return {
+        "isError": True,
+        "content": [
+            {
+                "type": "text",
+                "text": f"`{argument}` must be under `/workspace`",
+            },
+        ],
+    }
+
+
 def list_workspace_directories(
     sandbox: AliasSandbox,
     directory: str = "/workspace",
@@ -106,10 +129,30 @@ def list_workspace_directories(
             ],
         }
 
+    if not sandbox.has_direct_access:
+        return _list_via_tools(sandbox, directory, recursive)
+
+    try:
+        # Listed page by page by the sandbox, instead of building the whole
+        # tree with the MCP `directory_tree` tool, and kept until changed
+        return sandbox.workspace_cache.list_directory(directory, recursive)
+    except (requests.exceptions.RequestException, FileNotFoundError) as e:
+        return {
+            "isError": True,
+            "content": [{"type": "text", "text": str(e)}],
+        }
+
+
+def _list_via_tools(
+    sandbox: AliasSandbox,
+    directory: str,
+    recursive: bool,
+) -> dict:
+    # The sandbox cannot be reached directly, list it with the MCP tools
+    # through the manager
     result = {"files": [], "directories": []}
 
     def process_item(item, current_base):
-        print(current_base, item["name"])
         current_path = (
             os.path.join(current_base, item["name"])
             if current_base
@@ -129,6 +172,8 @@ def list_workspace_directories(
             "directory_tree",
             arguments={"path": directory},
         )
+        if not _succeeded(tool_result):
+            return tool_result
         directory_tree = json.loads(tool_result["content"][0]["text"])
         for item in directory_tree:
             process_item(item, directory)
@@ -137,8 +182,9 @@ def list_workspace_directories(
             "list_directory",
             arguments={"path": directory},
         )
+        if not _succeeded(tool_result):
+            return tool_result
         list_content = tool_result["content"][0]["text"]
-        print(list_content)
         sub_dir_items = [
             item.strip() for item in list_content.split("\n") if item.strip()
         ]
@@ -152,10 +198,32 @@ def list_workspace_directories(
     return result
 
 
+def workspace_path_exists(sandbox: AliasSandbox, path: str) -> bool:
+    """
+    Whether a file or directory exists within /workspace. Answered from
+    the workspace cache of the sandbox once its directory was listed.
+    """
+    if not _valid_workspace_path(path):
+        return False
+    if not sandbox.has_direct_access:
+        path = os.path.normpath(path)
+        if path == "/workspace":
+            return True
+        listing = _list_via_tools(sandbox, os.path.dirname(path), False)
+        if not _succeeded(listing):
+            return False
+        return path in listing["files"] or path in listing["directories"]
+    return sandbox.workspace_cache.exists(path)
+
+
+def _succeeded(result: dict) -> bool:
+    return isinstance(result, dict) and not result.get("isError", False)
+
+
 def get_workspace_file(
     sandbox: AliasSandbox,
     file_path: str,
-) -> bytes:
+) -> str:
     """
     Get the content of the specified file within the /workspace.
 
@@ -169,12 +237,213 @@ def get_workspace_file(
     if not _valid_workspace_path(file_path):
         return base64.b64encode(
             "`file_path` must be under `/workspace`".encode(),
-        )
+        ).decode()
+    try:
+        content = get_workspace_file_bytes(sandbox, file_path)
+    except RuntimeError as e:
+        return base64.b64encode(str(e).encode()).decode()
+    return base64.b64encode(content).decode()
+
+
+def get_workspace_file_bytes(
+    sandbox: AliasSandbox,
+    file_path: str,
+    max_bytes: Optional[int] = None,
+) -> bytes:
+    """
+    Get the raw content of the specified file within the /workspace.
+
+    Args:
+        sandbox (AliasSandbox): sandbox to extract
+        file_path (str): The file path to get the content of.
+        max_bytes (Optional[int]): Refuse files larger than this.
+
+    Returns:
+        The raw content of the file.
+
+    Raises:
+        ValueError: If the file is not under /workspace.
+        RuntimeError: If the file cannot be fetched, e.g. it does not
+            exist or is larger than `max_bytes`.
+    """
+    if not _valid_workspace_path(file_path):
+        raise ValueError("`file_path` must be under `/workspace`")
+    if not sandbox.has_direct_access:
+        return _read_via_tools(sandbox, file_path, max_bytes)
+    content = sandbox.http_client.download_workspace_file(
+        file_path,
+        max_bytes=max_bytes,
+    )
+    if isinstance(content, dict):
+        raise RuntimeError(content["content"][0]["text"])
+    return content
+
+
+def _read_via_tools(
+    sandbox: AliasSandbox,
+    file_path: str,
+    max_bytes: Optional[int] = None,
+) -> bytes:
+    # The sandbox cannot be reached directly, read the file base64 encoded
+    # by a shell command through the manager. Without line breaks, the
+    # encoded content is the first line of the output.
+    quoted_path = shlex.quote(file_path)
+    if max_bytes is None:
+        command = f"base64 -w 0 -- {quoted_path}"
+    else:
+        command = f"head -c {max_bytes + 1} -- {quoted_path} | base64 -w 0"
     tool_result = sandbox.call_tool(
         "run_shell_command",
-        arguments={"command": f"base64 -i {file_path}"},
+        arguments={"command": command},
+    )
+    if not _succeeded(tool_result):
+        raise RuntimeError(
+            "\n".join(
+                item.get("text", "") for item in tool_result.get("content", [])
+            ).strip(),
+        )
+    content = base64.b64decode(
+        tool_result["content"][0]["text"].split("\n", 1)[0],
     )
-    return tool_result["content"][0]["text"]
+    if max_bytes is not None and len(content) > max_bytes:
+        raise RuntimeError(
+            f"{file_path} is larger than {max_bytes} bytes",
+        )
+    return content
+
+
+def download_workspace_file(
+    sandbox: AliasSandbox,
+    file_path: str,
+    local_path: str,
+    max_bytes: Optional[int] = None,
+) -> dict:
+    """
+    Stream a file within /workspace into a local file, without holding
+    it in memory.
+
+    Args:
+        sandbox (AliasSandbox): sandbox to download from
+        file_path (str): The file to download.
+        local_path (str): Local path the file is written to.
+        max_bytes (Optional[int]): Refuse files larger than this.
+    """
+    if not _valid_workspace_path(file_path):
+        return {
+            "isError": True,
+            "content": [
+                {
+                    "type": "text",
+                    "text": "`file_path` must be under `/workspace`",
+                },
+            ],
+        }
+    if sandbox.has_direct_access:
+        size = sandbox.http_client.download_workspace_file(
+            file_path,
+            target=local_path,
+            max_bytes=max_bytes,
+        )
+        if isinstance(size, dict):
+            return size
+    else:
+        try:
+            content = _read_via_tools(sandbox, file_path, max_bytes)
+        except RuntimeError as e:
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+        with open(local_path, "wb") as f:
+            f.write(content)
+        size = len(content)
+    return {
+        "isError": False,
+        "content": [
+            {
+                "type": "text",
+                "text": f"Downloaded {size} bytes to {local_path}",
+            },
+        ],
+    }
+
+
+def batch_call_tools(
+    sandbox: AliasSandbox,
+    calls: list[dict],
+    stop_on_error: bool = False,
+) -> list[dict]:
+    """
+    Call several sandbox tools in a single round trip.
+
+    Args:
+        sandbox (AliasSandbox): sandbox to call the tools of
+        calls (list[dict]): Calls with the tool `name`, its `arguments`,
+            an optional `id` and optional `depends_on`, the ids or indices
+            of earlier calls to wait for. Calls without pending
+            dependencies run concurrently.
+        stop_on_error (bool): Skip the calls not started yet once a call
+            failed.
+
+    Returns:
+        list[dict]: The results, in the order of `calls`.
+    """
+    if not sandbox.has_direct_access:
+        return _call_tools_sequentially(sandbox, calls, stop_on_error)
+    batch_result = sandbox.http_client.call_tools(
+        calls,
+        stop_on_error=stop_on_error,
+    )
+    if batch_result.get("isError", False):
+        return [batch_result for _ in calls]
+    return batch_result["results"]
+
+
+def _skipped(text: str) -> dict:
+    return {
+        "isError": True,
+        "content": [{"type": "text", "text": text}],
+        "skipped": True,
+    }
+
+
+def _call_tools_sequentially(
+    sandbox: AliasSandbox,
+    calls: list[dict],
+    stop_on_error: bool,
+) -> list[dict]:
+    # The sandbox cannot be reached directly, call the tools one after the
+    # other through the manager, skipping calls like the batch does
+    results = []
+    positions = {}
+    failed = False
+    for i, call in enumerate(calls):
+        result = None
+        for ref in call.get("depends_on") or []:
+            index = positions.get(str(ref))
+            if index is None:
+                result = _skipped(
+                    f"Skipped, `{ref}` is not an earlier call of the batch.",
+                )
+            elif not _succeeded(results[index]):
+                result = _skipped(
+                    f"Skipped, the call {index} it depends on failed.",
+                )
+            if result is not None:
+                break
+        if result is None and stop_on_error and failed:
+            result = _skipped("Skipped, an earlier call failed.")
+        if result is None:
+            result = sandbox.call_tool(
+                call["name"],
+                arguments=call.get("arguments") or {},
+            )
+            failed = failed or not _succeeded(result)
+        results.append(result)
+        positions[str(i)] = i
+        if call.get("id") is not None:
+            positions[str(call["id"])] = i
+    return results
 
 
 def create_or_edit_workspace_file(
@@ -192,14 +461,15 @@ def create_or_edit_workspace_file(
                 },
             ],
         }
-    sandbox.call_tool(
-        "run_shell_command",
-        arguments={"command": f"touch {file_path}"},
-    )
     fill_result = sandbox.call_tool(
         "write_file",
         arguments={"path": file_path, "content": content},
     )
+    if _succeeded(fill_result):
+        sandbox.workspace_cache.record_write(
+            file_path,
+            len(content.encode("utf-8")),
+        )
     return fill_result
 
 
@@ -224,6 +494,8 @@ def create_workspace_directory(
         "run_shell_command",
         arguments={"command": f"mkdir -p {directory_path}"},
     )
+    if _succeeded(tool_result):
+        sandbox.workspace_cache.record_mkdir(directory_path)
     return tool_result
 
 
@@ -248,6 +520,8 @@ def delete_workspace_file(
         "run_shell_command",
         arguments={"command": f"rm -rf {file_path}"},
     )
+    if _succeeded(tool_result):
+        sandbox.workspace_cache.record_delete(file_path)
     return tool_result
 
 
@@ -284,6 +558,8 @@ def download_workspace_file_from_oss(
         },
     )
     print(f"{tool_result}")
+    if _succeeded(tool_result):
+        sandbox.workspace_cache.record_write(to_path)
     return tool_result
 
 
@@ -308,52 +584,273 @@ def delete_workspace_directory(
         "run_shell_command",
         arguments={"command": f"rm -rf {directory_path}"},
     )
+    if _succeeded(tool_result):
+        sandbox.workspace_cache.record_delete(directory_path)
     return tool_result
 
 
-def clean_workspace(sandbox: AliasSandbox):
+def clean_workspace(
+    sandbox: AliasSandbox,
+    preserve: Optional[list[str]] = None,
+) -> dict:
     """
-    Remove all files and subdirectories within the /workspace directory.
+    Remove all files and subdirectories within the /workspace directory,
+    e.g. to reuse the sandbox for another task. This is a single call:
+    the sandbox moves the content aside and deletes it in the background.
+
+    Without direct access, the entries are deleted one by one through
+    the manager instead, and a preserved path keeps its whole top-level
+    entry.
+
+    Args:
+        sandbox (AliasSandbox): sandbox to clean
+        preserve (Optional[list[str]]): Paths relative to /workspace to
+            keep, such as caches. Glob patterns are allowed.
     """
+    if not sandbox.has_direct_access:
+        return _clean_via_tools(sandbox, preserve)
+    reset_result = sandbox.http_client.reset_workspace(preserve=preserve)
+    sandbox.workspace_cache.invalidate()
+    return reset_result
+
+
+def _clean_via_tools(
+    sandbox: AliasSandbox,
+    preserve: Optional[list[str]],
+) -> dict:
     ls_result = list_workspace_directories(sandbox)
-    for file in ls_result["files"]:
-        delete_workspace_file(sandbox, file)
+    if not _succeeded(ls_result):
+        return ls_result
+    patterns = [
+        path.strip("/").split("/")[0]
+        for path in preserve or []
+        if path.strip("/")
+    ]
+    stats = {"removed": 0, "preserved": []}
+    for path in ls_result["files"] + ls_result["directories"]:
+        name = os.path.basename(path)
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            stats["preserved"].append(name)
+            continue
+        if path in ls_result["files"]:
+            delete_result = delete_workspace_file(sandbox, path)
+        else:
+            delete_result = delete_workspace_directory(sandbox, path)
+        if _succeeded(delete_result):
+            stats["removed"] += 1
+        else:
+            logger.error(f"Failed to delete {path}: {delete_result}")
+    return stats
+
 
-    for subdir in ls_result["directories"]:
-        delete_workspace_directory(sandbox, subdir)
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _local_state(path: str) -> Optional[list[int]]:
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return [stat_result.st_size, stat_result.st_mtime_ns]
+
+
+def _load_manifest(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(path: str, manifest: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _download_to_dir(
+    sandbox: AliasSandbox,
+    file_path: str,
+    local_path: str,
+) -> dict:
+    """Stream a workspace file next to `local_path`, then move it there,
+    so that an interrupted download never leaves a truncated file."""
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    part_path = f"{local_path}.part"
+    try:
+        download_result = download_workspace_file(
+            sandbox,
+            file_path,
+            part_path,
+        )
+        if not _succeeded(download_result):
+            raise RuntimeError(download_result["content"][0]["text"])
+        # Hash what was received, the file may have changed since listed
+        sha256 = _file_sha256(part_path)
+        os.replace(part_path, local_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return {"sha256": sha256, "local": _local_state(local_path)}
+
+
+def _download_to_memory(sandbox: AliasSandbox, file_path: str) -> str:
+    content = get_workspace_file_bytes(sandbox, file_path)
+    if os.path.splitext(file_path)[1].lower() in TEXT_EXTENSIONS:
+        return content.decode("utf-8")
+    return base64.b64encode(content).decode()
+
+
+def _excluded(relative_path: str, patterns: list[str]) -> bool:
+    # Like the listing of the sandbox: a path is left out if it or one of
+    # its parent directories matches, by relative path or by name
+    parts = relative_path.split(os.sep)
+    return any(
+        fnmatch.fnmatch(os.sep.join(parts[: i + 1]), pattern)
+        or fnmatch.fnmatch(parts[i], pattern)
+        for i in range(len(parts))
+        for pattern in patterns
+    )
+
+
+def _list_files_via_tools(
+    sandbox: AliasSandbox,
+    directory: str,
+    exclude: Optional[list[str]],
+) -> dict:
+    listing = _list_via_tools(sandbox, directory, recursive=True)
+    if not _succeeded(listing):
+        raise RuntimeError(listing["content"][0]["text"])
+    remote_files = {}
+    for file_path in listing["files"]:
+        relative_path = os.path.relpath(file_path, directory)
+        if exclude and _excluded(relative_path, exclude):
+            continue
+        # Without a checksum, the file is always downloaded again
+        remote_files[relative_path] = {
+            "path": relative_path,
+            "type": "file",
+            "sha256": None,
+        }
+    return remote_files
 
 
 def download_complete_workspace(
     sandbox: AliasSandbox,
     save_dir: Optional[str] = None,
-):
+    directory: str = "/workspace",
+    exclude: Optional[list[str]] = None,
+    max_workers: int = DOWNLOAD_WORKERS,
+) -> dict:
     """
-    Download all files and subdirectories within the /workspace directory.
-    """
-    download_files = {}
-    list_dir = list_workspace_directories(sandbox, recursive=True)
-    for file_path in list_dir["files"]:
-        file_content = get_workspace_file(sandbox, file_path)
-        file_extension = os.path.splitext(file_path)[1].lower()
-        file_name = os.path.basename(file_path)
-        if file_extension in TEXT_EXTENSIONS:
-            text = base64.b64decode(file_content).decode("utf-8")
-            download_files[file_path] = text
-            if save_dir is not None:
-                with open(
-                    os.path.join(save_dir, file_name),
-                    "w",
-                    encoding="utf-8",
-                ) as f:
-                    f.write(text)
-        else:
-            content = base64.b64decode(file_content)
-            download_files[file_path] = file_content  # this is base64
-            if save_dir is not None:
-                with open(os.path.join(save_dir, file_name), "wb") as f:
-                    f.write(content)
-        logger.info(f"Downloaded {file_path}")
-    return download_files
+    Download all files within a workspace directory, `max_workers` at a
+    time.
+
+    Args:
+        sandbox (AliasSandbox): sandbox to download from
+        save_dir (Optional[str]): Local directory to mirror `directory`
+            into, keeping its layout. Files are streamed to disk, and a
+            manifest of their SHA-256 lets a later call skip the files
+            that are already up to date.
+        directory (str): The workspace directory to download.
+        exclude (Optional[list[str]]): Glob patterns of relative paths
+            to leave out.
+        max_workers (int): Number of files downloaded at once.
+
+    Returns:
+        dict: Without `save_dir`, the content of every file by its full
+            path, as text for text files and base64 otherwise. With
+            `save_dir`, the relative paths `downloaded`, `skipped` and
+            `failed` (with their errors), and the `bytes` downloaded.
+    """
+    if not _valid_workspace_path(directory):
+        raise ValueError("`directory` must be under `/workspace`")
+    if sandbox.has_direct_access:
+        remote_files = {
+            item["path"]: item
+            for item in sandbox.http_client.iter_workspace_entries(
+                directory,
+                exclude=exclude,
+                stat=True,
+                checksum=save_dir is not None,
+            )
+            if item["type"] == "file"
+        }
+    else:
+        remote_files = _list_files_via_tools(sandbox, directory, exclude)
+
+    if save_dir is None:
+        download_files = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(
+                    _download_to_memory,
+                    sandbox,
+                    os.path.join(directory, relative_path),
+                ): os.path.join(directory, relative_path)
+                for relative_path in remote_files
+            }
+            for future in as_completed(futures):
+                download_files[futures[future]] = future.result()
+                logger.info(f"Downloaded {futures[future]}")
+        return download_files
+
+    save_dir = os.path.abspath(save_dir)
+    manifest_path = os.path.join(save_dir, WORKSPACE_MANIFEST)
+    manifest = _load_manifest(manifest_path)
+    summary = {"downloaded": [], "skipped": [], "failed": {}, "bytes": 0}
+
+    pending = {}
+    for relative_path, item in remote_files.items():
+        local_path = os.path.abspath(os.path.join(save_dir, relative_path))
+        if not local_path.startswith(save_dir + os.sep):
+            summary["failed"][relative_path] = "Path outside of `save_dir`"
+            continue
+        known = manifest.get(relative_path)
+        if (
+            known is not None
+            and item["sha256"] is not None
+            and known["sha256"] == item["sha256"]
+            and known["local"] == _local_state(local_path)
+        ):
+            summary["skipped"].append(relative_path)
+            continue
+        pending[relative_path] = local_path
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(
+                    _download_to_dir,
+                    sandbox,
+                    os.path.join(directory, relative_path),
+                    local_path,
+                ): relative_path
+                for relative_path, local_path in pending.items()
+            }
+            for future in as_completed(futures):
+                relative_path = futures[future]
+                try:
+                    manifest[relative_path] = future.result()
+                except (OSError, RuntimeError) as e:
+                    manifest.pop(relative_path, None)
+                    summary["failed"][relative_path] = str(e)
+                    logger.error(f"Failed to download {relative_path}: {e}")
+                    continue
+                summary["downloaded"].append(relative_path)
+                summary["bytes"] += manifest[relative_path]["local"][0]
+                logger.info(f"Downloaded {relative_path}")
+    finally:
+        # Keep the progress of an interrupted run
+        os.makedirs(save_dir, exist_ok=True)
+        _save_manifest(manifest_path, manifest)
+    return summary
 
 
 def copy_local_file_to_workspace(
@@ -381,6 +878,47 @@ def copy_local_file_to_workspace(
             ],
         }
 
+    if not sandbox.has_direct_access:
+        upload_result = _put_archive(
+            sandbox,
+            [(local_path, os.path.basename(target_path), None)],
+            os.path.dirname(target_path),
+        )
+    else:
+        # Streamed over HTTP, so this works whatever runs the sandbox
+        upload_result = sandbox.http_client.upload_workspace_file(
+            local_path,
+            target_path,
+        )
+    if upload_result.get("isError", False):
+        return upload_result
+    sandbox.workspace_cache.record_write(
+        target_path,
+        os.path.getsize(local_path),
+    )
+
+    return {
+        "isError": False,
+        "content": [
+            {
+                "type": "text",
+                "text": f"{target_path}",
+            },
+        ],
+    }
+
+
+def _put_archive(
+    sandbox: AliasSandbox,
+    members: list[tuple[str, str, Optional[dict]]],
+    target_dir: str,
+) -> dict:
+    """
+    Copy local paths into the container of a sandbox with the Docker API,
+    for sandboxes that cannot be reached directly. `members` are the local
+    paths, their names in `target_dir` and the stats to count the copied
+    `files`, `directories` and `bytes` in, if any.
+    """
     client = sandbox.manager_api.client
     if not isinstance(client, DockerClient):
         return {
@@ -395,33 +933,410 @@ def copy_local_file_to_workspace(
         }
     docker_client = client.client
     container = docker_client.containers.get(sandbox.sandbox_id)
+    container.exec_run(["mkdir", "-p", target_dir])
+
+    # Spooled to disk, so that directories do not have to fit in memory
+    with tempfile.TemporaryFile() as tar_stream:
+        with tarfile.open(fileobj=tar_stream, mode="w") as tar:
+            for local_path, name, stats in members:
+
+                def _count(tarinfo, stats=stats):
+                    if stats is not None:
+                        if tarinfo.isdir():
+                            stats["directories"] += 1
+                        else:
+                            stats["files"] += 1
+                            stats["bytes"] += tarinfo.size
+                    return tarinfo
+
+                tar.add(local_path, arcname=name, filter=_count)
+        tar_stream.seek(0)
+        # Extract tar to container (directory path only)
+        container.put_archive(target_dir, tar_stream)
+    return {"isError": False, "content": []}
+
+
+def _copy_via_docker(
+    sandbox: AliasSandbox,
+    local_paths: list[str],
+    target_dir: str,
+) -> dict:
+    results = {}
+    members = []
+    for local_path in local_paths:
+        name = os.path.basename(os.path.normpath(local_path))
+        if not os.path.exists(local_path):
+            results[local_path] = {
+                "isError": True,
+                "error": "No such file or directory",
+            }
+            continue
+        duplicate = next(
+            (member for member in members if member[1] == name),
+            None,
+        )
+        if duplicate is not None:
+            results[local_path] = {
+                "isError": True,
+                "error": f"Same name as {duplicate[0]}",
+            }
+            continue
+        results[local_path] = {
+            "isError": False,
+            "target_path": os.path.join(target_dir, name),
+            "files": 0,
+            "directories": 0,
+            "bytes": 0,
+        }
+        members.append((local_path, name, results[local_path]))
+    if not members:
+        return {"results": results, "skipped": []}
+
+    try:
+        put_result = _put_archive(sandbox, members, target_dir)
+        error = None
+        if put_result.get("isError", False):
+            error = put_result["content"][0]["text"]
+    except Exception as e:
+        logger.error(f"Failed to copy files into the sandbox: {e}")
+        error = str(e)
+    if error is None:
+        return {"results": results, "skipped": []}
+    for _, _, stats in members:
+        stats.clear()
+        stats.update({"isError": True, "error": error})
+    return {
+        "isError": True,
+        "content": [{"type": "text", "text": error}],
+        "results": results,
+    }
+
+
+def copy_local_files_to_workspace(
+    sandbox: AliasSandbox,
+    local_paths: list[str],
+    target_dir: str = "/workspace",
+    compression: str = "none",
+) -> dict:
+    """
+    Copy local files and directories into a directory under /workspace,
+    all in one request. They are streamed from disk as a tar archive, so
+    large datasets are neither loaded into memory nor sent file by file.
+
+    Args:
+        sandbox (AliasSandbox): sandbox to copy into
+        local_paths (list[str]): Local files and directories, each copied
+            to `target_dir` under its base name.
+        target_dir (str): The directory to copy into, created if missing.
+        compression (str): One of `none`, `gzip` and `zstd`, worth it
+            over slow links only.
+
+    Returns:
+        dict: The `results` per local path, with the `target_path` and
+            the numbers of `files`, `directories` and `bytes` copied, or
+            `isError` and the `error`.
+    """
+    if not _valid_workspace_path(target_dir):
+        return _invalid_path("target_dir")
+    if not sandbox.has_direct_access:
+        # Copied with the Docker API instead, uncompressed
+        upload_result = _copy_via_docker(sandbox, local_paths, target_dir)
+    else:
+        upload_result = sandbox.http_client.upload_workspace_files(
+            local_paths,
+            directory=target_dir,
+            compression=compression,
+        )
+    sandbox.workspace_cache.invalidate(target_dir)
+    sandbox.workspace_cache.invalidate(
+        os.path.dirname(target_dir),
+        recursive=False,
+    )
+    return upload_result
+
+
+def download_workspace_archive(
+    sandbox: AliasSandbox,
+    local_path: str,
+    directory: str = "/workspace",
+    compression: str = "none",
+    exclude: Optional[list[str]] = None,
+) -> dict:
+    """
+    Download a directory within /workspace as a single tar archive,
+    instead of one request per file.
+
+    Args:
+        sandbox (AliasSandbox): sandbox to download from
+        local_path (str): Local path the archive is written to.
+        directory (str): The directory to archive.
+        compression (str): One of `none`, `gzip` and `zstd`.
+        exclude (Optional[list[str]]): Glob patterns of relative paths
+            to leave out.
+    """
+    if not _valid_workspace_path(directory):
+        return {
+            "isError": True,
+            "content": [
+                {
+                    "type": "text",
+                    "text": "`directory` must be under `/workspace`",
+                },
+            ],
+        }
+    return sandbox.http_client.download_workspace_archive(
+        local_path,
+        directory=directory,
+        compression=compression,
+        exclude=exclude,
+    )
+
+
+def upload_workspace_archive(
+    sandbox: AliasSandbox,
+    local_path: str,
+    directory: str = "/workspace",
+    compression: str = "auto",
+) -> dict:
+    """
+    Upload a local tar archive and extract it into a directory within
+    /workspace. Unlike `copy_local_file_to_workspace`, this does not
+    depend on the Docker API.
+    """
+    if not _valid_workspace_path(directory):
+        return {
+            "isError": True,
+            "content": [
+                {
+                    "type": "text",
+                    "text": "`directory` must be under `/workspace`",
+                },
+            ],
+        }
+    upload_result = sandbox.http_client.upload_workspace_archive(
+        local_path,
+        directory=directory,
+        compression=compression,
+    )
+    sandbox.workspace_cache.invalidate(directory)
+    return upload_result
+
+
+def snapshot_workspace(
+    sandbox: AliasSandbox,
+    label: Optional[str] = None,
+    exclude: Optional[list[str]] = None,
+) -> dict:
+    """
+    Checkpoint /workspace, e.g. before a risky subtask. Snapshots are
+    incremental: only the files changed since the last one are stored.
+
+    Args:
+        sandbox (AliasSandbox): sandbox to snapshot
+        label (Optional[str]): Free text to recognize the snapshot by.
+        exclude (Optional[list[str]]): Glob patterns of relative paths
+            to leave out.
+
+    Returns:
+        The summary of the snapshot, pass its `id` to `restore_workspace`.
+    """
+    return sandbox.http_client.create_workspace_snapshot(
+        label=label,
+        exclude=exclude,
+    )
+
+
+def restore_workspace(sandbox: AliasSandbox, snapshot_id: str) -> dict:
+    """
+    Roll /workspace back to a snapshot taken by `snapshot_workspace`,
+    rewriting only the files that changed since.
+    """
+    restore_result = sandbox.http_client.restore_workspace_snapshot(
+        snapshot_id,
+    )
+    sandbox.workspace_cache.invalidate()
+    return restore_result
+
+
+# Async versions of the helpers above, for use from async agents: they
+# go through the pooled `sandbox.async_http_client` and do not block the
+# event loop while the sandbox works.
+
+
+async def alist_workspace_directories(
+    sandbox: AliasSandbox,
+    directory: str = "/workspace",
+    recursive: bool = False,
+) -> dict:
+    """Async version of `list_workspace_directories`."""
+    # Served from the workspace cache, a miss (or the listing through the
+    # manager) runs in a thread
+    return await asyncio.to_thread(
+        list_workspace_directories,
+        sandbox,
+        directory,
+        recursive,
+    )
 
-    # Create a tar archive in memory
-    tar_stream = io.BytesIO()
-    # pylint: disable=R1732
-    tar = tarfile.open(fileobj=tar_stream, mode="w")
 
-    # Add file to tar archive
-    tar.add(local_path, arcname=os.path.basename(target_path))
-    tar.close()
+async def aworkspace_path_exists(sandbox: AliasSandbox, path: str) -> bool:
+    """Async version of `workspace_path_exists`."""
+    return await asyncio.to_thread(workspace_path_exists, sandbox, path)
 
-    # Reset stream position
-    tar_stream.seek(0)
 
-    # Extract tar to container (directory path only)
-    container.put_archive(os.path.dirname(target_path), tar_stream)
+async def aget_workspace_file_bytes(
+    sandbox: AliasSandbox,
+    file_path: str,
+    max_bytes: Optional[int] = None,
+) -> bytes:
+    """Async version of `get_workspace_file_bytes`."""
+    if not _valid_workspace_path(file_path):
+        raise ValueError("`file_path` must be under `/workspace`")
+    if not await sandbox.ahas_direct_access():
+        return await asyncio.to_thread(
+            _read_via_tools,
+            sandbox,
+            file_path,
+            max_bytes,
+        )
+    content = await sandbox.async_http_client.download_workspace_file(
+        file_path,
+        max_bytes=max_bytes,
+    )
+    if isinstance(content, dict):
+        raise RuntimeError(content["content"][0]["text"])
+    return content
 
+
+async def acreate_or_edit_workspace_file(
+    sandbox: AliasSandbox,
+    file_path: str,
+    content: str,
+) -> dict:
+    """Async version of `create_or_edit_workspace_file`."""
+    if not _valid_workspace_path(file_path):
+        return _invalid_path("file_path")
+    fill_result = await sandbox.acall_tool(
+        "write_file",
+        arguments={"path": file_path, "content": content},
+    )
+    if _succeeded(fill_result):
+        sandbox.workspace_cache.record_write(
+            file_path,
+            len(content.encode("utf-8")),
+        )
+    return fill_result
+
+
+async def adelete_workspace_file(
+    sandbox: AliasSandbox,
+    file_path: str,
+) -> dict:
+    """Async version of `delete_workspace_file`."""
+    if not _valid_workspace_path(file_path):
+        return _invalid_path("file_path")
+    delete_result = await sandbox.async_http_client.delete_workspace_file(
+        file_path,
+    )
+    if _succeeded(delete_result):
+        sandbox.workspace_cache.record_delete(file_path)
+    return delete_result
+
+
+async def adelete_workspace_directory(
+    sandbox: AliasSandbox,
+    directory_path: str,
+) -> dict:
+    """Async version of `delete_workspace_directory`."""
+    if not _valid_workspace_path(directory_path):
+        return _invalid_path("directory_path")
+    delete_result = await sandbox.async_http_client.delete_workspace_directory(
+        directory_path,
+        recursive=True,
+    )
+    if _succeeded(delete_result):
+        sandbox.workspace_cache.record_delete(directory_path)
+    return delete_result
+
+
+async def acopy_workspace_item(
+    sandbox: AliasSandbox,
+    source_path: str,
+    destination_path: str,
+    mode: str = "auto",
+) -> dict:
+    """
+    Copy a file or directory within /workspace. `mode` is `auto`
+    (copy-on-write clones where supported), `copy` or `hardlink`.
+    """
+    for argument, path in (
+        ("source_path", source_path),
+        ("destination_path", destination_path),
+    ):
+        if not _valid_workspace_path(path):
+            return _invalid_path(argument)
+    copy_result = await sandbox.async_http_client.copy_workspace_item(
+        source_path,
+        destination_path,
+        mode=mode,
+    )
+    if _succeeded(copy_result):
+        sandbox.workspace_cache.invalidate(destination_path)
+        sandbox.workspace_cache.invalidate(
+            os.path.dirname(destination_path),
+            recursive=False,
+        )
+    return copy_result
+
+
+async def acopy_local_file_to_workspace(
+    sandbox: AliasSandbox,
+    local_path: str,
+    target_path: Optional[str] = None,
+) -> dict:
+    """Async version of `copy_local_file_to_workspace`."""
+    if target_path is None:
+        target_path = os.path.join("/workspace", os.path.basename(local_path))
+    if not _valid_workspace_path(target_path):
+        return _invalid_path("target_path")
+    if not await sandbox.ahas_direct_access():
+        return await asyncio.to_thread(
+            copy_local_file_to_workspace,
+            sandbox,
+            local_path,
+            target_path,
+        )
+
+    upload_result = await sandbox.async_http_client.upload_workspace_file(
+        local_path,
+        target_path,
+    )
+    if upload_result.get("isError", False):
+        return upload_result
+    sandbox.workspace_cache.record_write(
+        target_path,
+        os.path.getsize(local_path),
+    )
     return {
         "isError": False,
-        "content": [
-            {
-                "type": "text",
-                "text": f"{target_path}",
-            },
-        ],
+        "content": [{"type": "text", "text": f"{target_path}"}],
     }
 
 
+async def aclean_workspace(
+    sandbox: AliasSandbox,
+    preserve: Optional[list[str]] = None,
+) -> dict:
+    """Async version of `clean_workspace`."""
+    if not await sandbox.ahas_direct_access():
+        return await asyncio.to_thread(_clean_via_tools, sandbox, preserve)
+    reset_result = await sandbox.async_http_client.reset_workspace(
+        preserve=preserve,
+    )
+    sandbox.workspace_cache.invalidate()
+    return reset_result
+
+
 if __name__ == "__main__":
     with AliasSandbox() as box:
         create_or_edit_workspace_file(
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+import copy
+import dataclasses
+import json
+import posixpath
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Optional
+
+from agentscope.tool import ToolResponse
+
+from alias.agent.utils.constants import TOOL_RESULT_CACHE_BYTES
+from alias.runtime.alias_sandbox.workspace_cache import (
+    WORKSPACE_DIR,
+    WorkspaceMetadataCache,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class ToolCachePolicy:
+    """How the results of a read-only tool are cached."""
+
+    # Seconds a result is reused for
+    ttl: float = 600
+    # Arguments with the workspace path(s) the result depends on. Such
+    # results are dropped when anything at, under or above those paths
+    # changes; the others only expire.
+    path_args: tuple[str, ...] = ()
+
+
+CACHEABLE_TOOLS = {
+    # improved tools
+    "read_file": ToolCachePolicy(path_args=("file_path",)),
+    "search_file_contents": ToolCachePolicy(path_args=("path",)),
+    # filesystem tools of the sandbox
+    "read_text_file": ToolCachePolicy(path_args=("path",)),
+    "read_multiple_files": ToolCachePolicy(path_args=("paths",)),
+    "list_directory": ToolCachePolicy(path_args=("path",)),
+    "list_directory_with_sizes": ToolCachePolicy(path_args=("path",)),
+    "directory_tree": ToolCachePolicy(path_args=("path",)),
+    "search_files": ToolCachePolicy(path_args=("path",)),
+    "get_file_info": ToolCachePolicy(path_args=("path",)),
+    # search engine
+    "tavily_search": ToolCachePolicy(ttl=1800),
+    "tavily_extract": ToolCachePolicy(ttl=1800),
+}
+
+
+@dataclasses.dataclass
+class _Entry:
+    response: ToolResponse
+    size: int
+    expires: float
+    paths: tuple[str, ...]
+
+
+def _overlaps(path: str, other: str) -> bool:
+    return (
+        path == other
+        or path.startswith(other.rstrip("/") + "/")
+        or other.startswith(path.rstrip("/") + "/")
+    )
+
+
+class ToolResultCache:
+    """
+    Results of read-only tool calls, keyed by the tool name and its
+    normalized arguments, so that the same read repeated by an agent or
+    by several workers is answered without calling the tool again.
+
+    Which tools are cached, and for how long, is declared by `policies`.
+    Results that depend on workspace paths are kept only while the
+    workspace events are followed through `workspace_cache`, and are
+    dropped on any change to those paths. The least recently used results
+    are evicted beyond `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        workspace_cache: Optional[WorkspaceMetadataCache] = None,
+        max_bytes: int = TOOL_RESULT_CACHE_BYTES,
+        policies: Optional[dict[str, ToolCachePolicy]] = None,
+    ) -> None:
+        self.workspace_cache = workspace_cache
+        self.max_bytes = max_bytes
+        self.policies = CACHEABLE_TOOLS if policies is None else policies
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._size = 0
+        # Bumped by every invalidation, so that a result computed while
+        # the workspace changed is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        if workspace_cache is not None:
+            workspace_cache.add_listener(self.invalidate)
+
+    @property
+    def generation(self) -> int:
+        """To pass to `put` for a result computed from now on."""
+        with self._lock:
+            return self._generation
+
+    def is_cacheable(self, name: str) -> bool:
+        return self.max_bytes > 0 and name in self.policies
+
+    def _key(self, name: str, arguments: dict) -> Optional[tuple[str, tuple]]:
+        """The key of a call and the workspace paths it depends on, `None`
+        if it cannot be cached."""
+        policy = self.policies[name]
+        arguments = dict(arguments)
+        paths = []
+        for arg in policy.path_args:
+            value = arguments.get(arg)
+            if value is None:
+                continue
+            values = value if isinstance(value, list) else [value]
+            if not all(isinstance(v, str) for v in values):
+                return None
+            values = [posixpath.normpath(v) for v in values]
+            # Only the changes in the workspace are known, an ancestor
+            # such as "/" also covers what lies outside of it
+            if not all(
+                v == WORKSPACE_DIR or v.startswith(WORKSPACE_DIR + "/")
+                for v in values
+            ):
+                return None
+            arguments[arg] = values if isinstance(value, list) else values[0]
+            paths += values
+        if paths and (
+            self.workspace_cache is None or not self.workspace_cache.following
+        ):
+            return None
+        try:
+            key = json.dumps([name, arguments], sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+        return key, tuple(paths)
+
+    def get(self, name: str, arguments: dict) -> Optional[ToolResponse]:
+        """A copy of the cached result of a call, `None` on a miss."""
+        if not self.is_cacheable(name):
+            return None
+        key = self._key(name, arguments)
+        with self._lock:
+            entry = self._entries.get(key[0]) if key else None
+            if entry is not None and entry.expires < time.monotonic():
+                self._remove(key[0])
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key[0])
+            self.hits += 1
+            response = entry.response
+        return ToolResponse(
+            content=copy.deepcopy(response.content),
+            metadata=copy.deepcopy(response.metadata),
+        )
+
+    def put(
+        self,
+        name: str,
+        arguments: dict,
+        response: ToolResponse,
+        generation: int,
+    ) -> None:
+        """Cache the result of a call that started at `generation`, unless
+        it failed."""
+        if (
+            not self.is_cacheable(name)
+            or not response.is_last
+            or response.is_interrupted
+            or (response.metadata or {}).get("success") is False
+        ):
+            return
+        # Toolkit reports the exceptions of tool functions this way
+        first = response.content[0] if response.content else {}
+        if str(first.get("text", "")).startswith("Error: "):
+            return
+        key = self._key(name, arguments)
+        if key is None:
+            return
+        try:
+            size = len(json.dumps(response.content, default=str))
+        except (TypeError, ValueError):
+            return
+        if size > self.max_bytes:
+            return
+        entry = _Entry(
+            response=ToolResponse(
+                content=copy.deepcopy(response.content),
+                metadata=copy.deepcopy(response.metadata),
+            ),
+            size=size,
+            expires=time.monotonic() + self.policies[name].ttl,
+            paths=key[1],
+        )
+        with self._lock:
+            if key[1] and generation != self._generation:
+                return
+            self._remove(key[0])
+            self._entries[key[0]] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop the results depending on a workspace path, or on any
+        workspace path if `path` is not given."""
+        with self._lock:
+            self._generation += 1
+            for key, entry in list(self._entries.items()):
+                if entry.paths and (
+                    path is None
+                    or any(_overlaps(path, p) for p in entry.paths)
+                ):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._size = 0
+
+
+_SHARED_CACHES: "weakref.WeakKeyDictionary[Any, ToolResultCache]" = (
+    weakref.WeakKeyDictionary()
+)
+_shared_lock = threading.Lock()
+
+
+def shared_tool_result_cache(
+    sandbox: Any,
+    create: bool = True,
+) -> Optional[ToolResultCache]:
+    """The result cache shared by the toolkits of a sandbox, `None` if
+    there is none yet and not to `create`."""
+    with _shared_lock:
+        cache = _SHARED_CACHES.get(sandbox)
+        if cache is None and create:
+            cache = ToolResultCache(sandbox.workspace_cache)
+            _SHARED_CACHES[sandbox] = cache
+        return cache
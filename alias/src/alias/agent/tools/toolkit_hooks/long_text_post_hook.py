@@ -7,10 +7,10 @@ import textwrap
 from agentscope.tool import ToolResponse
 from agentscope.message import ToolUseBlock, TextBlock
 
-from alias.agent.utils.constants import TMP_FILE_DIR
-from alias.agent.tools.sandbox_util import (
-    create_or_edit_workspace_file,
-    create_workspace_directory,
+from alias.agent.utils.constants import LONG_TEXT_BUDGET, TMP_FILE_DIR
+from alias.agent.tools.sandbox_util import batch_call_tools
+from alias.runtime.alias_sandbox.box.routers.hints import (
+    LONG_TEXT_FILE_HINT,
 )
 
 
@@ -40,7 +40,7 @@ class LongTextPostHook:
             manageable for the language model.
         """
         # Set budget to prevent overwhelming the model with too much content
-        budget = 8194 * 10  # Approximately 80K tokens of content
+        budget = LONG_TEXT_BUDGET  # Approximately 80K tokens of content
         append_hint = "\n\n[Content is too long and truncated....]"
 
         new_tool_response = ToolResponse(
@@ -103,7 +103,6 @@ class LongTextPostHook:
             return tool_response
 
     def _save_tmp_file(self, save_file_name_prefix: str, content: list | str):
-        create_workspace_directory(self.sandbox, TMP_FILE_DIR)
         save_file_name = (
             save_file_name_prefix
             + "-"
@@ -116,16 +115,24 @@ class LongTextPostHook:
         wrapped = "\\n".join(
             [textwrap.fill(line, width=500) for line in json_str.split("\\n")],
         )
-        create_or_edit_workspace_file(
+        # Create the directory and the file in a single round trip
+        batch_call_tools(
             self.sandbox,
-            file_path,
-            wrapped,
+            [
+                {
+                    "id": "mkdir",
+                    "name": "run_shell_command",
+                    "arguments": {"command": f"mkdir -p {TMP_FILE_DIR}"},
+                },
+                {
+                    "name": "write_file",
+                    "arguments": {"path": file_path, "content": wrapped},
+                    "depends_on": ["mkdir"],
+                },
+            ],
         )
         return TextBlock(
             type="text",
             text=f"Dump the complete long file at {file_path}. "
-            "Don't try to read the complete file directly. "
-            "Use `grep -C 10 'YOUR_PATTERN' {file_path}` or "
-            "other bash command to extract "
-            "useful information.",
+            + LONG_TEXT_FILE_HINT.format(path=file_path),
         )
@@ -33,3 +33,15 @@ BROWSER_AGENT_DESCRIPTION = (
 
 # tmp file dir
 TMP_FILE_DIR = "/workspace/tmp_files/"
+# Characters of tool results shown to the model, approximately 80K tokens;
+# longer results are saved under TMP_FILE_DIR
+LONG_TEXT_BUDGET = 8194 * 10
+
+# Seconds to wait for a sandbox tool call, unless the toolkit is given
+# another timeout for the tool
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "300"))
+# Bytes of tool results kept by the result cache of the toolkits sharing
+# a sandbox, 0 to disable the cache
+TOOL_RESULT_CACHE_BYTES = int(
+    os.getenv("TOOL_RESULT_CACHE_BYTES", str(64 * 1024 * 1024)),
+)
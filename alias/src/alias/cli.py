@@ -24,7 +24,7 @@ from alias.agent.run import (
     test_browseruse_agent,
     test_deepresearch_agent,
 )
-from alias.agent.tools.sandbox_util import copy_local_file_to_workspace
+from alias.agent.tools.sandbox_util import copy_local_files_to_workspace
 from alias.runtime.alias_sandbox.alias_sandbox import AliasSandbox
 
 
@@ -61,31 +61,33 @@ async def run_agent_task(
         webbrowser.open(sandbox.desktop_url)
         # Upload files to sandbox if provided
         if files:
-            target_paths = []
             logger.info(
                 f"Uploading {len(files)} file(s) to sandbox workspace...",
             )
             for file_path in files:
                 if not os.path.exists(file_path):
                     logger.error(f"File not found: {file_path}")
-                    continue
-
-                # Get the filename and construct target path in workspace
-                filename = os.path.basename(file_path)
-                target_path = f"/workspace/{filename}"
-
-                logger.info(f"Uploading {file_path} to {target_path}")
-                result = copy_local_file_to_workspace(
-                    sandbox=sandbox,
-                    local_path=file_path,
-                    target_path=target_path,
-                )
-
+            # One request streaming all files, instead of one per file
+            upload_result = await asyncio.to_thread(
+                copy_local_files_to_workspace,
+                sandbox,
+                [
+                    file_path
+                    for file_path in files
+                    if os.path.exists(file_path)
+                ],
+            )
+            target_paths = []
+            for file_path, result in upload_result.get("results", {}).items():
                 if result.get("isError"):
-                    raise ValueError(f"Failed to upload {file_path}: {result}")
-                logger.info(f"Successfully uploaded to {result}")
-
-                target_paths.append(result.get("content", [])[0].get("text"))
+                    raise ValueError(
+                        f"Failed to upload {file_path}: {result['error']}",
+                    )
+                logger.info(
+                    f"Successfully uploaded {file_path} to "
+                    f"{result['target_path']}",
+                )
+                target_paths.append(result["target_path"])
 
             user_msg += "\n\nUser uploaded files:\n" + "\n".join(target_paths)
 
@@ -1,4 +1,10 @@
 # -*- coding: utf-8 -*-
 from .alias_sandbox import AliasSandbox
+from .alias_sandbox_async_client import AliasSandboxAsyncHttpClient
+from .alias_sandbox_client import AliasSandboxHttpClient
 
-__all__ = ["AliasSandbox"]
+__all__ = [
+    "AliasSandbox",
+    "AliasSandboxAsyncHttpClient",
+    "AliasSandboxHttpClient",
+]
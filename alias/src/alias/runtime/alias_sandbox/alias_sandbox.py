@@ -1,11 +1,32 @@
 # -*- coding: utf-8 -*-
-from typing import Optional
+import asyncio
+import logging
+from typing import Any, Optional
+
+import requests
 
 from agentscope_runtime.sandbox.utils import build_image_uri
 from agentscope_runtime.sandbox.registry import SandboxRegistry
 from agentscope_runtime.sandbox.enums import SandboxType
 from agentscope_runtime.sandbox.box.base import BaseSandbox
 from agentscope_runtime.sandbox.box.gui import GUIMixin
+from agentscope_runtime.sandbox.model import ContainerModel
+
+from alias.runtime.alias_sandbox.alias_sandbox_async_client import (
+    AliasSandboxAsyncHttpClient,
+)
+from alias.runtime.alias_sandbox.alias_sandbox_client import (
+    AliasSandboxHttpClient,
+)
+from alias.runtime.alias_sandbox.workspace_cache import (
+    WorkspaceMetadataCache,
+)
+
+logger = logging.getLogger(__name__)
+
+# Deadline in seconds of the check that the sandbox server answers at the
+# container URL reported by a remote manager
+DIRECT_ACCESS_CHECK_TIMEOUT = 5
 
 
 @SandboxRegistry.register(
@@ -31,3 +52,133 @@ class AliasSandbox(GUIMixin, BaseSandbox):
             bearer_token,
             sandbox_type,
         )
+        self._http_client: Optional[AliasSandboxHttpClient] = None
+        self._async_http_client: Optional[AliasSandboxAsyncHttpClient] = None
+        self._workspace_cache: Optional[WorkspaceMetadataCache] = None
+        self._direct_access: Optional[bool] = None
+
+    @property
+    def http_client(self) -> AliasSandboxHttpClient:
+        """Client connected to the sandbox server of this sandbox.
+
+        It talks to the container URL reported by the manager, which only
+        works where that URL is reachable, see `has_direct_access`.
+        """
+        if self._http_client is None:
+            self._http_client = AliasSandboxHttpClient(
+                ContainerModel(**self.get_info()),
+            )
+        return self._http_client
+
+    @property
+    def async_http_client(self) -> AliasSandboxAsyncHttpClient:
+        """asyncio client connected to the sandbox server of this sandbox,
+        for use from async agents."""
+        if self._async_http_client is None:
+            self._async_http_client = AliasSandboxAsyncHttpClient(
+                ContainerModel(**self.get_info()),
+            )
+        return self._async_http_client
+
+    @property
+    def has_direct_access(self) -> bool:
+        """Whether the sandbox server answers at the container URL.
+
+        An embedded manager connects to that URL from this process itself,
+        the URL reported by a remote manager may only resolve on its side
+        and is checked once against the health endpoint.
+        """
+        if self._direct_access is None:
+            if self.embed_mode:
+                self._direct_access = True
+            else:
+                client = self.http_client
+                try:
+                    self._direct_access = (
+                        client.session.get(
+                            f"{client.base_url}/healthz",
+                            timeout=DIRECT_ACCESS_CHECK_TIMEOUT,
+                        ).status_code
+                        == 200
+                    )
+                except requests.RequestException:
+                    self._direct_access = False
+            if not self._direct_access:
+                logger.warning(
+                    f"Sandbox {self.sandbox_id} is not reachable at its "
+                    f"container URL, calling tools through the manager",
+                )
+        return self._direct_access
+
+    async def ahas_direct_access(self) -> bool:
+        """`has_direct_access` without blocking the event loop while it is
+        checked."""
+        if self._direct_access is None:
+            return await asyncio.to_thread(lambda: self.has_direct_access)
+        return self._direct_access
+
+    @property
+    def workspace_cache(self) -> WorkspaceMetadataCache:
+        """Cache of the listings of /workspace, shared by everything that
+        uses this sandbox.
+
+        Without direct access it does not follow the workspace events and
+        caches nothing, the helpers of `sandbox_util` list the workspace
+        through the manager instead.
+        """
+        if self._workspace_cache is None:
+            self._workspace_cache = WorkspaceMetadataCache(
+                self.http_client,
+                follow=self.has_direct_access,
+            )
+        return self._workspace_cache
+
+    async def acall_tool(
+        self,
+        name: str,
+        arguments: Optional[dict[str, Any]] = None,
+        spill_threshold: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """`call_tool` without blocking the event loop, giving up after
+        `timeout` seconds."""
+        if not await self.ahas_direct_access():
+            return await asyncio.wait_for(
+                asyncio.to_thread(self.call_tool, name, arguments),
+                timeout=timeout,
+            )
+        return await self.async_http_client.call_tool(
+            name,
+            arguments,
+            spill_threshold=spill_threshold,
+            timeout=timeout,
+        )
+
+    def _cleanup(self):
+        if self._workspace_cache is not None:
+            self._workspace_cache.close()
+        if self._async_http_client is not None:
+            self._async_http_client.close_threadsafe()
+        super()._cleanup()
+
+    def list_tools(self, tool_type: Optional[str] = None) -> dict:
+        if not self.has_direct_access:
+            return super().list_tools(tool_type=tool_type)
+        return self.http_client.list_tools(tool_type=tool_type)
+
+    def call_tool(
+        self,
+        name: str,
+        arguments: Optional[dict[str, Any]] = None,
+        spill_threshold: Optional[int] = None,
+    ) -> Any:
+        # Talk to the sandbox server over one kept-alive session instead of
+        # a new connection (and container lookup) per call via the manager
+        if not self.has_direct_access:
+            # The manager does not spill long results
+            return super().call_tool(name, arguments)
+        return self.http_client.call_tool(
+            name,
+            arguments,
+            spill_threshold=spill_threshold,
+        )
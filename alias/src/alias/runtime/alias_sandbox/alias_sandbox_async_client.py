@@ -0,0 +1,585 @@
+# -*- coding: utf-8 -*-
+# pylint cannot infer aiohttp's request context managers
+# pylint: disable=not-async-context-manager
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Optional, Union
+from urllib.parse import urljoin
+
+import aiofiles
+import aiohttp
+
+from agentscope_runtime.sandbox.client.http_client import DEFAULT_TIMEOUT
+from agentscope_runtime.sandbox.model import ContainerModel
+
+from alias.runtime.alias_sandbox.alias_sandbox_client import (
+    COMPRESSION_MIN_SIZE,
+    compress_body,
+)
+
+try:
+    from aiohttp.compression_utils import HAS_ZSTD
+except ImportError:
+    HAS_ZSTD = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Connections kept open to the sandbox server
+DEFAULT_POOL_SIZE = 32
+_KEEPALIVE_TIMEOUT = 60
+_CHUNK_SIZE = 64 * 1024
+_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+# Seconds to wait for a session to close from outside of its event loop
+_CLOSE_TIMEOUT = 5
+
+
+def _error(e: Exception) -> dict:
+    logger.error(f"An error occurred: {e}")
+    return {
+        "isError": True,
+        "content": [{"type": "text", "text": str(e) or repr(e)}],
+    }
+
+
+def _params(params: dict) -> list[tuple[str, str]]:
+    """Query parameters as aiohttp accepts them: no booleans nor `None`,
+    lists repeated."""
+    items = []
+    for key, value in params.items():
+        if value is None:
+            continue
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, bool):
+                item = "true" if item else "false"
+            items.append((key, str(item)))
+    return items
+
+
+class AliasSandboxAsyncHttpClient:
+    """
+    asyncio counterpart of `AliasSandboxHttpClient`, so that agents do
+    not block their event loop for the round trip of every sandbox call.
+
+    Requests share a pool of kept-alive connections, created on first
+    use in the running event loop. Failed calls return an `isError`
+    result like the synchronous client.
+    """
+
+    def __init__(
+        self,
+        model: ContainerModel,
+        domain: str = "localhost",
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ) -> None:
+        self.session_id = model.session_id
+        self.base_url = urljoin(
+            model.url.replace("localhost", domain),
+            "fastapi",
+        )
+        self.timeout = model.timeout or DEFAULT_TIMEOUT
+        self.pool_size = pool_size
+        self.headers = {
+            "x-agentrun-session-id": "s" + self.session_id,
+            # Responses are decoded by aiohttp
+            "Accept-Encoding": "zstd, gzip" if HAS_ZSTD else "gzip",
+        }
+        if model.runtime_token:
+            self.headers["Authorization"] = f"Bearer {model.runtime_token}"
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The pooled session of the running event loop."""
+        loop = asyncio.get_running_loop()
+        session = self._session
+        if session is None or session.closed or self._loop != loop:
+            # Sessions are bound to the loop they were created in
+            if session is not None:
+                self._close_in_loop(session, self._loop)
+            session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size,
+                    keepalive_timeout=_KEEPALIVE_TIMEOUT,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._session = session
+            self._loop = loop
+        return session
+
+    @staticmethod
+    def _close_in_loop(
+        session: aiohttp.ClientSession,
+        loop: Optional[asyncio.AbstractEventLoop],
+    ) -> Optional[concurrent.futures.Future]:
+        """Schedule closing `session` in its own event loop, as long as
+        that loop still runs."""
+        if session.closed or loop is None or not loop.is_running():
+            return None
+        return asyncio.run_coroutine_threadsafe(session.close(), loop)
+
+    async def close(self) -> None:
+        """Close the pooled connections."""
+        session, loop = self._session, self._loop
+        self._session = None
+        self._loop = None
+        if session is None or session.closed:
+            return
+        if loop == asyncio.get_running_loop():
+            await session.close()
+        else:
+            self._close_in_loop(session, loop)
+
+    def close_threadsafe(self) -> None:
+        """Close the pooled connections from synchronous code in any
+        thread, waiting for them to close unless called from the thread of
+        their event loop."""
+        session, loop = self._session, self._loop
+        self._session = None
+        self._loop = None
+        if session is None:
+            return
+        future = self._close_in_loop(session, loop)
+        if future is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return
+        try:
+            future.result(timeout=_CLOSE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Failed to close the sandbox session: {e}")
+
+    async def _request_json(
+        self,
+        method: str,
+        endpoint: str,
+        **kwargs,
+    ) -> Any:
+        if "params" in kwargs:
+            kwargs["params"] = _params(kwargs["params"])
+        async with self.session.request(
+            method,
+            f"{self.base_url}{endpoint}",
+            **kwargs,
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def _post_json(
+        self,
+        endpoint: str,
+        payload: dict,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """POST a JSON payload, compressed if it is large. `timeout`
+        replaces the timeout of the session for this request."""
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        if len(body) >= COMPRESSION_MIN_SIZE:
+            coding, compressed = compress_body(body)
+            async with self.session.post(
+                f"{self.base_url}{endpoint}",
+                data=compressed,
+                headers={**headers, "Content-Encoding": coding},
+                **kwargs,
+            ) as response:
+                # Otherwise the server does not support this coding
+                if response.status != 415:
+                    response.raise_for_status()
+                    return await response.json()
+        return await self._request_json(
+            "post",
+            endpoint,
+            data=body,
+            headers=headers,
+            **kwargs,
+        )
+
+    async def check_health(self) -> bool:
+        try:
+            async with self.session.get(
+                f"{self.base_url}/healthz",
+            ) as response:
+                return response.status == 200
+        except _ERRORS:
+            return False
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Optional[dict] = None,
+        spill_threshold: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> dict:
+        """
+        Call a tool, see `AliasSandboxHttpClient.call_tool`. `timeout` is
+        the number of seconds to wait for the result, the timeout of the
+        client by default.
+        """
+        arguments = arguments or {}
+        try:
+            if name == "run_ipython_cell":
+                return await self._post_json(
+                    "/tools/run_ipython_cell",
+                    {k: v for k, v in arguments.items() if v is not None},
+                    timeout=timeout,
+                )
+            if name == "run_shell_command":
+                return await self._post_json(
+                    "/tools/run_shell_command",
+                    arguments,
+                    timeout=timeout,
+                )
+            payload = {"tool_name": name, "arguments": arguments}
+            if spill_threshold is not None:
+                payload["spill_threshold"] = spill_threshold
+            return await self._post_json(
+                "/mcp/call_tool",
+                payload,
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            return _error(
+                TimeoutError(
+                    f"Tool {name} did not return within "
+                    f"{timeout or self.timeout} seconds",
+                ),
+            )
+        except _ERRORS as e:
+            return _error(e)
+
+    async def call_tools(
+        self,
+        calls: list[dict],
+        stop_on_error: bool = False,
+    ) -> dict:
+        """Call several tools in one request, see
+        `AliasSandboxHttpClient.call_tools`."""
+        try:
+            return await self._post_json(
+                "/tools/batch",
+                {"calls": calls, "stop_on_error": stop_on_error},
+            )
+        except _ERRORS as e:
+            return _error(e)
+
+    async def iter_workspace_entries(
+        self,
+        directory: str = "/workspace",
+        max_depth: Optional[int] = None,
+        include: Optional[list[str]] = None,
+        exclude: Optional[list[str]] = None,
+        stat: bool = False,
+        page_size: int = 1000,
+        checksum: bool = False,
+    ) -> AsyncIterator[dict]:
+        """
+        Yield the entries under a workspace directory page by page, see
+        `AliasSandboxHttpClient.iter_workspace_entries`.
+
+        Raises:
+            `aiohttp.ClientError` if a page fails.
+        """
+        params = {
+            "dir": directory,
+            "max_depth": max_depth,
+            "include": include,
+            "exclude": exclude,
+            "stat": stat,
+            "checksum": checksum,
+            "limit": page_size,
+        }
+        cursor = None
+        while True:
+            params["cursor"] = cursor
+            async with self.session.get(
+                f"{self.base_url}/workspace/entries",
+                params=_params(params),
+            ) as response:
+                response.raise_for_status()
+                cursor = None
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    if item["type"] == "end":
+                        cursor = item["next_cursor"]
+                        break
+                    yield item
+            if cursor is None:
+                return
+
+    async def iter_search_workspace(
+        self,
+        pattern: str,
+        paths: Optional[list[str]] = None,
+        **options,
+    ) -> AsyncIterator[dict]:
+        """
+        Search the content of workspace files, see
+        `AliasSandboxHttpClient.iter_search_workspace`.
+
+        Raises:
+            `aiohttp.ClientError` if the search fails.
+        """
+        payload = {"pattern": pattern, **options}
+        if paths:
+            payload["paths"] = paths
+        async with self.session.post(
+            f"{self.base_url}/workspace/search",
+            json=payload,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if line.strip():
+                    yield json.loads(line)
+
+    async def iter_shell_command(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Run a shell command and yield its output as it is produced, see
+        `AliasSandboxHttpClient.iter_shell_command`.
+
+        Raises:
+            `aiohttp.ClientError` if the stream fails.
+        """
+        payload = {"command": command, "stream": "ndjson"}
+        if timeout:
+            payload["timeout"] = timeout
+        async with self.session.post(
+            f"{self.base_url}/tools/run_shell_command",
+            json=payload,
+            # The command may stay silent until the sandbox kills it
+            timeout=aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=self.timeout,
+                sock_read=max(self.timeout, timeout) if timeout else None,
+            ),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if line.strip():
+                    yield json.loads(line)
+
+    async def read_workspace_file_lines(
+        self,
+        file_path: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> dict:
+        """Read `limit` lines of a workspace file starting from (0-based)
+        line `offset`, see `AliasSandboxHttpClient.read_workspace_file_lines`.
+        """
+        try:
+            return await self._request_json(
+                "get",
+                "/workspace/files",
+                params={
+                    "file_path": file_path,
+                    "lines": f"{offset}:{limit or ''}",
+                },
+            )
+        except _ERRORS as e:
+            return _error(e)
+
+    async def download_workspace_file(
+        self,
+        file_path: str,
+        target: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Union[bytes, int, dict]:
+        """
+        Fetch a workspace file as raw bytes. With `target`, a local path,
+        the file is streamed there and the number of bytes is returned.
+        Files larger than `max_bytes` are refused.
+        """
+        try:
+            async with self.session.get(
+                f"{self.base_url}/workspace/files",
+                params=_params(
+                    {"file_path": file_path, "max_bytes": max_bytes},
+                ),
+            ) as response:
+                response.raise_for_status()
+                if target is None:
+                    return await response.read()
+                size = 0
+                async with aiofiles.open(target, "wb") as f:
+                    async for chunk in response.content.iter_chunked(
+                        _CHUNK_SIZE,
+                    ):
+                        await f.write(chunk)
+                        size += len(chunk)
+                return size
+        except _ERRORS as e:
+            return _error(e)
+
+    async def upload_workspace_file(
+        self,
+        local_path: str,
+        file_path: str,
+        chunk_size: int = _UPLOAD_CHUNK_SIZE,
+    ) -> dict:
+        """
+        Upload a local file to `file_path` in the workspace, resuming an
+        interrupted upload, see `AliasSandboxHttpClient.upload_workspace_file`.
+        """
+        endpoint = "/workspace/uploads"
+        try:
+            received = await self._request_json(
+                "get",
+                endpoint,
+                params={"file_path": file_path},
+            )
+            size = os.path.getsize(local_path)
+            offset = received["offset"] if received["offset"] <= size else 0
+            digest = hashlib.sha256()
+            async with aiofiles.open(local_path, "rb") as f:
+                # Resume only if the received bytes match the local file
+                remaining = offset
+                while remaining > 0:
+                    chunk = await f.read(min(remaining, chunk_size))
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+                if offset and digest.hexdigest() != received["sha256"]:
+                    offset = 0
+                    digest = hashlib.sha256()
+                    await f.seek(0)
+
+                while True:
+                    chunk = await f.read(chunk_size)
+                    digest.update(chunk)
+                    complete = offset + len(chunk) >= size
+                    params = {
+                        "file_path": file_path,
+                        "offset": offset,
+                        "complete": complete,
+                    }
+                    if complete:
+                        params["sha256"] = digest.hexdigest()
+                    result = await self._request_json(
+                        "put",
+                        endpoint,
+                        params=params,
+                        data=chunk,
+                        headers={"Content-Type": "application/octet-stream"},
+                    )
+                    offset = result["offset"]
+                    if complete:
+                        return result
+        except _ERRORS as e:
+            return _error(e)
+
+    async def create_workspace_directory(self, directory_path: str) -> dict:
+        try:
+            return await self._request_json(
+                "post",
+                "/workspace/directories",
+                params={"directory_path": directory_path},
+            )
+        except _ERRORS as e:
+            return _error(e)
+
+    async def delete_workspace_file(self, file_path: str) -> dict:
+        try:
+            return await self._request_json(
+                "delete",
+                "/workspace/files",
+                params={"file_path": file_path},
+            )
+        except _ERRORS as e:
+            return _error(e)
+
+    async def delete_workspace_directory(
+        self,
+        directory_path: str,
+        recursive: bool = False,
+    ) -> dict:
+        try:
+            return await self._request_json(
+                "delete",
+                "/workspace/directories",
+                params={
+                    "directory_path": directory_path,
+                    "recursive": recursive,
+                },
+            )
+        except _ERRORS as e:
+            return _error(e)
+
+    async def move_or_rename_workspace_item(
+        self,
+        source_path: str,
+        destination_path: str,
+    ) -> dict:
+        try:
+            return await self._request_json(
+                "put",
+                "/workspace/move",
+                params={
+                    "source_path": source_path,
+                    "destination_path": destination_path,
+                },
+            )
+        except _ERRORS as e:
+            return _error(e)
+
+    async def copy_workspace_item(
+        self,
+        source_path: str,
+        destination_path: str,
+        mode: str = "auto",
+    ) -> dict:
+        """Copy a file or directory within the /workspace directory, see
+        `AliasSandboxHttpClient.copy_workspace_item`."""
+        try:
+            return await self._request_json(
+                "post",
+                "/workspace/copy",
+                params={
+                    "source_path": source_path,
+                    "destination_path": destination_path,
+                    "mode": mode,
+                },
+            )
+        except _ERRORS as e:
+            return _error(e)
+
+    async def reset_workspace(
+        self,
+        preserve: Optional[list[str]] = None,
+    ) -> dict:
+        """Empty /workspace in a single call, keeping `preserve`."""
+        try:
+            return await self._request_json(
+                "post",
+                "/workspace/reset",
+                json={"preserve": preserve},
+            )
+        except _ERRORS as e:
+            return _error(e)
@@ -0,0 +1,981 @@
+# -*- coding: utf-8 -*-
+import copy
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import threading
+from typing import Iterator, Optional, Union
+
+import requests
+from pydantic import Field
+from urllib3.response import HAS_ZSTD
+
+from agentscope_runtime.sandbox.client import SandboxHttpClient
+from agentscope_runtime.sandbox.model import ContainerModel
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_ARCHIVE_CHUNK_SIZE = 64 * 1024
+_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Smaller request bodies are sent uncompressed
+COMPRESSION_MIN_SIZE = 1024
+# Extra seconds to wait beyond the timeout of a command or cell, for the
+# sandbox to kill it and its output to come back
+_TIMEOUT_MARGIN = 30
+
+
+def compress_body(body: bytes) -> tuple[str, bytes]:
+    """Compress a request body, return its content coding and the result."""
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(body)
+    return "gzip", gzip.compress(body, compresslevel=5)
+
+
+def _iter_tar(
+    local_paths: list[str],
+    results: dict[str, dict],
+    compression: str = "none",
+) -> Iterator[bytes]:
+    """Yield a tar archive of local files and directories chunk by chunk,
+    each stored under its base name.
+
+    The archive is written from disk by a background thread into a pipe,
+    so memory use does not depend on the size of the files. What every
+    path contributed is recorded into `results`, keyed by the path.
+
+    Raises:
+        OSError: After the last chunk, if a path could not be archived;
+            it and the paths after it are marked as failed in `results`.
+    """
+    read_fd, write_fd = os.pipe()
+    reader = os.fdopen(read_fd, "rb")
+    writer = os.fdopen(write_fd, "wb")
+    errors: list[Exception] = []
+
+    def _produce() -> None:
+        pending = list(local_paths)
+        try:
+            with writer:
+                target = writer
+                if compression == "zstd":
+                    target = zstandard.ZstdCompressor().stream_writer(
+                        writer,
+                        closefd=False,
+                    )
+                mode = "w|gz" if compression == "gzip" else "w|"
+                with tarfile.open(fileobj=target, mode=mode) as tar:
+                    while pending:
+                        local_path = pending[0]
+                        current = results[local_path]
+                        if current.get("isError", False):
+                            pending.pop(0)
+                            continue
+
+                        def _count(tarinfo, result=current):
+                            key = "directories" if tarinfo.isdir() else "files"
+                            result[key] += 1
+                            result["bytes"] += tarinfo.size
+                            return tarinfo
+
+                        tar.add(
+                            local_path,
+                            arcname=os.path.basename(
+                                os.path.normpath(local_path),
+                            ),
+                            filter=_count,
+                        )
+                        pending.pop(0)
+                if target is not writer:
+                    target.close()
+        except BrokenPipeError:
+            # The upload stopped, its error is reported by the request
+            pass
+        except Exception as e:
+            logger.error(f"Failed to archive {local_paths}: {e}")
+            errors.append(e)
+            if pending:
+                results[pending[0]].update({"isError": True, "error": str(e)})
+            for local_path in pending[1:]:
+                results[local_path].update(
+                    {
+                        "isError": True,
+                        "error": f"Not sent, archiving {pending[0]} failed",
+                    },
+                )
+
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+    try:
+        with reader:
+            while True:
+                chunk = reader.read(_ARCHIVE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        producer.join()
+    if errors:
+        # Aborts the upload, the archive is incomplete
+        raise OSError(f"Failed to archive {local_paths}: {errors[0]}")
+
+
+class AliasSandboxHttpClient(SandboxHttpClient):  # pylint: disable=R0904
+    """
+    HTTP client connecting to the Alias sandbox server directly, adding
+    the routes and optimizations that only the Alias sandbox provides.
+    """
+
+    def __init__(
+        self,
+        model: Optional[ContainerModel] = None,
+        timeout: int = 60,
+        domain: str = "localhost",
+    ) -> None:
+        super().__init__(model, timeout, domain)
+        self._tools_etag: Optional[str] = None
+        self._tools_cache: Optional[dict] = None
+        # Responses are decoded by urllib3, which knows zstd only with
+        # `backports.zstd` (or Python 3.14)
+        self.session.headers["Accept-Encoding"] = (
+            "zstd, gzip" if HAS_ZSTD else "gzip"
+        )
+
+    def _post_json(self, endpoint: str, payload: dict) -> requests.Response:
+        """POST a JSON payload, compressed if it is large."""
+        body = json.dumps(payload).encode("utf-8")
+        if len(body) < COMPRESSION_MIN_SIZE:
+            return self._request("post", endpoint, data=body)
+
+        coding, compressed = compress_body(body)
+        response = self._request(
+            "post",
+            endpoint,
+            data=compressed,
+            headers={"Content-Encoding": coding},
+        )
+        if response.status_code == 415:
+            # The server does not support this coding
+            response = self._request("post", endpoint, data=body)
+        return response
+
+    def list_tools(self, tool_type=None, **kwargs) -> dict:
+        """
+        List the tools of the sandbox, revalidating the locally cached
+        schemas with the server's ETag instead of re-fetching them.
+        """
+        try:
+            endpoint = f"{self.base_url}/mcp/list_tools"
+            headers = {}
+            if self._tools_etag and self._tools_cache is not None:
+                headers["If-None-Match"] = self._tools_etag
+            response = self._request(
+                "get",
+                endpoint,
+                headers=headers,
+            )
+            if response.status_code != 304:
+                response.raise_for_status()
+                self._tools_cache = response.json()
+                self._tools_etag = response.headers.get("ETag")
+            mcp_tools = copy.deepcopy(self._tools_cache)
+            mcp_tools["generic"] = self.generic_tools
+            if tool_type:
+                return {tool_type: mcp_tools.get(tool_type, {})}
+            return mcp_tools
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def call_tool(
+        self,
+        name: str,
+        arguments: Optional[dict] = None,
+        spill_threshold: Optional[int] = None,
+    ) -> dict:
+        """
+        Call a tool. With `spill_threshold`, an MCP tool result whose text
+        is longer than that many characters stays in the sandbox: it is
+        saved into a file under /workspace/tmp_files and only a head/tail
+        preview and the file path (also in `spilled`) are returned.
+        Large arguments and results are sent compressed.
+        """
+        if arguments is None:
+            arguments = {}
+        if name == "run_ipython_cell":
+            return self.run_ipython_cell(**arguments)
+        if name == "run_shell_command":
+            return self.run_shell_command(**arguments)
+
+        try:
+            endpoint = f"{self.base_url}/mcp/call_tool"
+            payload = {"tool_name": name, "arguments": arguments}
+            if spill_threshold is not None:
+                payload["spill_threshold"] = spill_threshold
+            response = self._post_json(endpoint, payload)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def run_ipython_cell(
+        self,
+        code: str = Field(
+            description="IPython code to execute",
+        ),
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> dict:
+        """Run an IPython cell, in the kernel of `session_id` if given."""
+        try:
+            endpoint = f"{self.base_url}/tools/run_ipython_cell"
+            payload = {"code": code}
+            if session_id:
+                payload["session_id"] = session_id
+            if timeout:
+                payload["timeout"] = timeout
+            response = self._request(
+                "post",
+                endpoint,
+                json=payload,
+                timeout=max(self.timeout, timeout or 0) + _TIMEOUT_MARGIN,
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def run_shell_command(
+        self,
+        command: str = Field(
+            description="Shell command to execute",
+        ),
+        timeout: Optional[float] = None,
+    ) -> dict:
+        """Run a shell command, killed after `timeout` seconds if given
+        instead of the default of the sandbox."""
+        try:
+            endpoint = f"{self.base_url}/tools/run_shell_command"
+            payload = {"command": command}
+            if timeout:
+                payload["timeout"] = timeout
+            response = self._request(
+                "post",
+                endpoint,
+                json=payload,
+                timeout=max(self.timeout, timeout or 0) + _TIMEOUT_MARGIN,
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def iter_shell_command(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+    ) -> Iterator[dict]:
+        """
+        Run a shell command and yield its output as it is produced, as
+        dicts of type `stdout` or `stderr` with the text in `data` and,
+        last, a dict of type `result` with `returncode` and `timed_out`.
+
+        Raises:
+            `requests.exceptions.RequestException` if the stream fails.
+        """
+        endpoint = f"{self.base_url}/tools/run_shell_command"
+        payload = {"command": command, "stream": "ndjson"}
+        if timeout:
+            payload["timeout"] = timeout
+        with self._request(
+            "post",
+            endpoint,
+            json=payload,
+            stream=True,
+            # The command may stay silent until the sandbox kills it
+            timeout=(
+                self.timeout,
+                max(self.timeout, timeout) if timeout else None,
+            ),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def interrupt_ipython_kernel(self, session_id: Optional[str] = None):
+        """Interrupt the running cell of a kernel session."""
+        try:
+            endpoint = f"{self.base_url}/tools/ipython/interrupt"
+            response = self._request(
+                "post",
+                endpoint,
+                json={"session_id": session_id},
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def shutdown_ipython_kernel(self, session_id: Optional[str] = None):
+        """Shut down the kernel of a session."""
+        try:
+            endpoint = f"{self.base_url}/tools/ipython/shutdown"
+            response = self._request(
+                "post",
+                endpoint,
+                json={"session_id": session_id},
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def download_workspace_archive(
+        self,
+        local_path: str,
+        directory: str = "/workspace",
+        compression: str = "none",
+        exclude: Optional[list[str]] = None,
+    ) -> dict:
+        """
+        Download a directory of the workspace as a tar archive into
+        `local_path`, streamed to disk chunk by chunk.
+        """
+        try:
+            endpoint = f"{self.base_url}/workspace/archive"
+            params = {"dir": directory, "compression": compression}
+            if exclude:
+                params["exclude"] = exclude
+            with self._request(
+                "get",
+                endpoint,
+                params=params,
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                size = 0
+                with open(local_path, "wb") as f:
+                    for chunk in response.iter_content(
+                        chunk_size=_ARCHIVE_CHUNK_SIZE,
+                    ):
+                        f.write(chunk)
+                        size += len(chunk)
+            return {"path": local_path, "size": size}
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def upload_workspace_archive(
+        self,
+        local_path: str,
+        directory: str = "/workspace",
+        compression: str = "auto",
+    ) -> dict:
+        """
+        Upload the tar archive at `local_path` and extract it into a
+        directory of the workspace.
+        """
+        try:
+            endpoint = f"{self.base_url}/workspace/archive"
+            with open(local_path, "rb") as f:
+                # A file object is sent without being read into memory
+                response = self._request(
+                    "post",
+                    endpoint,
+                    params={"dir": directory, "compression": compression},
+                    data=f,
+                    headers={"Content-Type": "application/octet-stream"},
+                )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def upload_workspace_files(
+        self,
+        local_paths: list[str],
+        directory: str = "/workspace",
+        compression: str = "none",
+    ) -> dict:
+        """
+        Upload local files and directories into a directory of the
+        workspace in a single request, as a tar archive streamed from
+        disk. Each path is stored under its base name.
+
+        Returns:
+            dict: Per local path in `results`, its `target_path` and the
+                numbers of `files`, `directories` and `bytes` sent, or
+                `isError` with the `error`. `skipped` lists the archive
+                members the sandbox refused, e.g. links pointing outside
+                of the workspace.
+        """
+        results = {}
+        targets = {}
+        for local_path in local_paths:
+            name = os.path.basename(os.path.normpath(local_path))
+            if not os.path.exists(local_path):
+                results[local_path] = {
+                    "isError": True,
+                    "error": "No such file or directory",
+                }
+            elif name in targets:
+                results[local_path] = {
+                    "isError": True,
+                    "error": f"Same name as {targets[name]}",
+                }
+            else:
+                targets[name] = local_path
+                results[local_path] = {
+                    "isError": False,
+                    "target_path": os.path.join(directory, name),
+                    "files": 0,
+                    "directories": 0,
+                    "bytes": 0,
+                }
+        if not targets:
+            return {"results": results, "skipped": []}
+
+        try:
+            endpoint = f"{self.base_url}/workspace/archive"
+            response = self._request(
+                "post",
+                endpoint,
+                params={"dir": directory, "compression": compression},
+                data=_iter_tar(list(targets.values()), results, compression),
+                headers={"Content-Type": "application/octet-stream"},
+            )
+            response.raise_for_status()
+            stats = response.json()
+        except (requests.exceptions.RequestException, OSError) as e:
+            logger.error(f"An error occurred: {e}")
+            for local_path in targets.values():
+                if not results[local_path]["isError"]:
+                    results[local_path].update(
+                        {"isError": True, "error": str(e)},
+                    )
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+                "results": results,
+            }
+
+        for member in stats["skipped"]:
+            local_path = targets.get(member.split("/", 1)[0])
+            if local_path is not None:
+                results[local_path].setdefault("skipped", []).append(member)
+        return {"results": results, "skipped": stats["skipped"]}
+
+    def read_workspace_file_lines(
+        self,
+        file_path: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> dict:
+        """
+        Read `limit` lines of a workspace file starting from (0-based) line
+        `offset`, without transferring the rest of the file.
+        """
+        try:
+            endpoint = f"{self.base_url}/workspace/files"
+            response = self._request(
+                "get",
+                endpoint,
+                params={
+                    "file_path": file_path,
+                    "lines": f"{offset}:{limit or ''}",
+                },
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def read_workspace_file_range(
+        self,
+        file_path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> Union[bytes, dict]:
+        """
+        Read the bytes `start` to `end` (inclusive, until the end of the
+        file if not given) of a workspace file.
+        """
+        try:
+            endpoint = f"{self.base_url}/workspace/files"
+            response = self._request(
+                "get",
+                endpoint,
+                params={"file_path": file_path},
+                headers={
+                    "Range": f"bytes={start}-{'' if end is None else end}",
+                },
+            )
+            response.raise_for_status()
+            return response.content
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def download_workspace_file(
+        self,
+        file_path: str,
+        target: Union[str, bytearray, memoryview, None] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Union[bytes, int, dict]:
+        """
+        Fetch a workspace file as raw bytes, streamed from the server.
+
+        Without `target`, the content is returned as `bytes`. `target` may
+        also be a local path to write the file to, or a writable buffer
+        (e.g. a `bytearray` or `memoryview`) to read it into; the number
+        of bytes is returned then. Files larger than `max_bytes` are
+        refused before any byte is sent.
+        """
+        try:
+            endpoint = f"{self.base_url}/workspace/files"
+            params = {"file_path": file_path}
+            if max_bytes is not None:
+                params["max_bytes"] = max_bytes
+            # The body is read raw, straight into `target`, and checked
+            # against its Content-Length, so it must not be compressed
+            with self._request(
+                "get",
+                endpoint,
+                params=params,
+                headers={"Accept-Encoding": "identity"},
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                size = int(response.headers["Content-Length"])
+                if target is None:
+                    content = response.raw.read()
+                elif isinstance(target, str):
+                    with open(target, "wb") as f:
+                        for chunk in response.iter_content(
+                            _ARCHIVE_CHUNK_SIZE,
+                        ):
+                            f.write(chunk)
+                    return size
+                else:
+                    view = memoryview(target).cast("B")
+                    if len(view) < size:
+                        raise ValueError(
+                            f"Buffer of {len(view)} bytes is too small for "
+                            f"{size} bytes.",
+                        )
+                    received = 0
+                    while received < size:
+                        count = response.raw.readinto(view[received:size])
+                        if not count:
+                            break
+                        received += count
+                    content = view[:received]
+                if len(content) != size:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"Received {len(content)} of {size} bytes.",
+                    )
+                return content if target is None else size
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def iter_workspace_entries(
+        self,
+        directory: str = "/workspace",
+        max_depth: Optional[int] = None,
+        include: Optional[list[str]] = None,
+        exclude: Optional[list[str]] = None,
+        stat: bool = False,
+        page_size: int = 1000,
+        checksum: bool = False,
+    ) -> Iterator[dict]:
+        """
+        Yield the entries under a workspace directory, fetching them page
+        by page as they are consumed. Each entry holds `type`, `path`
+        (relative to `directory`), with `stat` its `size` and `mtime` and,
+        with `checksum`, the `sha256` of files.
+
+        Raises:
+            `requests.exceptions.RequestException` if a page fails.
+        """
+        endpoint = f"{self.base_url}/workspace/entries"
+        params = {
+            "dir": directory,
+            "stat": stat,
+            "checksum": checksum,
+            "limit": page_size,
+        }
+        if max_depth is not None:
+            params["max_depth"] = max_depth
+        if include:
+            params["include"] = include
+        if exclude:
+            params["exclude"] = exclude
+
+        cursor = None
+        while True:
+            if cursor is not None:
+                params["cursor"] = cursor
+            with self._request(
+                "get",
+                endpoint,
+                params=params,
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                cursor = None
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    item = json.loads(line)
+                    if item["type"] == "end":
+                        cursor = item["next_cursor"]
+                        break
+                    yield item
+            if cursor is None:
+                return
+
+    def get_workspace_version(self) -> dict:
+        """Get the current `version` and `epoch` of the workspace."""
+        try:
+            endpoint = f"{self.base_url}/workspace/version"
+            response = self._request("get", endpoint)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def iter_workspace_events(
+        self,
+        since: Optional[int] = None,
+        epoch: Optional[str] = None,
+    ) -> Iterator[dict]:
+        """
+        Yield workspace change events as they happen, starting after
+        version `since`. On a `reset` event, cached views of the workspace
+        must be rebuilt since events were missed.
+
+        Raises:
+            `requests.exceptions.RequestException` if the stream fails.
+        """
+        endpoint = f"{self.base_url}/workspace/events"
+        params = {}
+        if since is not None:
+            params["since"] = since
+        if epoch is not None:
+            params["epoch"] = epoch
+        with self._request(
+            "get",
+            endpoint,
+            params=params,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data:"):
+                    yield json.loads(line[len("data:") :])
+
+    def upload_workspace_file(
+        self,
+        local_path: str,
+        file_path: str,
+        chunk_size: int = _UPLOAD_CHUNK_SIZE,
+    ) -> dict:
+        """
+        Upload a local (binary) file to `file_path` in the workspace, one
+        chunk per request. An interrupted upload resumes from the bytes
+        the sandbox already received, and the result is verified with its
+        SHA-256 digest.
+        """
+        try:
+            endpoint = f"{self.base_url}/workspace/uploads"
+            response = self._request(
+                "get",
+                endpoint,
+                params={"file_path": file_path},
+            )
+            response.raise_for_status()
+            received = response.json()
+
+            size = os.path.getsize(local_path)
+            offset = received["offset"] if received["offset"] <= size else 0
+            digest = hashlib.sha256()
+            with open(local_path, "rb") as f:
+                # Resume only if the received bytes match the local file
+                remaining = offset
+                while remaining > 0:
+                    chunk = f.read(min(remaining, chunk_size))
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+                if offset and digest.hexdigest() != received["sha256"]:
+                    offset = 0
+                    digest = hashlib.sha256()
+                    f.seek(0)
+
+                while True:
+                    chunk = f.read(chunk_size)
+                    digest.update(chunk)
+                    complete = offset + len(chunk) >= size
+                    params = {
+                        "file_path": file_path,
+                        "offset": offset,
+                        "complete": complete,
+                    }
+                    if complete:
+                        params["sha256"] = digest.hexdigest()
+                    response = self._request(
+                        "put",
+                        endpoint,
+                        params=params,
+                        data=chunk,
+                        headers={"Content-Type": "application/octet-stream"},
+                    )
+                    response.raise_for_status()
+                    offset = response.json()["offset"]
+                    if complete:
+                        return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def iter_search_workspace(
+        self,
+        pattern: str,
+        paths: Optional[list[str]] = None,
+        **options,
+    ) -> Iterator[dict]:
+        """
+        Search the content of workspace files, yielding the matches as the
+        sandbox finds them and, last, a dict of type `end` with statistics.
+        `options` are those of the `/workspace/search` endpoint, e.g.
+        `regex`, `ignore_case`, `context` or `max_matches`.
+
+        Raises:
+            `requests.exceptions.RequestException` if the search fails.
+        """
+        endpoint = f"{self.base_url}/workspace/search"
+        payload = {"pattern": pattern, **options}
+        if paths:
+            payload["paths"] = paths
+        with self._request(
+            "post",
+            endpoint,
+            json=payload,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def call_tools(
+        self,
+        calls: list[dict],
+        stop_on_error: bool = False,
+    ) -> dict:
+        """
+        Call several tools in one request. Each call is a dict with the
+        tool `name`, its `arguments`, an optional `id` and `depends_on`,
+        the ids or indices of earlier calls it waits for; the others run
+        concurrently. Returns the results in the order of `calls`.
+        """
+        try:
+            endpoint = f"{self.base_url}/tools/batch"
+            response = self._post_json(
+                endpoint,
+                {"calls": calls, "stop_on_error": stop_on_error},
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def copy_workspace_item(
+        self,
+        source_path: str,
+        destination_path: str,
+        mode: str = "auto",
+    ) -> dict:
+        """
+        Copy a file or directory within the /workspace directory. `mode`
+        is `auto` (copy-on-write clones where supported), `copy` or
+        `hardlink` (the copies share their content).
+        """
+        try:
+            endpoint = f"{self.base_url}/workspace/copy"
+            response = self._request(
+                "post",
+                endpoint,
+                params={
+                    "source_path": source_path,
+                    "destination_path": destination_path,
+                    "mode": mode,
+                },
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(
+                f"An error occurred while copying a workspace item: {e}",
+            )
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def create_workspace_snapshot(
+        self,
+        label: Optional[str] = None,
+        exclude: Optional[list[str]] = None,
+    ) -> dict:
+        """
+        Take an incremental snapshot of /workspace. Returns its summary,
+        with the `id` to restore it by.
+        """
+        try:
+            endpoint = f"{self.base_url}/workspace/snapshot"
+            response = self._request(
+                "post",
+                endpoint,
+                json={"label": label, "exclude": exclude},
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def reset_workspace(self, preserve: Optional[list[str]] = None) -> dict:
+        """
+        Empty /workspace in a single call, keeping the `preserve` relative
+        paths (glob patterns allowed). Returns the number of `removed`
+        entries and the `preserved` ones.
+        """
+        try:
+            endpoint = f"{self.base_url}/workspace/reset"
+            response = self._request(
+                "post",
+                endpoint,
+                json={"preserve": preserve},
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def restore_workspace_snapshot(self, snapshot_id: str) -> dict:
+        """Roll /workspace back to a snapshot."""
+        try:
+            endpoint = f"{self.base_url}/workspace/restore"
+            response = self._request(
+                "post",
+                endpoint,
+                json={"snapshot_id": snapshot_id},
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def list_workspace_snapshots(self) -> Union[list, dict]:
+        """List the snapshots of /workspace, oldest first."""
+        try:
+            endpoint = f"{self.base_url}/workspace/snapshots"
+            response = self._request("get", endpoint)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
+
+    def delete_workspace_snapshot(self, snapshot_id: str) -> dict:
+        """Delete a snapshot and the stored contents only it used."""
+        try:
+            endpoint = f"{self.base_url}/workspace/snapshots"
+            response = self._request(
+                "delete",
+                endpoint,
+                params={"snapshot_id": snapshot_id},
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            return {
+                "isError": True,
+                "content": [{"type": "text", "text": str(e)}],
+            }
@@ -2,12 +2,15 @@
 import logging
 
 from fastapi import FastAPI, Response, Depends
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from routers import (
     generic_router,
     mcp_router,
     watcher_router,
     workspace_router,
 )
+from routers.compression_utils import CompressionMiddleware
+from routers.metrics_utils import MetricsMiddleware
 from dependencies import verify_secret_token
 
 logging.basicConfig(level=logging.INFO)
@@ -30,6 +33,18 @@ async def healthz():
     return Response(content="OK", status_code=200)
 
 
+@app.get(
+    "/metrics",
+    summary="Export metrics in the Prometheus text format",
+    dependencies=[Depends(verify_secret_token)],
+)
+async def metrics():
+    return Response(
+        content=generate_latest(),
+        media_type=CONTENT_TYPE_LATEST,
+    )
+
+
 app.include_router(mcp_router, dependencies=[Depends(verify_secret_token)])
 app.include_router(generic_router, dependencies=[Depends(verify_secret_token)])
 app.include_router(watcher_router, dependencies=[Depends(verify_secret_token)])
@@ -37,6 +52,10 @@ app.include_router(
     workspace_router,
     dependencies=[Depends(verify_secret_token)],
 )
+app.add_middleware(CompressionMiddleware)
+# Latency, sizes and concurrency of the requests of all routers, added
+# last to wrap the compression: sizes are the ones on the wire
+app.add_middleware(MetricsMiddleware)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
-from .generic import generic_router
-from .mcp import mcp_router
-from .runtime_watcher import watcher_router
-from .workspace import workspace_router
-
-__all__ = [
-    "mcp_router",
-    "generic_router",
-    "watcher_router",
-    "workspace_router",
-]
+import importlib
+
+# Imported on first use, so that the agent can import the light modules
+# of the package (e.g. `hints`) without the dependencies of the server
+_ROUTER_MODULES = {
+    "mcp_router": ".mcp",
+    "generic_router": ".generic",
+    "watcher_router": ".runtime_watcher",
+    "workspace_router": ".workspace",
+}
+
+__all__ = list(_ROUTER_MODULES)
+
+
+def __getattr__(name: str):
+    if name not in _ROUTER_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_ROUTER_MODULES[name], __name__)
+    return getattr(module, name)
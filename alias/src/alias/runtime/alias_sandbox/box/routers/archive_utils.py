@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import fnmatch
+import logging
+import os
+import tarfile
+import threading
+from typing import BinaryIO, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .listing_utils import is_internal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def check_compression(compression: str) -> None:
+    """Raise `ValueError` if a compression is not available."""
+    if compression not in ("auto", "none", "gzip", "zstd"):
+        raise ValueError(f"Unsupported compression `{compression}`.")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression requires `zstandard`.")
+
+
+def iter_archive(
+    directory: str,
+    compression: str = "none",
+    exclude: Optional[list[str]] = None,
+) -> Iterator[bytes]:
+    """Yield a tar archive of `directory` chunk by chunk.
+
+    The archive is written by a background thread into a pipe, so memory
+    use does not depend on the size of the directory. Entries are named
+    relative to `directory`; those whose relative path matches one of the
+    `exclude` glob patterns are skipped together with their children.
+
+    Raises:
+        RuntimeError: After the last chunk, if the archive could not be
+            completed. Raising from the stream aborts the response, so
+            that clients do not take the truncated archive for a whole one.
+    """
+    check_compression(compression)
+    read_fd, write_fd = os.pipe()
+    reader = os.fdopen(read_fd, "rb")
+    writer = os.fdopen(write_fd, "wb")
+    errors: list[Exception] = []
+
+    def _filter(tarinfo: tarfile.TarInfo) -> Optional[tarfile.TarInfo]:
+        if is_internal(os.path.basename(tarinfo.name)):
+            return None
+        for pattern in exclude or []:
+            if fnmatch.fnmatch(tarinfo.name, pattern):
+                return None
+        return tarinfo
+
+    def _produce() -> None:
+        try:
+            with writer:
+                target = writer
+                if compression == "zstd":
+                    target = zstandard.ZstdCompressor().stream_writer(
+                        writer,
+                        closefd=False,
+                    )
+                mode = "w|gz" if compression == "gzip" else "w|"
+                with tarfile.open(fileobj=target, mode=mode) as tar:
+                    for entry in sorted(os.listdir(directory)):
+                        tar.add(
+                            os.path.join(directory, entry),
+                            arcname=entry,
+                            filter=_filter,
+                        )
+                if target is not writer:
+                    target.close()
+        except BrokenPipeError:
+            # The client went away, nothing left to do
+            pass
+        except Exception as e:
+            logger.error(f"Failed to archive {directory}: {e}")
+            errors.append(e)
+
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+    try:
+        with reader:
+            while True:
+                chunk = reader.read(ARCHIVE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        producer.join()
+    if errors:
+        raise RuntimeError(
+            f"Failed to archive {directory}: {errors[0]}",
+        ) from errors[0]
+
+
+def _is_within(path: str, base: str) -> bool:
+    return os.path.commonpath([path, base]) == base
+
+
+def _is_safe_member(member: tarfile.TarInfo, destination: str) -> bool:
+    if not (
+        member.isfile() or member.isdir() or member.issym() or member.islnk()
+    ):
+        # Devices, FIFOs, ...
+        return False
+
+    target = os.path.realpath(os.path.join(destination, member.name))
+    if not _is_within(target, destination):
+        return False
+
+    if member.issym():
+        if os.path.isabs(member.linkname):
+            return False
+        link_target = os.path.realpath(
+            os.path.join(os.path.dirname(target), member.linkname),
+        )
+        return _is_within(link_target, destination)
+    if member.islnk():
+        link_target = os.path.realpath(
+            os.path.join(destination, member.linkname),
+        )
+        return _is_within(link_target, destination)
+    return True
+
+
+def extract_archive(
+    fileobj: BinaryIO,
+    destination: str,
+    compression: str = "auto",
+    stats: Optional[dict] = None,
+) -> dict:
+    """Extract a tar archive read sequentially from `fileobj`.
+
+    Members that would end up outside `destination` (absolute paths, `..`,
+    links pointing outside) and special files are skipped.
+
+    Args:
+        stats (Optional[dict]): Filled in as the members are extracted, to
+            know what was extracted if this raises.
+
+    Returns:
+        The numbers of extracted files and directories, and the names of
+        the skipped members.
+    """
+    check_compression(compression)
+    destination = os.path.realpath(destination)
+
+    source = fileobj
+    if compression == "zstd":
+        source = zstandard.ZstdDecompressor().stream_reader(fileobj)
+    mode = {"auto": "r|*", "none": "r|", "gzip": "r|gz", "zstd": "r|"}[
+        compression
+    ]
+    # Python >= 3.12 (and backports) ship their own extraction filters
+    extract_kwargs = (
+        {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    )
+
+    if stats is None:
+        stats = {}
+    stats.update({"files": 0, "directories": 0, "skipped": []})
+    with tarfile.open(fileobj=source, mode=mode) as tar:
+        for member in tar:
+            if not _is_safe_member(member, destination):
+                stats["skipped"].append(member.name)
+                continue
+            try:
+                tar.extract(member, destination, **extract_kwargs)
+            except BaseException:
+                # Do not leave a truncated file behind
+                path = os.path.join(destination, member.name)
+                if member.isfile() and os.path.isfile(path):
+                    os.remove(path)
+                raise
+            if member.isdir():
+                stats["directories"] += 1
+            else:
+                stats["files"] += 1
+    return stats
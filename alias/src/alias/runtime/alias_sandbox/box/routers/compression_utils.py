@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import gzip
+import logging
+import os
+import re
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Smaller responses are not worth compressing
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Compressed request bodies are refused beyond this size once decompressed
+MAX_DECOMPRESSED_SIZE = int(
+    os.getenv("MAX_DECOMPRESSED_SIZE", str(256 * 1024 * 1024)),
+)
+
+_GZIP_LEVEL = 5
+_ZSTD_LEVEL = 3
+# Larger bodies are (de)compressed in a thread to keep the loop responsive
+_OFFLOAD_SIZE = 256 * 1024
+_COMPRESSED_TYPES = re.compile(
+    r"^(image|video|audio)/|^application/(gzip|zstd|zip|x-tar|pdf)",
+)
+_DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+class _TooLarge(Exception):
+    """A request body is larger than allowed."""
+
+
+def _encodings() -> list[str]:
+    """Supported content codings, in order of preference."""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def _compress(coding: str, data: bytes) -> bytes:
+    if coding == "zstd":
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=_GZIP_LEVEL)
+
+
+def _decompress(coding: str, data: bytes, limit: int) -> bytes:
+    """Decompress `data`, raising `_TooLarge` beyond `limit` bytes rather
+    than inflating a compression bomb."""
+    chunks, size = [], 0
+    if coding == "zstd":
+        # Streamed frames do not record their content size
+        with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+            while True:
+                chunk = reader.read(_DECOMPRESS_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise _TooLarge()
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    # Every member of the gzip stream, like `gzip.decompress`
+    while data:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunk = decompressor.decompress(data, limit - size + 1)
+        size += len(chunk)
+        if size > limit:
+            raise _TooLarge()
+        if not decompressor.eof:
+            raise EOFError("Compressed file ended before the end-of-stream")
+        chunks.append(chunk)
+        data = decompressor.unused_data
+    return b"".join(chunks)
+
+
+async def _run(func, coding: str, data: bytes, *args) -> bytes:
+    if len(data) >= _OFFLOAD_SIZE:
+        return await asyncio.to_thread(func, coding, data, *args)
+    return func(coding, data, *args)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the content coding for a response from an `Accept-Encoding`
+    header, `None` for no compression."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                weight = float(match.group(1))
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    candidates = [
+        coding
+        for coding in _encodings()
+        if weights.get(coding, weights.get("*", 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+    return max(
+        candidates,
+        key=lambda c: weights.get(c, weights.get("*", 0.0)),
+    )
+
+
+class CompressionMiddleware:
+    """ASGI middleware for gzip/zstd compressed bodies.
+
+    Request bodies sent with a `Content-Encoding` are decompressed before
+    they reach the routes. Responses are compressed with the coding
+    negotiated from `Accept-Encoding` if they are sent in one piece and
+    have at least `minimum_size` bytes. Streamed responses (NDJSON, event
+    streams and archives) and files are passed through untouched, so that
+    they still reach the client as they are produced, byte for byte.
+    Request bodies larger than `max_decompressed_size` once decompressed
+    are refused with 413.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        max_decompressed_size: int = MAX_DECOMPRESSED_SIZE,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_decompressed_size = max_decompressed_size
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_encoding = headers.get("content-encoding", "identity")
+        content_encoding = content_encoding.strip().lower()
+        if content_encoding != "identity":
+            if content_encoding not in _encodings():
+                response = PlainTextResponse(
+                    f"Unsupported Content-Encoding: {content_encoding}",
+                    status_code=415,
+                )
+                await response(scope, receive, send)
+                return
+            try:
+                decoded_scope, receive = await self._decoded_request(
+                    scope,
+                    receive,
+                    content_encoding,
+                )
+            except _TooLarge:
+                response = PlainTextResponse(
+                    "Request body too large, at most "
+                    f"{self.max_decompressed_size} bytes once decompressed",
+                    status_code=413,
+                )
+                await response(scope, receive, send)
+                return
+            if decoded_scope is None:
+                response = PlainTextResponse(
+                    f"Invalid {content_encoding} request body",
+                    status_code=400,
+                )
+                await response(scope, receive, send)
+                return
+            scope = decoded_scope
+
+        coding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+        else:
+            await self.app(scope, receive, self._compressing(coding, send))
+
+    async def _decoded_request(self, scope, receive, coding: str):
+        chunks, size = [], 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > self.max_decompressed_size:
+                raise _TooLarge()
+            more_body = message.get("more_body", False)
+        try:
+            body = await _run(
+                _decompress,
+                coding,
+                b"".join(chunks),
+                self.max_decompressed_size,
+            )
+        except _TooLarge:
+            raise
+        except Exception as e:
+            logger.warning(f"Cannot decompress the request body: {e}")
+            return None, receive
+
+        scope = dict(scope)
+        scope["headers"] = [
+            (key, value)
+            for key, value in scope["headers"]
+            if key not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode())]
+        replayed = False
+
+        async def receive_decoded():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body}
+            return await receive()
+
+        return scope, receive_decoded
+
+    def _compressible(self, start, response_headers, message) -> bool:
+        if message["type"] != "http.response.body":
+            return False
+        if message.get("more_body", False):
+            # Streamed response
+            return False
+        if start["status"] in (204, 206, 304):
+            return False
+        # `Accept-Ranges` marks a `FileResponse`, sent as is so that clients
+        # can read it raw and resume it with ranges
+        if (
+            "content-encoding" in response_headers
+            or "accept-ranges" in response_headers
+        ):
+            return False
+        if _COMPRESSED_TYPES.match(response_headers.get("content-type", "")):
+            return False
+        return len(message.get("body", b"")) >= self.minimum_size
+
+    def _compressing(self, coding: str, send):
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            response_headers = MutableHeaders(raw=start["headers"])
+            if not self._compressible(start, response_headers, message):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = await _run(_compress, coding, message["body"])
+            response_headers["Content-Encoding"] = coding
+            response_headers["Content-Length"] = str(len(compressed))
+            response_headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        return send_wrapper
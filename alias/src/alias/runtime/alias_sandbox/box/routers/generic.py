@@ -1,22 +1,28 @@
 # -*- coding: utf-8 -*-
-import io
-import sys
+import asyncio
+import json
 import logging
-import subprocess
+import os
 import traceback
-from contextlib import redirect_stderr, redirect_stdout
+from typing import Literal, Optional
 
 from fastapi import APIRouter, Body, HTTPException
-from IPython.core.interactiveshell import InteractiveShell
+from fastapi.responses import StreamingResponse
 from mcp.types import CallToolResult, TextContent
 
+from .kernel_utils import DEFAULT_CELL_TIMEOUT, DEFAULT_SESSION_ID, KernelPool
+from .mcp import call_tool
+from .metrics_utils import observe_kernel_pool
+from .shell_utils import DEFAULT_SHELL_TIMEOUT, run_command, stream_command
+
 SPLIT_OUTPUT_MODE = True
 
 
 generic_router = APIRouter()
 
-# Initialize IPython shell
-ipy = InteractiveShell.instance()
+# Isolated IPython kernels, one per session
+kernel_pool = KernelPool()
+observe_kernel_pool(kernel_pool.stats)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,6 +38,18 @@ async def run_ipython_cell(
         example="print('Hello World')",
         embed=True,
     ),
+    session_id: Optional[str] = Body(
+        None,
+        description="Kernel session to run the cell in, sessions do not "
+        "share variables or output.",
+        embed=True,
+    ),
+    timeout: Optional[float] = Body(
+        DEFAULT_CELL_TIMEOUT,
+        description="Seconds before the cell is interrupted, no limit if "
+        "empty.",
+        embed=True,
+    ),
 ):
     """
     Execute code in an IPython kernel and return the results.
@@ -40,33 +58,11 @@ async def run_ipython_cell(
         if not code:
             raise HTTPException(status_code=400, detail="Code is required.")
 
-        # Capture stdout and stderr separately
-        stdout_buf = io.StringIO()
-        stderr_buf = io.StringIO()
-
-        with redirect_stdout(stdout_buf), redirect_stderr(stderr_buf):
-            preprocessing_exc_tuple = None
-            try:
-                transformed_cell = ipy.transform_cell(code)
-            except Exception:
-                transformed_cell = code
-                preprocessing_exc_tuple = sys.exc_info()
-
-            if transformed_cell is None:
-                raise HTTPException(
-                    status_code=500,
-                    detail="IPython cell transformation failed: "
-                    "transformed_cell is None.",
-                )
-
-            await ipy.run_cell_async(
-                code,
-                transformed_cell=transformed_cell,
-                preprocessing_exc_tuple=preprocessing_exc_tuple,
-            )
+        kernel = await kernel_pool.get(session_id or DEFAULT_SESSION_ID)
+        result = await kernel.execute(code, timeout=timeout)
 
-        stdout_content = stdout_buf.getvalue()
-        stderr_content = stderr_buf.getvalue()
+        stdout_content = result.stdout
+        stderr_content = result.stderr
 
         content_list = []
 
@@ -110,6 +106,109 @@ async def run_ipython_cell(
         ) from e
 
 
+@generic_router.post(
+    "/tools/ipython/interrupt",
+    summary="Interrupt the running cell of an IPython kernel session",
+)
+async def interrupt_ipython_kernel(
+    session_id: Optional[str] = Body(
+        None,
+        embed=True,
+    ),
+):
+    kernel = kernel_pool.find(session_id or DEFAULT_SESSION_ID)
+    if kernel is None:
+        raise HTTPException(status_code=404, detail="Kernel not found.")
+    try:
+        await kernel.interrupt()
+        return {"message": "Kernel interrupted."}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"{str(e)}: {traceback.format_exc()}",
+        ) from e
+
+
+@generic_router.post(
+    "/tools/ipython/shutdown",
+    summary="Shut down the IPython kernel of a session",
+)
+async def shutdown_ipython_kernel(
+    session_id: Optional[str] = Body(
+        None,
+        embed=True,
+    ),
+):
+    if not await kernel_pool.remove(session_id or DEFAULT_SESSION_ID):
+        raise HTTPException(status_code=404, detail="Kernel not found.")
+    return {"message": "Kernel shut down."}
+
+
+@generic_router.get(
+    "/tools/ipython/kernels",
+    summary="List the running IPython kernel sessions",
+)
+async def list_ipython_kernels():
+    return {"kernels": kernel_pool.describe(), **kernel_pool.stats()}
+
+
+@generic_router.on_event("shutdown")
+async def shutdown_kernels() -> None:
+    await kernel_pool.shutdown()
+
+
+def _shell_result(result) -> dict:
+    """The tool result of a finished shell command."""
+    stdout_content = result.stdout
+    stderr_content = result.stderr
+
+    content_list = []
+
+    if SPLIT_OUTPUT_MODE:
+        content_list.append(
+            TextContent(
+                type="text",
+                text=stdout_content,
+                description="stdout",
+            ),
+        )
+
+        if stderr_content:
+            content_list.append(
+                TextContent(
+                    type="text",
+                    text=stderr_content,
+                    description="stderr",
+                ),
+            )
+        content_list.append(
+            TextContent(
+                type="text",
+                text=str(result.returncode),
+                description="returncode",
+            ),
+        )
+    else:
+        content_list.append(
+            TextContent(
+                type="text",
+                text=stdout_content
+                + "\n"
+                + stderr_content
+                + "\n"
+                + str(result.returncode),
+                description="output",
+            ),
+        )
+
+    is_error = bool(stderr_content)
+
+    return CallToolResult(
+        content=content_list,
+        isError=is_error,
+    ).model_dump()
+
+
 @generic_router.post(
     "/tools/run_shell_command",
     summary="Invoke a shell command.",
@@ -120,6 +219,18 @@ async def run_shell_command(
         example="pwd",
         embed=True,
     ),
+    timeout: Optional[float] = Body(
+        DEFAULT_SHELL_TIMEOUT,
+        description="Seconds before the command is killed, no limit if "
+        "empty.",
+        embed=True,
+    ),
+    stream: Optional[Literal["ndjson", "sse"]] = Body(
+        None,
+        description="Stream stdout/stderr chunks as they are produced, "
+        "either as NDJSON lines or server-sent events.",
+        embed=True,
+    ),
 ):
     """
     Execute a shell command and return the results.
@@ -128,63 +239,167 @@ async def run_shell_command(
         if not command:
             raise HTTPException(status_code=400, detail="Command is required.")
 
-        result = subprocess.run(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=False,
-        )
-        stdout_content = result.stdout
-        stderr_content = result.stderr
+        if stream:
+            return StreamingResponse(
+                _format_stream(stream_command(command, timeout), stream),
+                media_type="text/event-stream"
+                if stream == "sse"
+                else "application/x-ndjson",
+            )
 
-        content_list = []
+        result = await run_command(command, timeout=timeout)
+        return _shell_result(result)
 
-        if SPLIT_OUTPUT_MODE:
-            content_list.append(
-                TextContent(
-                    type="text",
-                    text=stdout_content,
-                    description="stdout",
-                ),
-            )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"{str(e)}: {traceback.format_exc()}",
+        ) from e
 
-            if stderr_content:
-                content_list.append(
-                    TextContent(
-                        type="text",
-                        text=stderr_content,
-                        description="stderr",
-                    ),
-                )
-            content_list.append(
-                TextContent(
-                    type="text",
-                    text=str(result.returncode),
-                    description="returncode",
-                ),
-            )
+
+async def _format_stream(events, stream_format: str):
+    async for event in events:
+        line = json.dumps(event, ensure_ascii=False)
+        if stream_format == "sse":
+            yield f"event: {event['type']}\ndata: {line}\n\n"
         else:
-            content_list.append(
-                TextContent(
-                    type="text",
-                    text=stdout_content
-                    + "\n"
-                    + stderr_content
-                    + "\n"
-                    + str(result.returncode),
-                    description="output",
-                ),
+            yield line + "\n"
+
+
+# Number of calls of a batch running at the same time
+BATCH_CONCURRENCY = int(os.getenv("TOOL_BATCH_CONCURRENCY", "8"))
+
+
+def _error_result(text: str, **extra) -> dict:
+    return {
+        "isError": True,
+        "content": [{"type": "text", "text": text}],
+        **extra,
+    }
+
+
+def _failed(result: dict) -> bool:
+    # Shell commands fail by their exit status, output on stderr (progress,
+    # warnings) does not prevent the calls depending on them
+    if "returncode" in result:
+        return result["returncode"] != 0
+    return bool(result.get("isError"))
+
+
+async def _call_batched_tool(name: str, arguments: dict) -> dict:
+    # Endpoints called directly need all their arguments explicitly
+    try:
+        if name == "run_shell_command":
+            if not arguments.get("command"):
+                return _error_result("Command is required.")
+            result = await run_command(
+                arguments["command"],
+                timeout=arguments.get("timeout", DEFAULT_SHELL_TIMEOUT),
+            )
+            return {**_shell_result(result), "returncode": result.returncode}
+        if name == "run_ipython_cell":
+            return await run_ipython_cell(
+                code=arguments.get("code"),
+                session_id=arguments.get("session_id"),
+                timeout=arguments.get("timeout", DEFAULT_CELL_TIMEOUT),
             )
+        return await call_tool(
+            tool_name=name,
+            arguments=arguments,
+            spill_threshold=None,
+        )
+    except HTTPException as e:
+        return _error_result(str(e.detail))
+    except Exception as e:
+        return _error_result(f"{str(e)}: {traceback.format_exc()}")
 
-        is_error = bool(stderr_content)
 
-        return CallToolResult(
-            content=content_list,
-            isError=is_error,
-        ).model_dump()
+@generic_router.post(
+    "/tools/batch",
+    summary="Invoke several MCP or generic tools in one request",
+)
+async def batch_call_tools(
+    calls: list[dict] = Body(
+        ...,
+        example=[
+            {"id": "mkdir", "name": "run_shell_command", "arguments": {}},
+            {"name": "write_file", "arguments": {}, "depends_on": ["mkdir"]},
+        ],
+        description="Tool calls, each with a `name`, its `arguments`, an "
+        "optional `id` and `depends_on`: ids or indices of earlier calls "
+        "to wait for.",
+        embed=True,
+    ),
+    stop_on_error: bool = Body(
+        False,
+        description="Skip the calls not started yet once a call failed.",
+        embed=True,
+    ),
+):
+    """
+    Run the calls, those without pending dependencies concurrently, and
+    return their results in the order of `calls`. A call is skipped if one
+    of its dependencies failed: returned an error or, for shell commands,
+    a non-zero exit status (given as `returncode`).
+    """
+    try:
+        positions = {}
+        for i, call in enumerate(calls):
+            if not isinstance(call, dict) or not call.get("name"):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Call {i} has no tool name.",
+                )
+            positions[str(i)] = i
+            if call.get("id") is not None:
+                positions[str(call["id"])] = i
+
+        dependencies = []
+        for i, call in enumerate(calls):
+            indices = []
+            for ref in call.get("depends_on") or []:
+                index = positions.get(str(ref))
+                # Only earlier calls, so that there cannot be cycles
+                if index is None or index >= i:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Call {i} depends on `{ref}`, which is "
+                        f"not an earlier call of the batch.",
+                    )
+                indices.append(index)
+            dependencies.append(indices)
+
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        failed = asyncio.Event()
+        tasks: list[asyncio.Task] = []
+
+        async def run(i: int) -> dict:
+            for index in dependencies[i]:
+                result = await tasks[index]
+                if _failed(result):
+                    return _error_result(
+                        f"Skipped, the call {index} it depends on failed.",
+                        skipped=True,
+                    )
+            async with semaphore:
+                if stop_on_error and failed.is_set():
+                    return _error_result(
+                        "Skipped, an earlier call failed.",
+                        skipped=True,
+                    )
+                result = await _call_batched_tool(
+                    calls[i]["name"],
+                    calls[i].get("arguments") or {},
+                )
+            if _failed(result):
+                failed.set()
+            return result
 
+        for i in range(len(calls)):
+            tasks.append(asyncio.create_task(run(i)))
+        return {"results": await asyncio.gather(*tasks)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+# Shared by the sandbox server and the agent, which imports it as
+# `alias.runtime.alias_sandbox.box.routers.hints`: keep it free of dependencies
+
+# Appended to the preview of a long text saved into a file, `{path}` is the
+# path of that file
+LONG_TEXT_FILE_HINT = (
+    "Don't try to read the complete file directly. "
+    "Use the `search_file_contents` tool (or "
+    "`grep -C 10 'YOUR_PATTERN' {path}`) or "
+    "other bash command to extract useful information."
+)
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import os
+import queue
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from jupyter_client.manager import AsyncKernelManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_ID = "default"
+
+# Default timeout (seconds) of a cell execution, `0` means no limit
+DEFAULT_CELL_TIMEOUT = float(os.getenv("IPYTHON_CELL_TIMEOUT", "0")) or None
+# Kernels unused for longer than this (seconds) are shut down
+KERNEL_IDLE_TIMEOUT = float(os.getenv("IPYTHON_KERNEL_IDLE_TIMEOUT", "1800"))
+MAX_KERNELS = int(os.getenv("IPYTHON_MAX_KERNELS", "8"))
+
+_KERNEL_START_TIMEOUT = 60
+# Seconds an interrupted cell gets to stop before the kernel is restarted
+_INTERRUPT_GRACE = 5
+_REAP_INTERVAL = 60
+# Seconds between checks that the kernel of a running cell is still alive
+_ALIVE_CHECK_INTERVAL = 5
+
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+
+@dataclass
+class CellResult:
+    """Collected output of an executed cell."""
+
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+
+
+class KernelSession:
+    """An IPython kernel process owned by a single session."""
+
+    def __init__(self, session_id: str) -> None:
+        self.session_id = session_id
+        self.kernel_manager = AsyncKernelManager(kernel_name="python3")
+        self.client = None
+        self.last_used = time.monotonic()
+        self._lock = asyncio.Lock()
+        # Cells running or waiting to run on this kernel
+        self._pending = 0
+
+    @property
+    def executing(self) -> bool:
+        return self._pending > 0
+
+    async def start(self) -> None:
+        """Start the kernel process and wait until it accepts requests."""
+        await self.kernel_manager.start_kernel(cwd=os.getcwd())
+        self.client = self.kernel_manager.client()
+        self.client.start_channels()
+        try:
+            await self.client.wait_for_ready(timeout=_KERNEL_START_TIMEOUT)
+        except Exception:
+            await self.shutdown()
+            raise
+
+    async def restart(self) -> None:
+        """Restart the kernel, dropping its namespace."""
+        await self.kernel_manager.restart_kernel(now=True)
+        await self.client.wait_for_ready(timeout=_KERNEL_START_TIMEOUT)
+
+    async def interrupt(self) -> None:
+        """Interrupt the running cell, if any."""
+        await self.kernel_manager.interrupt_kernel()
+
+    async def shutdown(self) -> None:
+        """Stop the kernel process."""
+        try:
+            if self.client is not None:
+                self.client.stop_channels()
+            await self.kernel_manager.shutdown_kernel(now=True)
+        except Exception as e:
+            logger.warning(
+                f"Failed to shutdown kernel of session {self.session_id}: "
+                f"{e}",
+            )
+
+    async def execute(
+        self,
+        code: str,
+        timeout: Optional[float] = DEFAULT_CELL_TIMEOUT,
+    ) -> CellResult:
+        """Execute a cell, cells of the same session run one at a time.
+
+        If the cell runs out of time it is interrupted; if it does not stop
+        within a grace period the kernel is restarted.
+        """
+        self._pending += 1
+        try:
+            async with self._lock:
+                if not await self.kernel_manager.is_alive():
+                    logger.warning(
+                        f"Kernel of session {self.session_id} died, "
+                        f"restarting it.",
+                    )
+                    await self.restart()
+                return await self._execute(code, timeout)
+        finally:
+            self._pending -= 1
+            self.last_used = time.monotonic()
+
+    async def _execute(  # pylint: disable=R0912
+        self,
+        code: str,
+        timeout: Optional[float],
+    ) -> CellResult:
+        msg_id = self.client.execute(
+            code,
+            store_history=True,
+            allow_stdin=False,
+        )
+        stdout, stderr = [], []
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        timed_out = False
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0 and timed_out:
+                    await self.restart()
+                    stderr.append(
+                        "Kernel did not respond to the interrupt and was "
+                        "restarted, all variables are lost.\n",
+                    )
+                    break
+                if remaining <= 0:
+                    timed_out = True
+                    stderr.append(
+                        f"\nCell execution timed out after {timeout} "
+                        f"seconds and was interrupted.\n",
+                    )
+                    await self.interrupt()
+                    deadline = loop.time() + _INTERRUPT_GRACE
+                    continue
+
+            try:
+                # Bounded, a dead kernel never reports that it is idle
+                msg = await self.client.get_iopub_msg(
+                    timeout=_ALIVE_CHECK_INTERVAL
+                    if remaining is None
+                    else min(remaining, _ALIVE_CHECK_INTERVAL),
+                )
+            except queue.Empty:
+                if not await self.kernel_manager.is_alive():
+                    stderr.append(
+                        "\nKernel died while executing the cell, it is "
+                        "restarted on the next cell and all variables are "
+                        "lost.\n",
+                    )
+                    break
+                continue
+
+            if msg["parent_header"].get("msg_id") != msg_id:
+                continue
+            msg_type, content = msg["msg_type"], msg["content"]
+            if msg_type == "stream":
+                if content["name"] == "stderr":
+                    stderr.append(content["text"])
+                else:
+                    stdout.append(content["text"])
+            elif msg_type in ("execute_result", "display_data"):
+                text = content.get("data", {}).get("text/plain")
+                if text:
+                    stdout.append(text + "\n")
+            elif msg_type == "error":
+                traceback_text = "\n".join(content["traceback"])
+                stderr.append(_ANSI_ESCAPE.sub("", traceback_text) + "\n")
+            elif msg_type == "status" and content["execution_state"] == "idle":
+                break
+
+        return CellResult(
+            stdout="".join(stdout),
+            stderr="".join(stderr),
+            timed_out=timed_out,
+        )
+
+
+class KernelPool:
+    """Isolated IPython kernels keyed by session, with idle eviction."""
+
+    def __init__(
+        self,
+        max_kernels: int = MAX_KERNELS,
+        idle_timeout: float = KERNEL_IDLE_TIMEOUT,
+    ) -> None:
+        self.max_kernels = max_kernels
+        self.idle_timeout = idle_timeout
+        self._kernels: dict[str, KernelSession] = {}
+        # Kernels being started, they hold a slot already
+        self._starting: dict[str, asyncio.Task] = {}
+        self._lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def get(self, session_id: str) -> KernelSession:
+        """Return the kernel of a session, starting one if needed."""
+        kernel = self._kernels.get(session_id)
+        if kernel is not None:
+            return kernel
+
+        async with self._lock:
+            kernel = self._kernels.get(session_id)
+            if kernel is not None:
+                return kernel
+
+            starting = self._starting.get(session_id)
+            if starting is None:
+                if (
+                    len(self._kernels) + len(self._starting)
+                    >= self.max_kernels
+                ):
+                    idle = [
+                        k for k in self._kernels.values() if not k.executing
+                    ]
+                    if not idle:
+                        raise RuntimeError(
+                            f"All {self.max_kernels} kernels are busy.",
+                        )
+                    victim = min(idle, key=lambda k: k.last_used)
+                    logger.info(
+                        f"Evicting kernel of session {victim.session_id}",
+                    )
+                    await self._remove(victim.session_id)
+
+                # Started outside of the lock, kernels of other sessions
+                # need not wait for it
+                starting = asyncio.create_task(self._start(session_id))
+                self._starting[session_id] = starting
+
+        # Shielded, the start goes on for the other callers if one of them
+        # is cancelled
+        return await asyncio.shield(starting)
+
+    async def _start(self, session_id: str) -> KernelSession:
+        kernel = KernelSession(session_id)
+        try:
+            await kernel.start()
+            self._kernels[session_id] = kernel
+        finally:
+            self._starting.pop(session_id, None)
+
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_idle())
+        return kernel
+
+    def find(self, session_id: str) -> Optional[KernelSession]:
+        return self._kernels.get(session_id)
+
+    async def remove(self, session_id: str) -> bool:
+        """Shut down the kernel of a session, return whether it existed."""
+        async with self._lock:
+            return await self._remove(session_id)
+
+    async def _remove(self, session_id: str) -> bool:
+        kernel = self._kernels.pop(session_id, None)
+        if kernel is None:
+            return False
+        await kernel.shutdown()
+        return True
+
+    async def shutdown(self) -> None:
+        """Shut down all kernels."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+        async with self._lock:
+            for session_id in list(self._kernels):
+                await self._remove(session_id)
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._kernels),
+            "starting": len(self._starting),
+            "busy": sum(k.executing for k in self._kernels.values()),
+            "max_kernels": self.max_kernels,
+        }
+
+    def describe(self) -> dict:
+        now = time.monotonic()
+        return {
+            session_id: {
+                "executing": kernel.executing,
+                "idle_seconds": round(now - kernel.last_used, 3),
+            }
+            for session_id, kernel in self._kernels.items()
+        }
+
+    async def _reap_idle(self) -> None:
+        while self._kernels:
+            await asyncio.sleep(_REAP_INTERVAL)
+            now = time.monotonic()
+            for session_id, kernel in list(self._kernels.items()):
+                if (
+                    not kernel.executing
+                    and now - kernel.last_used > self.idle_timeout
+                ):
+                    logger.info(f"Shutting down idle kernel {session_id}")
+                    await self.remove(session_id)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import bisect
+import logging
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Size of the blocks whose newline counts are indexed
+LINE_INDEX_BLOCK_SIZE = 64 * 1024
+# Number of files whose index is kept in memory
+LINE_INDEX_CACHE_SIZE = int(os.getenv("LINE_INDEX_CACHE_SIZE", "128"))
+
+_READ_CHUNK_SIZE = 64 * 1024
+
+
+class LineIndex:
+    """Newline index of a file, valid as long as its mtime and size are.
+
+    Instead of the offset of every line, the index stores the number of
+    newlines before each fixed-size block of the file. It stays small for
+    multi-GB files, and locating a line only scans the block containing it.
+    """
+
+    def __init__(self, path: str, stat_result: os.stat_result) -> None:
+        self.path = path
+        self.mtime_ns = stat_result.st_mtime_ns
+        self.size = stat_result.st_size
+        self.newlines_before = array("Q")
+        self.total_newlines = 0
+        self.ends_with_newline = False
+
+    @classmethod
+    def build(cls, path: str) -> "LineIndex":
+        with open(path, "rb") as f:
+            index = cls(path, os.fstat(f.fileno()))
+            last = b""
+            while True:
+                block = f.read(LINE_INDEX_BLOCK_SIZE)
+                if not block:
+                    break
+                index.newlines_before.append(index.total_newlines)
+                index.total_newlines += block.count(b"\n")
+                last = block[-1:]
+        index.ends_with_newline = last == b"\n"
+        return index
+
+    def is_valid(self, stat_result: os.stat_result) -> bool:
+        return (
+            stat_result.st_mtime_ns == self.mtime_ns
+            and stat_result.st_size == self.size
+        )
+
+    @property
+    def total_lines(self) -> int:
+        if self.size and not self.ends_with_newline:
+            return self.total_newlines + 1
+        return self.total_newlines
+
+    def line_offset(self, f, line: int) -> int:
+        """Return the byte offset at which (0-based) `line` starts."""
+        if line <= 0:
+            return 0
+        if line > self.total_newlines:
+            return self.size
+        # The block containing the `line`-th newline
+        block = bisect.bisect_left(self.newlines_before, line) - 1
+        remaining = line - self.newlines_before[block]
+        block_start = block * LINE_INDEX_BLOCK_SIZE
+        f.seek(block_start)
+        data = f.read(LINE_INDEX_BLOCK_SIZE)
+        position = -1
+        for _ in range(remaining):
+            position = data.index(b"\n", position + 1)
+        return block_start + position + 1
+
+
+_INDEXES: OrderedDict[str, LineIndex] = OrderedDict()
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_line_index(path: str) -> LineIndex:
+    """Return the line index of a file, rebuilding it if the file changed."""
+    path = os.path.realpath(path)
+    stat_result = os.stat(path)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(path)
+        if index is not None and index.is_valid(stat_result):
+            _INDEXES.move_to_end(path)
+            return index
+
+    index = LineIndex.build(path)
+    with _INDEXES_LOCK:
+        _INDEXES[path] = index
+        _INDEXES.move_to_end(path)
+        while len(_INDEXES) > LINE_INDEX_CACHE_SIZE:
+            _INDEXES.popitem(last=False)
+    return index
+
+
+def parse_line_range(lines: str) -> tuple[int, Optional[int]]:
+    """Parse a `offset:limit` line range, `limit` may be left empty."""
+    offset, sep, limit = lines.partition(":")
+    try:
+        start = int(offset) if offset else 0
+        count = int(limit) if sep and limit else None
+    except ValueError as e:
+        raise ValueError(
+            f"Invalid line range `{lines}`, expected `offset:limit`.",
+        ) from e
+    if start < 0 or (count is not None and count < 1):
+        raise ValueError(
+            f"Invalid line range `{lines}`, offset must be >= 0 and "
+            f"limit >= 1.",
+        )
+    return start, count
+
+
+def read_lines(path: str, offset: int, limit: Optional[int]) -> dict:
+    """Read `limit` lines of a file starting from (0-based) line `offset`.
+
+    Only the requested lines and one index block are read from disk, once
+    the index of the file is built.
+    """
+    index = get_line_index(path)
+    total_lines = index.total_lines
+    end = total_lines if limit is None else min(offset + limit, total_lines)
+    content = ""
+    if offset < end:
+        with open(path, "rb") as f:
+            start_offset = index.line_offset(f, offset)
+            end_offset = index.line_offset(f, end)
+            f.seek(start_offset)
+            remaining = end_offset - start_offset
+            chunks = []
+            while remaining > 0:
+                chunk = f.read(min(remaining, _READ_CHUNK_SIZE))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+        content = b"".join(chunks).decode("utf-8", errors="replace")
+    return {
+        "content": content,
+        "offset": offset,
+        "lines_read": max(end - offset, 0),
+        "total_lines": total_lines,
+    }
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+# Number of file digests kept in memory
+DIGEST_CACHE_SIZE = int(os.getenv("DIGEST_CACHE_SIZE", "100000"))
+
+# Prefix of the directories the sandbox keeps inside of the workspace
+# for itself, such as the trash of a reset. They are never listed,
+# archived, searched, snapshotted nor watched.
+LOCAL_TRASH_PREFIX = ".alias-trash-"
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+# path -> (size, mtime_ns, sha256)
+_DIGESTS: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+_DIGESTS_LOCK = threading.Lock()
+
+
+def file_sha256(path: str) -> str:
+    """Return the SHA-256 of a file, cached until its size or modification
+    time changes."""
+    stat_result = os.stat(path)
+    key = (stat_result.st_size, stat_result.st_mtime_ns)
+    with _DIGESTS_LOCK:
+        cached = _DIGESTS.get(path)
+        if cached is not None and cached[:2] == key:
+            _DIGESTS.move_to_end(path)
+            return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    with _DIGESTS_LOCK:
+        _DIGESTS[path] = (*key, digest.hexdigest())
+        _DIGESTS.move_to_end(path)
+        while len(_DIGESTS) > DIGEST_CACHE_SIZE:
+            _DIGESTS.popitem(last=False)
+    return digest.hexdigest()
+
+
+def is_internal(name: str) -> bool:
+    """Whether an entry belongs to the sandbox rather than the workspace."""
+    return name.startswith(LOCAL_TRASH_PREFIX)
+
+
+def matches_any(path: str, name: str, patterns: list[str]) -> bool:
+    """Whether a relative path or its name matches one of the glob
+    `patterns`."""
+    return any(
+        fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern)
+        for pattern in patterns
+    )
+
+
+def iter_entries(
+    directory: str,
+    max_depth: Optional[int] = None,
+    include: Optional[list[str]] = None,
+    exclude: Optional[list[str]] = None,
+    with_stat: bool = False,
+    cursor: Optional[str] = None,
+    with_checksum: bool = False,
+) -> Iterator[dict]:
+    """Yield the entries under `directory` in a stable depth-first order.
+
+    Entries are visited in name order, a directory right before its
+    children, so the relative path of the last entry seen is a valid
+    `cursor` to resume from. Subtrees that lie entirely before the cursor
+    are not scanned again.
+
+    Args:
+        directory (str): The directory to list.
+        max_depth (Optional[int]): How deep to descend, `1` lists only the
+            direct children. No limit if `None`.
+        include (Optional[list[str]]): If given, only entries whose
+            relative path or name matches one of these globs are yielded.
+            Directories are descended into regardless.
+        exclude (Optional[list[str]]): Entries matching one of these globs
+            are skipped, directories together with their content.
+        with_stat (bool): Whether to add `size` and `mtime` to entries.
+        cursor (Optional[str]): Relative path of the last entry of the
+            previous page; only entries after it are yielded.
+        with_checksum (bool): Whether to add the `sha256` of files.
+    """
+    # Any entry sorts after the empty tuple
+    after = tuple(cursor.strip("/").split("/")) if cursor else ()
+
+    def _walk(path: str, parts: tuple, depth: int) -> Iterator[dict]:
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except (PermissionError, FileNotFoundError, NotADirectoryError) as e:
+            logger.warning(f"Cannot list {path}: {e}")
+            return
+
+        for entry in entries:
+            entry_parts = parts + (entry.name,)
+            relative_path = "/".join(entry_parts)
+            if is_internal(entry.name) or (
+                exclude and matches_any(relative_path, entry.name, exclude)
+            ):
+                continue
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            # Subtrees before the cursor were listed on previous pages
+            if (
+                entry_parts < after
+                and entry_parts != after[: len(entry_parts)]
+            ):
+                continue
+
+            if entry_parts > after and (
+                not include or matches_any(relative_path, entry.name, include)
+            ):
+                item = {
+                    "type": "directory" if is_dir else "file",
+                    "path": relative_path,
+                }
+                if with_stat:
+                    try:
+                        stat_result = entry.stat(follow_symlinks=False)
+                        item["size"] = stat_result.st_size
+                        item["mtime"] = stat_result.st_mtime
+                    except OSError:
+                        item["size"] = item["mtime"] = None
+                if with_checksum and not is_dir:
+                    try:
+                        item["sha256"] = file_sha256(entry.path)
+                    except OSError:
+                        item["sha256"] = None
+                yield item
+
+            if is_dir and (max_depth is None or depth < max_depth):
+                yield from _walk(entry.path, entry_parts, depth + 1)
+
+    yield from _walk(directory, (), 1)
+
+
+def iter_entry_page(
+    entries: Iterator[dict],
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Iterator[str]:
+    """Format up to `limit` entries as NDJSON lines.
+
+    The last line is `{"type": "end", "count": int, "next_cursor": str}`,
+    where `next_cursor` is `null` once the listing is complete.
+    """
+    count = 0
+    last_path = None
+    for item in entries:
+        if count == limit:
+            yield json.dumps(
+                {"type": "end", "count": count, "next_cursor": last_path},
+            ) + "\n"
+            return
+        count += 1
+        last_path = item["path"]
+        yield json.dumps(item) + "\n"
+    yield json.dumps(
+        {"type": "end", "count": count, "next_cursor": None},
+    ) + "\n"
@@ -1,17 +1,58 @@
 # -*- coding: utf-8 -*-
-import copy
+import asyncio
+import hashlib
 import json
 import logging
 import os
+import time
 import traceback
+from typing import Optional
 
-from fastapi import APIRouter, Body, HTTPException, Response
+from fastapi import APIRouter, Body, Header, HTTPException, Response
+from fastapi.responses import JSONResponse
 
-from .mcp_utils import MCPSessionHandler
+from .mcp_utils import MCPSessionHandler, backoff_delay
+from .metrics_utils import MCP_SERVER_RESTARTS
+from .spill_utils import spill_result
 
 mcp_router = APIRouter()
 
 _MCP_SERVERS = {}
+
+# Cached `list_tools` payload and its ETag, plus the tool name -> server
+# name routing index. Both are rebuilt when the set of servers changes, by
+# one build task outside of the lock. The generation is bumped by every
+# invalidation, a build started before it does not store its result.
+_TOOLS_CACHE: Optional[dict] = None
+_TOOLS_ETAG: Optional[str] = None
+_TOOL_INDEX: dict[str, str] = {}
+_TOOLS_CACHE_LOCK = asyncio.Lock()
+_TOOLS_GENERATION = 0
+_TOOLS_BUILD: Optional[asyncio.Task] = None
+# Tool names no server provided at the last rebuild, they do not trigger
+# another rebuild until the set of servers changes
+_UNKNOWN_TOOLS: set[str] = set()
+
+# Bring-up state of every MCP server, see `/mcp/readiness`
+_SERVER_STATUS: dict[str, dict] = {}
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
+
+# Default per-server initialization deadline in seconds, can be overridden
+# with `init_timeout` in a server config and by the `timeout` of a request
+MCP_SERVER_INIT_TIMEOUT = float(os.getenv("MCP_SERVER_INIT_TIMEOUT", "120"))
+
+# Configs of the servers kept up by the supervisor, which pings every server
+# each `MCP_HEARTBEAT_INTERVAL` seconds (or right after a failed call) and
+# respawns the ones that do not answer
+_SERVER_CONFIGS: dict[str, dict] = {}
+_RESPAWN_STATE: dict[str, dict] = {}
+_RESPAWN_TASKS: dict[str, asyncio.Task] = {}
+_SUPERVISOR_WAKEUP = asyncio.Event()
+MCP_HEARTBEAT_INTERVAL = float(os.getenv("MCP_HEARTBEAT_INTERVAL", "15"))
+MCP_LIST_TOOLS_TIMEOUT = float(os.getenv("MCP_LIST_TOOLS_TIMEOUT", "30"))
+# Cap of the backoff between two respawns of a server in seconds
+MCP_RESPAWN_MAX_DELAY = float(os.getenv("MCP_RESPAWN_MAX_DELAY", "300"))
+
 current_directory = os.path.dirname(os.path.abspath(__file__))
 mcp_server_configs_path = os.path.abspath(
     os.path.join(current_directory, "../mcp_server_configs.json"),
@@ -21,6 +62,165 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def _initialize_server(
+    server: MCPSessionHandler,
+    timeout: Optional[float] = None,
+) -> Optional[str]:
+    """Initialize one server within its deadline and register it.
+
+    Args:
+        server (`MCPSessionHandler`):
+            The server to initialize.
+        timeout (`Optional[float]`):
+            Deadline in seconds, defaults to `init_timeout` of the server
+            config, then to `MCP_SERVER_INIT_TIMEOUT`.
+
+    Returns:
+        `None` on success, otherwise the error message.
+    """
+    if timeout is None:
+        timeout = server.config.get("init_timeout", MCP_SERVER_INIT_TIMEOUT)
+    _SERVER_CONFIGS[server.name] = server.config
+    status = {
+        "status": "starting",
+        "critical": bool(server.config.get("critical", False)),
+        "error": None,
+        "startup_seconds": None,
+        "restarts": _SERVER_STATUS.get(server.name, {}).get("restarts", 0),
+    }
+    _SERVER_STATUS[server.name] = status
+
+    async def _bring_up() -> None:
+        try:
+            await server.initialize()
+        except BaseException:
+            # Release the half-opened transports from the task that opened
+            # them, before a failure or the timeout propagates
+            await server.cleanup()
+            raise
+
+    start_time = time.monotonic()
+    error = None
+    try:
+        await asyncio.wait_for(_bring_up(), timeout=timeout)
+        _MCP_SERVERS[server.name] = server
+    except asyncio.TimeoutError:
+        error = f"Initialization timed out after {timeout} seconds"
+    except Exception as e:
+        error = str(e) or type(e).__name__
+
+    status["startup_seconds"] = round(time.monotonic() - start_time, 3)
+    if error is None:
+        status["status"] = "ready"
+        logger.info(
+            f"MCP server `{server.name}` ready in "
+            f"{status['startup_seconds']}s",
+        )
+    else:
+        logging.error(f"Failed to initialize server {server.name}: {error}")
+        status["status"] = "failed"
+        status["error"] = error
+    return error
+
+
+async def _respawn_server(name: str) -> None:
+    """Replace a server that stopped answering by a fresh instance.
+
+    Respawns of a server that keep failing are spaced by an exponential
+    backoff with jitter.
+    """
+    old = _MCP_SERVERS.pop(name, None)
+    await _invalidate_tools_cache()
+    if old is not None:
+        await old.cleanup()
+
+    restarts = _SERVER_STATUS.get(name, {}).get("restarts", 0) + 1
+    _SERVER_STATUS.setdefault(name, {})["restarts"] = restarts
+    error = await _initialize_server(
+        MCPSessionHandler(name, _SERVER_CONFIGS[name]),
+    )
+    if error is None:
+        await _invalidate_tools_cache()
+        _RESPAWN_STATE.pop(name, None)
+        MCP_SERVER_RESTARTS.labels(name, "success").inc()
+        logger.info(f"MCP server `{name}` respawned (restart {restarts})")
+        return
+
+    MCP_SERVER_RESTARTS.labels(name, "failed").inc()
+    state = _RESPAWN_STATE.setdefault(name, {"attempts": 0})
+    delay = backoff_delay(
+        state["attempts"],
+        base=MCP_HEARTBEAT_INTERVAL,
+        cap=MCP_RESPAWN_MAX_DELAY,
+    )
+    state["attempts"] += 1
+    state["next_attempt"] = time.monotonic() + delay
+    _SERVER_STATUS[name]["next_respawn_seconds"] = round(delay, 1)
+
+
+async def _respawn_in_background(name: str) -> None:
+    try:
+        await _respawn_server(name)
+    except Exception as e:
+        logger.error(
+            f"Failed to respawn MCP server `{name}`: {e}, "
+            f"{traceback.format_exc()}",
+        )
+
+
+async def _supervise_server(name: str) -> None:
+    status = _SERVER_STATUS.get(name, {}).get("status")
+    if status not in ("ready", "failed") or name in _RESPAWN_TASKS:
+        # Being brought up by `add_servers` or respawned
+        return
+    server = _MCP_SERVERS.get(name)
+    if server is not None and await server.ping():
+        return
+    state = _RESPAWN_STATE.get(name, {})
+    if time.monotonic() < state.get("next_attempt", 0):
+        return
+    logger.warning(f"MCP server `{name}` is down, respawning it")
+    # In its own task, the heartbeats of the other servers go on meanwhile
+    task = asyncio.create_task(
+        _respawn_in_background(name),
+        name=f"mcp-respawn-{name}",
+    )
+    _RESPAWN_TASKS[name] = task
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    task.add_done_callback(lambda _: _RESPAWN_TASKS.pop(name, None))
+
+
+async def _supervise() -> None:
+    """Heartbeat every server and respawn the crashed ones."""
+    while True:
+        try:
+            await asyncio.wait_for(
+                _SUPERVISOR_WAKEUP.wait(),
+                timeout=MCP_HEARTBEAT_INTERVAL,
+            )
+        except asyncio.TimeoutError:
+            pass
+        _SUPERVISOR_WAKEUP.clear()
+        try:
+            await asyncio.gather(
+                *[_supervise_server(name) for name in list(_SERVER_CONFIGS)],
+            )
+        except Exception as e:
+            logger.error(
+                f"MCP supervisor check failed: {e}, {traceback.format_exc()}",
+            )
+
+
+def _ensure_supervisor() -> None:
+    if not any(
+        task.get_name() == "mcp-supervisor" for task in _BACKGROUND_TASKS
+    ):
+        task = asyncio.create_task(_supervise(), name="mcp-supervisor")
+        _BACKGROUND_TASKS.add(task)
+        task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
 # NOTE: DO NOT use API-KEY Server in release version due to security issues
 @mcp_router.post(
     "/mcp/add_servers",
@@ -35,6 +235,17 @@ async def add_servers(
         False,
         embed=True,
     ),
+    timeout: Optional[float] = Body(
+        None,
+        description="Per-server initialization deadline in seconds.",
+        embed=True,
+    ),
+    allow_partial: bool = Body(
+        False,
+        description="Respond with 200 and a report even if some servers "
+        "failed to initialize.",
+        embed=True,
+    ),
 ):
     global _MCP_SERVERS
 
@@ -45,37 +256,51 @@ async def add_servers(
                 detail="server_configs is required.",
             )
 
-        new_servers = [
-            MCPSessionHandler(name, config)
-            for name, config in server_configs["mcpServers"].items()
-        ]
-
-        fail_servers = []
-
-        # Initialize the servers
-        for server in new_servers:
-            if server.name in _MCP_SERVERS:
+        new_servers = []
+        skipped = []
+        for name, config in server_configs["mcpServers"].items():
+            if name in _MCP_SERVERS:
                 if not overwrite:
+                    skipped.append(name)
                     continue
                 # Cleanup old server
-                await _MCP_SERVERS.pop(server.name).cleanup()
-            try:
-                await server.initialize()
-                _MCP_SERVERS[server.name] = server
-            except Exception as e:
-                logging.error(f"Failed to initialize server: {e}")
-                fail_servers.append(server)
-                continue
-
-        if fail_servers:
-            for server in fail_servers:
-                await server.cleanup()
+                await _invalidate_tools_cache()
+                await _MCP_SERVERS.pop(name).cleanup()
+            new_servers.append(MCPSessionHandler(name, config))
+
+        # Initialize the servers concurrently, each within its deadline
+        errors = await asyncio.gather(
+            *[_initialize_server(server, timeout) for server in new_servers],
+        )
+
+        _ensure_supervisor()
+        await _invalidate_tools_cache()
+        try:
+            await _get_tools_cache()
+        except Exception as e:
+            # Rebuilt lazily on the next `list_tools` or `call_tool`
+            logging.error(f"Failed to build tool cache: {e}")
+
+        report = {
+            "succeeded": [
+                server.name
+                for server, error in zip(new_servers, errors)
+                if error is None
+            ],
+            "failed": {
+                server.name: error
+                for server, error in zip(new_servers, errors)
+                if error is not None
+            },
+            "skipped": skipped,
+        }
+        if report["failed"] and not allow_partial:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to initialize server: "
-                f"{[server.name for server in fail_servers]}",
+                f"{list(report['failed'])}",
             )
-        return Response(content="OK", status_code=200)
+        return report
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -83,49 +308,193 @@ async def add_servers(
         ) from e
 
 
+@mcp_router.get(
+    "/mcp/readiness",
+    summary="Report which MCP servers are up",
+)
+async def readiness():
+    """
+    Report the bring-up state of every MCP server. Responds with 503 until
+    all servers marked as `critical` in their config are ready.
+    """
+    ready = all(
+        status["status"] == "ready"
+        for status in _SERVER_STATUS.values()
+        if status.get("critical")
+    )
+    servers = {
+        name: {
+            **status,
+            "circuit": _MCP_SERVERS[name].breaker.status()
+            if name in _MCP_SERVERS
+            else None,
+        }
+        for name, status in _SERVER_STATUS.items()
+    }
+    return JSONResponse(
+        content={"ready": ready, "servers": servers},
+        status_code=200 if ready else 503,
+    )
+
+
+async def _invalidate_tools_cache(forget_unknown: bool = True) -> None:
+    """Drop the cached tool payload and routing index.
+
+    Taking the lock keeps a build that is in progress from storing a tool
+    list read before the invalidation.
+
+    Args:
+        forget_unknown (`bool`):
+            Whether to also forget the tool names known to be missing, only
+            a change of the set of servers can make them appear.
+    """
+    global _TOOLS_CACHE, _TOOLS_ETAG, _TOOLS_GENERATION, _TOOLS_BUILD
+
+    async with _TOOLS_CACHE_LOCK:
+        _TOOLS_CACHE = None
+        _TOOLS_ETAG = None
+        _TOOL_INDEX.clear()
+        _TOOLS_GENERATION += 1
+        _TOOLS_BUILD = None
+        if forget_unknown:
+            _UNKNOWN_TOOLS.clear()
+
+
+async def _list_server_tools(
+    server_name: str,
+    server: MCPSessionHandler,
+) -> Optional[list]:
+    """Tools of one server, `None` if it did not list them in time."""
+    try:
+        return await asyncio.wait_for(
+            server.list_tools(),
+            timeout=MCP_LIST_TOOLS_TIMEOUT,
+        )
+    except Exception as e:
+        # Listed again once the supervisor respawned the server
+        logging.error(
+            f"Failed to list tools of server {server_name}: "
+            f"{str(e) or type(e).__name__}",
+        )
+        _SUPERVISOR_WAKEUP.set()
+        return None
+
+
+async def _build_tools_cache(generation: int) -> None:
+    """List the tools of all servers concurrently and store them, unless
+    the cache has been invalidated meanwhile."""
+    global _TOOLS_CACHE, _TOOLS_ETAG
+
+    mcp_tools = {}
+    tool_index = {}
+
+    servers = list(_MCP_SERVERS.items())
+    results = await asyncio.gather(
+        *[_list_server_tools(name, server) for name, server in servers],
+    )
+    for (server_name, _), tools in zip(servers, results):
+        if tools is None:
+            continue
+        server_tools = {}
+        for tool in tools:
+            name = tool.name
+            if name in server_tools:
+                logging.warning(
+                    f"Service function `{name}` already exists, "
+                    f"skip adding it.",
+                )
+            else:
+                json_schema = {
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "parameters": {
+                            "type": "object",
+                            "properties": tool.inputSchema.get(
+                                "properties",
+                                {},
+                            ),
+                            "required": tool.inputSchema.get(
+                                "required",
+                                [],
+                            ),
+                        },
+                    },
+                }
+                server_tools[tool.name] = {
+                    "name": tool.name,
+                    "json_schema": json_schema,
+                }
+                # Keep the first server that registers a tool name, the
+                # same one a linear scan over the servers would find
+                tool_index.setdefault(tool.name, server_name)
+        mcp_tools[server_name] = server_tools
+
+    digest = hashlib.sha256(
+        json.dumps(mcp_tools, sort_keys=True).encode("utf-8"),
+    ).hexdigest()
+    async with _TOOLS_CACHE_LOCK:
+        if generation != _TOOLS_GENERATION:
+            return
+        _TOOLS_CACHE = mcp_tools
+        _TOOLS_ETAG = f'"{digest[:32]}"'
+        _TOOL_INDEX.clear()
+        _TOOL_INDEX.update(tool_index)
+
+
+async def _get_tools_cache() -> tuple[dict, str]:
+    """Return the cached `list_tools` payload and its ETag, building them
+    if the cache has been invalidated.
+
+    Concurrent callers wait for the same build, which runs outside of the
+    lock so that invalidations are not held up by slow servers.
+    """
+    global _TOOLS_BUILD
+
+    while True:
+        async with _TOOLS_CACHE_LOCK:
+            if _TOOLS_CACHE is not None:
+                return _TOOLS_CACHE, _TOOLS_ETAG
+            if _TOOLS_BUILD is None or _TOOLS_BUILD.done():
+                _TOOLS_BUILD = asyncio.create_task(
+                    _build_tools_cache(_TOOLS_GENERATION),
+                )
+            build = _TOOLS_BUILD
+        # Shielded, a cancelled caller does not cancel the build of the
+        # others. Built again if invalidated meanwhile.
+        await asyncio.shield(build)
+
+
 @mcp_router.get(
     "/mcp/list_tools",
     summary="List MCP tools",
 )
-async def list_tools():
+async def list_tools(
+    if_none_match: Optional[str] = Header(None),
+):
     try:
-        mcp_tools = {}
-
-        for server_name, server in _MCP_SERVERS.items():
-            tools = await server.list_tools()
-            server_tools = {}
-            for tool in tools:
-                name = tool.name
-                if name in server_tools:
-                    logging.warning(
-                        f"Service function `{name}` already exists, "
-                        f"skip adding it.",
-                    )
-                else:
-                    json_schema = {
-                        "type": "function",
-                        "function": {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "parameters": {
-                                "type": "object",
-                                "properties": tool.inputSchema.get(
-                                    "properties",
-                                    {},
-                                ),
-                                "required": tool.inputSchema.get(
-                                    "required",
-                                    [],
-                                ),
-                            },
-                        },
-                    }
-                    server_tools[tool.name] = {
-                        "name": tool.name,
-                        "json_schema": json_schema,
-                    }
-            mcp_tools[server_name] = copy.deepcopy(server_tools)
-        return mcp_tools
+        mcp_tools, etag = await _get_tools_cache()
+        headers = {"ETag": etag}
+        if if_none_match == etag:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(content=mcp_tools, headers=headers)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"{str(e)}: {traceback.format_exc()}",
+        ) from e
+
+
+@mcp_router.post(
+    "/mcp/refresh_tools",
+    summary="Rebuild the cached MCP tool list",
+)
+async def refresh_tools():
+    try:
+        await _invalidate_tools_cache()
+        _, etag = await _get_tools_cache()
+        return {"etag": etag}
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -146,6 +515,13 @@ async def call_tool(
         {},
         embed=True,
     ),
+    spill_threshold: Optional[int] = Body(
+        None,
+        description="If the text of the result is longer than this many "
+        "characters, it is saved into a file under /workspace/tmp_files and "
+        "only a head/tail preview and the file path are returned.",
+        embed=True,
+    ),
 ) -> None:
     try:
         if not tool_name:
@@ -154,14 +530,32 @@ async def call_tool(
                 detail="tool_name is required.",
             )
 
-        tools = await list_tools()
-        for server_name, server_tools in tools.items():
-            if tool_name not in server_tools:
-                continue
-            server = _MCP_SERVERS[server_name]
+        await _get_tools_cache()
+        if tool_name not in _TOOL_INDEX and tool_name not in _UNKNOWN_TOOLS:
+            # A server may have registered new tools since the last build
+            await _invalidate_tools_cache(forget_unknown=False)
+            await _get_tools_cache()
+            if tool_name not in _TOOL_INDEX:
+                _UNKNOWN_TOOLS.add(tool_name)
+        server_name = _TOOL_INDEX.get(tool_name)
+        if server_name is None or server_name not in _MCP_SERVERS:
+            raise ModuleNotFoundError(f"Tool '{tool_name}' not found.")
+        server = _MCP_SERVERS[server_name]
+        try:
             result = await server.call_tool(tool_name, arguments)
-            return result.model_dump()
-        raise ModuleNotFoundError(f"Tool '{tool_name}' not found.")
+        except Exception:
+            # Let the supervisor check the server now instead of at the
+            # next heartbeat
+            _SUPERVISOR_WAKEUP.set()
+            raise
+        if spill_threshold is not None:
+            return await asyncio.to_thread(
+                spill_result,
+                result.model_dump(),
+                tool_name,
+                spill_threshold,
+            )
+        return result.model_dump()
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -174,6 +568,9 @@ async def cleanup_servers() -> None:
     """Clean up all servers properly."""
     global _MCP_SERVERS
 
+    for task in list(_BACKGROUND_TASKS):
+        task.cancel()
+
     for server in reversed(list(_MCP_SERVERS.values())):
         try:
             await server.cleanup()
@@ -181,6 +578,10 @@ async def cleanup_servers() -> None:
             logging.error(f"Failed to cleanup server: {e}")
 
     _MCP_SERVERS = {}
+    _SERVER_STATUS.clear()
+    _SERVER_CONFIGS.clear()
+    _RESPAWN_STATE.clear()
+    await _invalidate_tools_cache()
 
 
 @mcp_router.on_event("startup")
@@ -194,14 +595,46 @@ async def startup_event():
         logger.error(f"Failed to load MCP server configs: {e}")
         mcp_server_configs = {}
 
-    # Call the add_servers function
-    if mcp_server_configs:
+    if not mcp_server_configs:
+        return
+
+    # Only the critical servers hold up startup, the others are brought up
+    # in the background and reported by `/mcp/readiness`
+    # NOTE: router startup handlers may be invoked more than once, servers
+    # that are already known are left alone
+    servers = {
+        name: config
+        for name, config in mcp_server_configs.get("mcpServers", {}).items()
+        if name not in _SERVER_STATUS
+    }
+    critical = {k: v for k, v in servers.items() if v.get("critical")}
+    others = {k: v for k, v in servers.items() if not v.get("critical")}
+    for name in servers:
+        _SERVER_STATUS[name] = {
+            "status": "starting",
+            "critical": name in critical,
+            "error": None,
+            "startup_seconds": None,
+        }
+
+    async def _add(configs: dict) -> None:
         try:
-            await add_servers(
-                server_configs=mcp_server_configs,
+            report = await add_servers(
+                server_configs={"mcpServers": configs},
                 overwrite=False,
+                timeout=None,
+                allow_partial=True,
             )
+            if report["failed"]:
+                logger.error(f"Failed to add MCP servers: {report['failed']}")
         except Exception as e:
             logger.error(
                 f"Failed to add MCP servers: {e}, {traceback.format_exc()}",
             )
+
+    if others:
+        task = asyncio.create_task(_add(others))
+        _BACKGROUND_TASKS.add(task)
+        task.add_done_callback(_BACKGROUND_TASKS.discard)
+    if critical:
+        await _add(critical)
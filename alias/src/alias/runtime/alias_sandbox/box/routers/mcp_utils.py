@@ -2,19 +2,108 @@
 import asyncio
 import logging
 import os
+import random
 import shutil
+import time
 import traceback
 from contextlib import AsyncExitStack
 from typing import Any
 
-from mcp import ClientSession, StdioServerParameters
+from mcp import ClientSession, McpError, StdioServerParameters
 from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
 from mcp.client.streamable_http import streamablehttp_client
 
+from .metrics_utils import (
+    MCP_CIRCUIT_OPEN,
+    MCP_TOOL_CALLS,
+    MCP_TOOL_LATENCY,
+    MCP_TOOL_RESULT_BYTES,
+    MCP_TOOL_RETRIES,
+    content_size,
+)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Default deadline of a tool call in seconds, retries included, can be
+# overridden with `call_timeout` in a server config
+MCP_TOOL_CALL_TIMEOUT = float(os.getenv("MCP_TOOL_CALL_TIMEOUT", "300"))
+MCP_PING_TIMEOUT = float(os.getenv("MCP_PING_TIMEOUT", "10"))
+# Consecutive failed calls after which a server rejects calls for
+# `MCP_CIRCUIT_RESET_TIMEOUT` seconds, can be overridden with
+# `circuit_failure_threshold` and `circuit_reset_timeout` in a server config
+MCP_CIRCUIT_FAILURE_THRESHOLD = int(
+    os.getenv("MCP_CIRCUIT_FAILURE_THRESHOLD", "5"),
+)
+MCP_CIRCUIT_RESET_TIMEOUT = float(
+    os.getenv("MCP_CIRCUIT_RESET_TIMEOUT", "30"),
+)
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 60.0) -> float:
+    """Exponential backoff with jitter: a random delay between half and all
+    of `base * 2 ** attempt`, capped at `cap` seconds."""
+    ceiling = min(cap, base * 2**attempt)
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+class CircuitBreaker:
+    """Fail fast on a server that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are rejected. Once `reset_timeout` seconds have passed, a single
+    probe call is let through (half-open): its success closes the circuit,
+    its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = MCP_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = MCP_CIRCUIT_RESET_TIMEOUT,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        MCP_CIRCUIT_OPEN.labels(name).set(0)
+
+    def allow(self) -> bool:
+        """Whether a call may go through now."""
+        if self.state == "closed":
+            return True
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return False
+        # Let one probe through, another one only if it never reported back
+        self.state = "half_open"
+        self._opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        MCP_CIRCUIT_OPEN.labels(self.name).set(0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or (
+            self.failures >= self.failure_threshold
+        ):
+            if self.state != "open":
+                logger.warning(
+                    f"Circuit of MCP server `{self.name}` opened after "
+                    f"{self.failures} failures",
+                )
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            MCP_CIRCUIT_OPEN.labels(self.name).set(1)
+
+    def status(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
 
 class MCPSessionHandler:
     """Manages MCP server connections and tool execution."""
@@ -26,6 +115,17 @@ class MCPSessionHandler:
         self.session: ClientSession | None = None
         self._cleanup_lock: asyncio.Lock = asyncio.Lock()
         self._exit_stack: AsyncExitStack = AsyncExitStack()
+        self.breaker: CircuitBreaker = CircuitBreaker(
+            name,
+            failure_threshold=config.get(
+                "circuit_failure_threshold",
+                MCP_CIRCUIT_FAILURE_THRESHOLD,
+            ),
+            reset_timeout=config.get(
+                "circuit_reset_timeout",
+                MCP_CIRCUIT_RESET_TIMEOUT,
+            ),
+        )
 
     async def initialize(self) -> None:
         """Initialize the server connection."""
@@ -109,51 +209,121 @@ class MCPSessionHandler:
 
         return tools
 
+    async def ping(self, timeout: float = MCP_PING_TIMEOUT) -> bool:
+        """Whether the server answers a ping within `timeout` seconds."""
+        session = self.session
+        if session is None:
+            return False
+        try:
+            await asyncio.wait_for(session.send_ping(), timeout=timeout)
+            return True
+        except Exception as e:
+            logging.warning(
+                f"Server {self.name} did not answer a ping: "
+                f"{str(e) or type(e).__name__}",
+            )
+            return False
+
     async def call_tool(
         self,
         tool_name: str,
         arguments: dict[str, Any],
         retries: int = 2,
         delay: float = 1.0,
+        timeout: float | None = None,
     ) -> Any:
         """Execute a tool with retry mechanism.
 
+        Failed attempts are retried after an exponential backoff with
+        jitter, as long as the deadline of the call allows it. Transport
+        and session failures count towards the circuit breaker of the
+        server, calls are rejected right away while the circuit is open. A
+        call that runs out of time or that the server answers with an error
+        does not, the server is still there.
+
         Args:
             tool_name: Name of the tool to execute.
             arguments: tool arguments.
             retries: Number of retry attempts.
-            delay: Delay between retries in seconds.
+            delay: Base delay between retries in seconds.
+            timeout: Deadline of the call in seconds, retries included.
+                Defaults to `call_timeout` of the server config.
 
         Returns:
             Tool execution result.
 
         Raises:
-            RuntimeError: If server is not initialized.
+            RuntimeError: If server is not initialized or its circuit is
+                open.
+            TimeoutError: If the deadline passed.
             Exception: If tool execution fails after all retries.
         """
         if not self.session:
             raise RuntimeError(f"Server {self.name} not initialized")
+        if not self.breaker.allow():
+            raise RuntimeError(
+                f"Server {self.name} is unavailable after "
+                f"{self.breaker.failures} failed calls, retry later",
+            )
 
+        if timeout is None:
+            timeout = self.config.get("call_timeout", MCP_TOOL_CALL_TIMEOUT)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
         attempt = 0
+        start = time.perf_counter()
+        status = "error"
+        try:
+            while attempt < retries:
+                session = self.session
+                if session is None:
+                    raise RuntimeError(f"Server {self.name} not initialized")
+                try:
+                    logging.info(f"Executing {tool_name}...")
+                    result = await asyncio.wait_for(
+                        session.call_tool(tool_name, arguments),
+                        timeout=deadline - loop.time(),
+                    )
+                    # A tool reporting an error is still a healthy server
+                    self.breaker.record_success()
+                    status = "error" if result.isError else "success"
+                    MCP_TOOL_RESULT_BYTES.labels(self.name, tool_name).observe(
+                        content_size(result),
+                    )
+                    return result
 
-        while attempt < retries:
-            try:
-                logging.info(f"Executing {tool_name}...")
-                result = await self.session.call_tool(tool_name, arguments)
-                return result
-
-            except Exception as e:
-                attempt += 1
-                logging.warning(
-                    f"Error executing tool: {e} {traceback.format_exc()}."
-                    f" Attempt {attempt} of {retries}.",
-                )
-                if attempt >= retries:
-                    logging.error("Max retries reached. Failing.")
-                    raise
-                logging.info(f"Retrying in {delay} seconds...")
-                await asyncio.sleep(delay)
-        return None
+                except asyncio.TimeoutError as e:
+                    status = "timeout"
+                    raise TimeoutError(
+                        f"Tool {tool_name} of server {self.name} did not "
+                        f"finish within {timeout} seconds",
+                    ) from e
+                except Exception as e:
+                    if isinstance(e, McpError):
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.record_failure()
+                    attempt += 1
+                    logging.warning(
+                        f"Error executing tool: {e} {traceback.format_exc()}."
+                        f" Attempt {attempt} of {retries}.",
+                    )
+                    if attempt >= retries:
+                        logging.error("Max retries reached. Failing.")
+                        raise
+                    wait = backoff_delay(attempt - 1, delay)
+                    if loop.time() + wait >= deadline:
+                        logging.error("No time left for a retry. Failing.")
+                        raise
+                    MCP_TOOL_RETRIES.labels(self.name, tool_name).inc()
+                    logging.info(f"Retrying in {wait:.2f} seconds...")
+                    await asyncio.sleep(wait)
+            return None
+        finally:
+            MCP_TOOL_CALLS.labels(self.name, tool_name, status).inc()
+            MCP_TOOL_LATENCY.labels(self.name, tool_name).observe(
+                time.perf_counter() - start,
+            )
 
     async def cleanup(self) -> None:
         """Clean up server resources."""
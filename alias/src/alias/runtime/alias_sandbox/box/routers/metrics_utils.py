@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from typing import Any, Callable
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.routing import Match
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+)
+_SIZE_BUCKETS = tuple(4**i for i in range(2, 14))
+
+HTTP_REQUESTS = Counter(
+    "sandbox_http_requests_total",
+    "HTTP requests handled, by route and status code.",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "sandbox_http_request_duration_seconds",
+    "Time until the response of an HTTP request was fully sent.",
+    ["method", "route"],
+    buckets=_LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "sandbox_http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    ["method", "route"],
+)
+HTTP_REQUEST_BYTES = Histogram(
+    "sandbox_http_request_bytes",
+    "Size of HTTP request bodies.",
+    ["method", "route"],
+    buckets=_SIZE_BUCKETS,
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "sandbox_http_response_bytes",
+    "Size of HTTP response bodies, streamed ones included.",
+    ["method", "route"],
+    buckets=_SIZE_BUCKETS,
+)
+
+MCP_TOOL_CALLS = Counter(
+    "sandbox_mcp_tool_calls_total",
+    "MCP tool calls, by server, tool and outcome.",
+    ["server", "tool", "status"],
+)
+MCP_TOOL_LATENCY = Histogram(
+    "sandbox_mcp_tool_call_duration_seconds",
+    "Duration of MCP tool calls, retries included.",
+    ["server", "tool"],
+    buckets=_LATENCY_BUCKETS,
+)
+MCP_TOOL_RETRIES = Counter(
+    "sandbox_mcp_tool_retries_total",
+    "MCP tool calls retried after a failed attempt.",
+    ["server", "tool"],
+)
+MCP_TOOL_RESULT_BYTES = Histogram(
+    "sandbox_mcp_tool_result_bytes",
+    "Size of the content returned by MCP tool calls.",
+    ["server", "tool"],
+    buckets=_SIZE_BUCKETS,
+)
+
+MCP_SERVER_RESTARTS = Counter(
+    "sandbox_mcp_server_restarts_total",
+    "MCP servers respawned by the supervisor, by server and outcome.",
+    ["server", "status"],
+)
+MCP_CIRCUIT_OPEN = Gauge(
+    "sandbox_mcp_circuit_open",
+    "Whether the circuit breaker of an MCP server rejects calls.",
+    ["server"],
+)
+
+IPYTHON_KERNELS = Gauge(
+    "sandbox_ipython_kernels",
+    "IPython kernels of the kernel pool, by state.",
+    ["state"],
+)
+
+
+def observe_kernel_pool(stats: Callable[[], dict]) -> None:
+    """Report the occupancy of a kernel pool, read on every scrape."""
+    IPYTHON_KERNELS.labels("active").set_function(lambda: stats()["active"])
+    IPYTHON_KERNELS.labels("busy").set_function(lambda: stats()["busy"])
+    IPYTHON_KERNELS.labels("max").set_function(
+        lambda: stats()["max_kernels"],
+    )
+
+
+def content_size(result: Any) -> int:
+    """Approximate size of the content blocks of an MCP tool result."""
+    size = 0
+    for block in getattr(result, "content", None) or []:
+        size += len(getattr(block, "text", None) or "")
+        size += len(getattr(block, "data", None) or "")
+    return size
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, size and concurrency of requests
+    per route template.
+
+    Implemented on the ASGI level (instead of `@app.middleware("http")`)
+    so that streamed responses are measured until their last chunk.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    def _route(self, scope) -> str:
+        router = scope["app"].router
+        for route in router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        request_bytes = response_bytes = 0
+        status = 500
+
+        async def receive_wrapper():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal response_bytes, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_LATENCY.labels(method, route).observe(
+                time.perf_counter() - start,
+            )
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_REQUEST_BYTES.labels(method, route).observe(request_bytes)
+            HTTP_RESPONSE_BYTES.labels(method, route).observe(response_bytes)
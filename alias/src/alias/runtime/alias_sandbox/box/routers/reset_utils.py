@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import errno
+import fnmatch
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Optional
+
+from .listing_utils import LOCAL_TRASH_PREFIX
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORKSPACE_DIR = "/workspace"
+# Where reset entries wait to be deleted. Moving them there is a rename
+# only if it is on the filesystem of the workspace, otherwise a hidden
+# directory inside of the workspace is used.
+TRASH_DIR = os.getenv("WORKSPACE_TRASH_DIR", "/var/lib/alias/workspace_trash")
+
+
+def _split(path: str) -> list[str]:
+    return [part for part in path.strip("/").split("/") if part]
+
+
+def _match(parts: list[str], patterns: list[list[str]]) -> tuple[bool, bool]:
+    """Whether a relative path is preserved, and whether it leads to a
+    preserved path and must be descended into instead."""
+    keep = descend = False
+    for pattern in patterns:
+        if len(parts) > len(pattern):
+            continue
+        if all(fnmatch.fnmatch(p, q) for p, q in zip(parts, pattern)):
+            if len(parts) == len(pattern):
+                keep = True
+            else:
+                descend = True
+    return keep, descend
+
+
+def _trash_dir(root: str) -> str:
+    """A new directory on the filesystem of `root` to move entries to."""
+    batch = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    try:
+        os.makedirs(TRASH_DIR, exist_ok=True)
+        if os.stat(TRASH_DIR).st_dev == os.stat(root).st_dev:
+            path = os.path.join(TRASH_DIR, batch)
+            os.mkdir(path)
+            return path
+    except OSError as e:
+        logger.warning(f"Cannot use {TRASH_DIR} as trash: {e}")
+    path = os.path.join(root, LOCAL_TRASH_PREFIX + batch)
+    os.mkdir(path)
+    return path
+
+
+def _move_out(
+    directory: str,
+    relative_parts: list[str],
+    patterns: list[list[str]],
+    trash: str,
+    stats: dict,
+) -> None:
+    with os.scandir(directory) as entries:
+        entries = list(entries)
+    for entry in entries:
+        if not relative_parts and entry.name.startswith(LOCAL_TRASH_PREFIX):
+            continue
+        parts = relative_parts + [entry.name]
+        keep, descend = _match(parts, patterns)
+        if keep:
+            stats["preserved"].append("/".join(parts))
+            continue
+        if descend and entry.is_dir(follow_symlinks=False):
+            _move_out(entry.path, parts, patterns, trash, stats)
+            continue
+        try:
+            os.rename(entry.path, os.path.join(trash, uuid.uuid4().hex))
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Another filesystem mounted inside of the workspace
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+        stats["removed"] += 1
+
+
+def purge_trash(trash: str) -> None:
+    """Delete the entries that one reset moved to the trash directory
+    `trash`, leaving those of other resets that may still be moving
+    entries there alone."""
+    shutil.rmtree(trash, ignore_errors=True)
+
+
+def leftover_trash(root: str = WORKSPACE_DIR) -> list[str]:
+    """The trash directories of resets whose entries were not deleted,
+    e.g. because the server stopped first. Only safe to purge while no
+    reset is running."""
+    leftovers = []
+    for directory, prefix in ((TRASH_DIR, ""), (root, LOCAL_TRASH_PREFIX)):
+        try:
+            with os.scandir(directory) as entries:
+                leftovers.extend(
+                    entry.path
+                    for entry in entries
+                    if entry.name.startswith(prefix)
+                    and entry.is_dir(follow_symlinks=False)
+                )
+        except FileNotFoundError:
+            continue
+    return leftovers
+
+
+def reset_directory(
+    root: str = WORKSPACE_DIR,
+    preserve: Optional[list[str]] = None,
+) -> dict:
+    """Empty a directory at once, deleting its content in the background.
+
+    Entries are renamed into a trash directory of their own, which is
+    cheap however large they are; `purge_trash` deletes it later on.
+
+    Args:
+        root (str): The directory to empty.
+        preserve (Optional[list[str]]): Relative paths to keep, such as
+            caches. Every component may be a glob pattern, e.g.
+            `.cache/*` or `data/*.db`.
+
+    Returns:
+        The number of `removed` entries, the `preserved` paths and the
+        `trash` directory to purge, `None` if nothing was removed.
+    """
+    start = time.monotonic()
+    patterns = [_split(path) for path in preserve or []]
+    stats = {"removed": 0, "preserved": []}
+    os.makedirs(root, exist_ok=True)
+    trash = _trash_dir(root)
+    try:
+        _move_out(root, [], [p for p in patterns if p], trash, stats)
+    finally:
+        if not os.listdir(trash):
+            os.rmdir(trash)
+            trash = None
+    return {
+        **stats,
+        "trash": trash,
+        "seconds": round(time.monotonic() - start, 3),
+    }
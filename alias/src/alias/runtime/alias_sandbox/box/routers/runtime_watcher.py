@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import difflib
+import json
 import logging
+import os
 import traceback
+from typing import Literal, Optional
 
 import git
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Query
 
 watcher_router = APIRouter()
 
@@ -12,6 +16,9 @@ watcher_router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Directory under `.git` caching the diffs of commits
+DIFF_CACHE_DIR = "alias-diff-cache"
+
 
 def initialize_git_user(repo):
     repo.config_writer().set_value("user", "name", "User").release()
@@ -23,6 +30,63 @@ def initialize_git_user(repo):
     return repo
 
 
+def _diff_texts(diff_index) -> dict:
+    """Render a GitPython diff index as unified diffs keyed by path."""
+    diffs = {}
+    for diff in diff_index:
+        if diff.a_blob and diff.b_blob:
+            # Both files are present in commits; perform a diff
+            a_content = (
+                diff.a_blob.data_stream.read()
+                .decode(
+                    "utf-8",
+                )
+                .splitlines()
+            )
+            b_content = (
+                diff.b_blob.data_stream.read()
+                .decode(
+                    "utf-8",
+                )
+                .splitlines()
+            )
+        elif diff.a_blob:  # File was deleted
+            # Only 'a' file is present; 'b' file is empty
+            a_content = (
+                diff.a_blob.data_stream.read()
+                .decode(
+                    "utf-8",
+                )
+                .splitlines()
+            )
+            b_content = []
+        elif diff.b_blob:  # File was added
+            # Only 'b' file is present; 'a' file is empty
+            a_content = []
+            b_content = (
+                diff.b_blob.data_stream.read()
+                .decode(
+                    "utf-8",
+                )
+                .splitlines()
+            )
+        else:
+            continue
+
+        # Generate the diff content
+        diff_text = "\n".join(
+            difflib.unified_diff(
+                a_content,
+                b_content,
+                fromfile=f"a/{diff.a_path}",
+                tofile=f"b/{diff.b_path}",
+                lineterm="",
+            ),
+        )
+        diffs[diff.b_path or diff.a_path] = diff_text
+    return diffs
+
+
 @watcher_router.post(
     "/watcher/commit_changes",
     summary="...",
@@ -87,58 +151,7 @@ async def generate_diff(
                 detail="Invalid commit range",
                 status_code=400,
             )
-        diffs = {}
-        for diff in diff_index:
-            if diff.a_blob and diff.b_blob:
-                # Both files are present in commits; perform a diff
-                a_content = (
-                    diff.a_blob.data_stream.read()
-                    .decode(
-                        "utf-8",
-                    )
-                    .splitlines()
-                )
-                b_content = (
-                    diff.b_blob.data_stream.read()
-                    .decode(
-                        "utf-8",
-                    )
-                    .splitlines()
-                )
-            elif diff.a_blob:  # File was deleted
-                # Only 'a' file is present; 'b' file is empty
-                a_content = (
-                    diff.a_blob.data_stream.read()
-                    .decode(
-                        "utf-8",
-                    )
-                    .splitlines()
-                )
-                b_content = []
-            elif diff.b_blob:  # File was added
-                # Only 'b' file is present; 'a' file is empty
-                a_content = []
-                b_content = (
-                    diff.b_blob.data_stream.read()
-                    .decode(
-                        "utf-8",
-                    )
-                    .splitlines()
-                )
-            else:
-                continue
-
-            # Generate the diff content
-            diff_text = "\n".join(
-                difflib.unified_diff(
-                    a_content,
-                    b_content,
-                    fromfile=f"a/{diff.a_path}",
-                    tofile=f"b/{diff.b_path}",
-                    lineterm="",
-                ),
-            )
-            diffs[diff.b_path or diff.a_path] = diff_text
+        diffs = _diff_texts(diff_index)
         return {"diffs": diffs}
 
     except Exception as e:
@@ -149,36 +162,111 @@ async def generate_diff(
         ) from e
 
 
+def _cache_path(repo, hexsha: str, diff_mode: str) -> str:
+    return os.path.join(repo.git_dir, DIFF_CACHE_DIR, f"{hexsha}.{diff_mode}")
+
+
+def _commit_diff(repo, commit, diff_mode: str) -> dict:
+    """Return the diffs (or numstat) of a commit against its first parent.
+
+    Commits are immutable, so the result is cached on disk inside the git
+    directory and never needs to be invalidated.
+    """
+    cache_path = _cache_path(repo, commit.hexsha, diff_mode)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if diff_mode == "stats":
+        # Computed by `git diff --numstat`, no blob is decoded in Python
+        result = {
+            path: {
+                "insertions": stats["insertions"],
+                "deletions": stats["deletions"],
+            }
+            for path, stats in commit.stats.files.items()
+        }
+    elif commit.parents:
+        result = _diff_texts(commit.diff(commit.parents[0]))
+    else:
+        result = {}
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Failed to cache diff of {commit.hexsha}: {e}")
+    return result
+
+
+def _git_logs(
+    limit: Optional[int],
+    before: Optional[str],
+    diff_mode: str,
+) -> dict:
+    repo = git.Repo(".")
+    repo = initialize_git_user(repo)
+
+    kwargs = {}
+    if limit is not None:
+        # One more commit tells whether there is a next page
+        kwargs["max_count"] = limit + 1
+    if before:
+        kwargs["skip"] = 1
+    commits = list(repo.iter_commits(before or None, **kwargs))
+
+    next_before = None
+    if limit is not None and len(commits) > limit:
+        commits = commits[:limit]
+        next_before = commits[-1].hexsha
+
+    logs = []
+    for commit in commits:
+        log_entry = {
+            "commit": commit.hexsha,
+            "author": commit.author.name,
+            "date": commit.committed_datetime.isoformat(),
+            "message": commit.message.strip(),
+        }
+        if diff_mode == "stats":
+            log_entry["stats"] = _commit_diff(repo, commit, diff_mode)
+        elif diff_mode == "full":
+            log_entry["diff"] = _commit_diff(repo, commit, diff_mode)
+        logs.append(log_entry)
+    return {"logs": logs, "next_before": next_before}
+
+
 @watcher_router.get(
     "/watcher/git_logs",
     summary="...",
 )
-async def git_logs():
+async def git_logs(
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        description="Maximum number of commits to return, all if not set.",
+    ),
+    before: Optional[str] = Query(
+        None,
+        description="Only return commits older than this one, e.g. the "
+        "`next_before` of the previous page.",
+    ),
+    diff: Literal["full", "stats", "none"] = Query(
+        "full",
+        description="Return the unified diffs of each commit, only its "
+        "numstat, or neither.",
+    ),
+):
     """
-    Return the git logs.
+    Return the git logs, newest first.
     """
     try:
-        repo = git.Repo(".")
-        repo = initialize_git_user(repo)
-        logs = []
-        for commit in repo.iter_commits():
-            diff_result = {"diffs": {}}
-            if commit.parents:
-                parent_commit = commit.parents[0]
-                diff_result = await generate_diff(
-                    commit.hexsha,
-                    parent_commit.hexsha,
-                )
-
-            log_entry = {
-                "commit": commit.hexsha,
-                "author": commit.author.name,
-                "date": commit.committed_datetime.isoformat(),
-                "message": commit.message.strip(),
-                "diff": diff_result["diffs"],
-            }
-            logs.append(log_entry)
-        return {"logs": logs}
+        return await asyncio.to_thread(_git_logs, limit, before, diff)
     except Exception as e:
         logger.error(f"{str(e)}:\n{traceback.format_exc()}")
         raise HTTPException(
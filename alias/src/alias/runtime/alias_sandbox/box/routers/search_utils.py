@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import fnmatch
+import json
+import logging
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, Optional
+
+from .listing_utils import is_internal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "8"))
+# Directory names that are not searched unless listed in `paths`
+SEARCH_SKIPPED_DIRS = {".git", "node_modules", "__pycache__"}
+
+_BINARY_PROBE_SIZE = 8192
+# Longer lines are cut in the results, e.g. minified files
+_MAX_LINE_LENGTH = 1000
+
+
+def _clip(line: str) -> str:
+    line = line.rstrip("\r\n")
+    if len(line) > _MAX_LINE_LENGTH:
+        return line[:_MAX_LINE_LENGTH] + "..."
+    return line
+
+
+def _matches(path: str, patterns: list[str]) -> bool:
+    name = os.path.basename(path)
+    return any(
+        fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern)
+        for pattern in patterns
+    )
+
+
+def _iter_files(
+    paths: list[str],
+    include: Optional[list[str]],
+    exclude: Optional[list[str]],
+) -> Iterator[str]:
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(
+                d
+                for d in dirs
+                if d not in SEARCH_SKIPPED_DIRS
+                and not is_internal(d)
+                and not (exclude and _matches(os.path.join(root, d), exclude))
+            )
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                if is_internal(name):
+                    continue
+                if exclude and _matches(file_path, exclude):
+                    continue
+                if include and not _matches(file_path, include):
+                    continue
+                yield file_path
+
+
+def _search_file(
+    path: str,
+    matcher: re.Pattern,
+    context: int,
+    max_matches: int,
+) -> Optional[tuple[list[dict], bool]]:
+    """Search a file line by line, `None` if it is binary.
+
+    Returns:
+        The matches of the file, with their context lines, and whether
+        the search stopped at `max_matches`.
+    """
+    with open(path, "rb") as f:
+        if b"\0" in f.read(_BINARY_PROBE_SIZE):
+            return None
+
+    matches: list[dict] = []
+    before: deque = deque(maxlen=context)
+    # Matches still collecting their `after` context
+    pending: list[dict] = []
+    truncated = False
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = _clip(line)
+            for match in pending:
+                match["after"].append(line)
+            pending = [m for m in pending if len(m["after"]) < context]
+
+            if not truncated and matcher.search(line):
+                if len(matches) >= max_matches:
+                    truncated = True
+                else:
+                    match = {
+                        "type": "match",
+                        "path": path,
+                        "line_number": line_number,
+                        "line": line,
+                        "before": list(before),
+                        "after": [],
+                    }
+                    matches.append(match)
+                    if context:
+                        pending.append(match)
+            if truncated and not pending:
+                break
+            before.append(line)
+    return matches, truncated
+
+
+def iter_search(  # pylint: disable=R0912
+    pattern: str,
+    paths: list[str],
+    regex: bool = False,
+    ignore_case: bool = False,
+    context: int = 0,
+    max_matches_per_file: int = 100,
+    max_matches: int = 1000,
+    include: Optional[list[str]] = None,
+    exclude: Optional[list[str]] = None,
+) -> Iterator[str]:
+    """Search files for a pattern and yield the results as NDJSON lines.
+
+    Files are searched by a thread pool, results are yielded in file order
+    as soon as they are available: one `match` line per match, then an
+    `end` line with statistics. Binary files (containing NUL bytes) are
+    skipped.
+
+    Raises:
+        `re.error` if `pattern` is not a valid regular expression.
+    """
+    flags = re.IGNORECASE if ignore_case else 0
+    matcher = re.compile(pattern if regex else re.escape(pattern), flags)
+    stats = {
+        "type": "end",
+        "files_searched": 0,
+        "files_matched": 0,
+        "files_skipped": 0,
+        "matches": 0,
+        "truncated": False,
+    }
+
+    with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as pool:
+        window: deque[tuple[str, Future]] = deque()
+        files = _iter_files(paths, include, exclude)
+        try:
+            while True:
+                # Keep the workers busy while results are consumed in order
+                while len(window) < SEARCH_WORKERS * 4:
+                    path = next(files, None)
+                    if path is None:
+                        break
+                    window.append(
+                        (
+                            path,
+                            pool.submit(
+                                _search_file,
+                                path,
+                                matcher,
+                                context,
+                                max_matches_per_file,
+                            ),
+                        ),
+                    )
+                if not window:
+                    break
+
+                path, future = window.popleft()
+                try:
+                    result = future.result()
+                except OSError as e:
+                    logger.warning(f"Cannot search {path}: {e}")
+                    result = None
+                if result is None:
+                    stats["files_skipped"] += 1
+                    continue
+
+                file_matches, truncated = result
+                stats["files_searched"] += 1
+                stats["truncated"] |= truncated
+                if file_matches:
+                    stats["files_matched"] += 1
+                for match in file_matches:
+                    if stats["matches"] >= max_matches:
+                        stats["truncated"] = True
+                        break
+                    stats["matches"] += 1
+                    yield json.dumps(match, ensure_ascii=False) + "\n"
+                if stats["matches"] >= max_matches:
+                    # Stop, the rest of the files may hold more matches
+                    if window or next(files, None) is not None:
+                        stats["truncated"] = True
+                    break
+        finally:
+            for _, future in window:
+                future.cancel()
+
+    yield json.dumps(stats) + "\n"
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import codecs
+import logging
+import os
+import signal
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default timeout (seconds) of a shell command, `0` means no limit
+DEFAULT_SHELL_TIMEOUT = float(os.getenv("SHELL_COMMAND_TIMEOUT", "0")) or None
+
+_READ_CHUNK_SIZE = 4096
+
+
+@dataclass
+class ShellResult:
+    """Collected output of a finished shell command."""
+
+    stdout: str
+    stderr: str
+    returncode: int
+    timed_out: bool = False
+
+
+async def _spawn(command: str) -> asyncio.subprocess.Process:
+    # A new session makes the shell the leader of its own process group,
+    # so that the whole tree (e.g. `pip` spawned by `sh`) can be killed.
+    return await asyncio.create_subprocess_shell(
+        command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+
+
+async def _kill(process: asyncio.subprocess.Process) -> None:
+    """Kill the process group of a running command and reap it."""
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to kill process group {process.pid}: {e}")
+        process.kill()
+    await process.wait()
+
+
+async def stream_command(
+    command: str,
+    timeout: Optional[float] = DEFAULT_SHELL_TIMEOUT,
+) -> AsyncIterator[dict]:
+    """Run a shell command and yield its output as it is produced.
+
+    Yields dicts of the form `{"type": "stdout" | "stderr", "data": str}`
+    and, as the last item, `{"type": "result", "returncode": int,
+    "timed_out": bool}`. The process group is killed if the command runs
+    out of time or the consumer is cancelled.
+    """
+    process = await _spawn(command)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump(stream: asyncio.StreamReader, name: str) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = await stream.read(_READ_CHUNK_SIZE)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                await queue.put({"type": name, "data": text})
+            if not chunk:
+                break
+
+    pumps = asyncio.gather(
+        pump(process.stdout, "stdout"),
+        pump(process.stderr, "stderr"),
+    )
+    pumps.add_done_callback(lambda _: queue.put_nowait(None))
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout else None
+    timed_out = False
+    try:
+        while True:
+            remaining = deadline - loop.time() if deadline else None
+            if remaining is not None and remaining <= 0:
+                timed_out = True
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                timed_out = True
+                break
+            if item is None:
+                break
+            yield item
+
+        if timed_out:
+            await _kill(process)
+            yield {
+                "type": "stderr",
+                "data": f"\nCommand timed out after {timeout} seconds.\n",
+            }
+        returncode = await process.wait()
+        yield {
+            "type": "result",
+            "returncode": returncode,
+            "timed_out": timed_out,
+        }
+    finally:
+        await _kill(process)
+        pumps.cancel()
+
+
+async def run_command(
+    command: str,
+    timeout: Optional[float] = DEFAULT_SHELL_TIMEOUT,
+) -> ShellResult:
+    """Run a shell command without blocking the event loop."""
+    stdout_parts, stderr_parts = [], []
+    returncode, timed_out = -1, False
+    async for event in stream_command(command, timeout=timeout):
+        if event["type"] == "stdout":
+            stdout_parts.append(event["data"])
+        elif event["type"] == "stderr":
+            stderr_parts.append(event["data"])
+        else:
+            returncode = event["returncode"]
+            timed_out = event["timed_out"]
+    return ShellResult(
+        stdout="".join(stdout_parts),
+        stderr="".join(stderr_parts),
+        returncode=returncode,
+        timed_out=timed_out,
+    )
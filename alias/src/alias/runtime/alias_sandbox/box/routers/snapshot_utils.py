@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import shutil
+import stat
+import time
+import uuid
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .listing_utils import file_sha256, is_internal, matches_any
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORKSPACE_DIR = "/workspace"
+# Kept outside of the workspace, so that snapshots are neither listed,
+# archived nor committed by the watcher together with the files
+SNAPSHOT_DIR = os.getenv(
+    "WORKSPACE_SNAPSHOT_DIR",
+    "/var/lib/alias/workspace_snapshots",
+)
+
+# ioctl cloning the extents of a file (btrfs, xfs, ...), see ioctl_ficlone(2)
+_FICLONE = 0x40049409
+# (source device, destination device) pairs reflinks failed between
+_NO_REFLINK: set[tuple[int, int]] = set()
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """Make `dst` share the data blocks of `src`, if the filesystem can."""
+    if fcntl is None:
+        return False
+    devices = (os.stat(src).st_dev, os.stat(os.path.dirname(dst)).st_dev)
+    if devices in _NO_REFLINK:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        _NO_REFLINK.add(devices)
+        return False
+
+
+def clone_file(src: str, dst: str) -> str:
+    """Copy a file with its metadata like `shutil.copy2`, as a
+    copy-on-write clone when the filesystem supports it."""
+    if not _reflink(src, dst):
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+    return dst
+
+
+def copy_path(src: str, dst: str, mode: str = "auto") -> None:
+    """Copy a file or directory.
+
+    Args:
+        src (str): The file or directory to copy.
+        dst (str): The path of the copy.
+        mode (str): `auto` clones files copy-on-write where possible and
+            copies them otherwise, `copy` always copies. `hardlink` links
+            the files, which is fastest but makes the copies share their
+            content: writing to a file in place changes both.
+    """
+    if mode == "hardlink":
+        copy_function = os.link
+    elif mode == "copy":
+        copy_function = shutil.copy2
+    else:
+        copy_function = clone_file
+
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, symlinks=True, copy_function=copy_function)
+    else:
+        copy_function(src, dst)
+
+
+def _scan(root: str, exclude: list[str]) -> dict[str, dict]:
+    """Map the relative path of every entry under `root` to its state."""
+    entries = {}
+    for current, dirs, files in os.walk(root):
+        for name in dirs + files:
+            path = os.path.join(current, name)
+            relative_path = os.path.relpath(path, root)
+            if is_internal(name) or matches_any(relative_path, name, exclude):
+                if name in dirs:
+                    dirs.remove(name)
+                continue
+            try:
+                stat_result = os.lstat(path)
+            except FileNotFoundError:
+                continue
+            if stat.S_ISLNK(stat_result.st_mode):
+                entries[relative_path] = {
+                    "type": "symlink",
+                    "target": os.readlink(path),
+                }
+            elif stat.S_ISDIR(stat_result.st_mode):
+                entries[relative_path] = {
+                    "type": "directory",
+                    "mode": stat.S_IMODE(stat_result.st_mode),
+                }
+            elif stat.S_ISREG(stat_result.st_mode):
+                entries[relative_path] = {
+                    "type": "file",
+                    "mode": stat.S_IMODE(stat_result.st_mode),
+                    "size": stat_result.st_size,
+                    "mtime_ns": stat_result.st_mtime_ns,
+                }
+    return entries
+
+
+def _unchanged(entry: dict, known: Optional[dict]) -> bool:
+    """Whether a file is assumed to still hold the content of `known`,
+    judging from its size and modification time like `git status`."""
+    return (
+        known is not None
+        and known["type"] == entry["type"] == "file"
+        and known["size"] == entry["size"]
+        and known["mtime_ns"] == entry["mtime_ns"]
+    )
+
+
+class SnapshotStore:
+    """Incremental, content-addressed snapshots of a directory.
+
+    File contents are stored once per SHA-256 under `objects/`, every
+    snapshot is a manifest under `snapshots/` mapping relative paths to
+    their content hash and metadata. Taking a snapshot only stores the
+    files whose size or modification time differs from the latest one,
+    restoring only rewrites the files that differ from the snapshot.
+    """
+
+    def __init__(
+        self,
+        root: str = WORKSPACE_DIR,
+        store_dir: str = SNAPSHOT_DIR,
+    ) -> None:
+        self.root = root
+        self.objects_dir = os.path.join(store_dir, "objects")
+        self.snapshots_dir = os.path.join(store_dir, "snapshots")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def _manifest_path(self, snapshot_id: str) -> str:
+        if not snapshot_id or not all(
+            c.isalnum() or c == "-" for c in snapshot_id
+        ):
+            raise ValueError(f"Invalid snapshot id: {snapshot_id}")
+        return os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+
+    def _load(self, snapshot_id: str) -> dict:
+        path = self._manifest_path(snapshot_id)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Snapshot {snapshot_id} not found")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _store_object(self, path: str) -> str:
+        """Store the content of a file, return its hash."""
+        digest = file_sha256(path)
+        object_path = self._object_path(digest)
+        if os.path.exists(object_path):
+            return digest
+
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = os.path.join(
+            self.objects_dir,
+            f".{uuid.uuid4().hex}.tmp",
+        )
+        clone_file(path, tmp_path)
+        # Hash the stored copy, the file may have changed in between
+        digest = file_sha256(tmp_path)
+        object_path = self._object_path(digest)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, object_path)
+        return digest
+
+    def snapshots(self) -> list[dict]:
+        """The snapshots, oldest first, without their entries."""
+        snapshots = []
+        if os.path.isdir(self.snapshots_dir):
+            for name in os.listdir(self.snapshots_dir):
+                if not name.endswith(".json"):
+                    continue
+                manifest = self._load(name[: -len(".json")])
+                manifest.pop("entries")
+                snapshots.append(manifest)
+        return sorted(snapshots, key=lambda s: s["created"])
+
+    def create(
+        self,
+        label: Optional[str] = None,
+        exclude: Optional[list[str]] = None,
+    ) -> dict:
+        """Take a snapshot of the directory, return its summary."""
+        start = time.monotonic()
+        exclude = exclude or []
+        snapshots = self.snapshots()
+        parent = snapshots[-1]["id"] if snapshots else None
+        known = self._load(parent)["entries"] if parent else {}
+
+        entries = _scan(self.root, exclude)
+        stored = 0
+        for relative_path, entry in entries.items():
+            if entry["type"] != "file":
+                continue
+            previous = known.get(relative_path)
+            if _unchanged(entry, previous):
+                entry["sha256"] = previous["sha256"]
+                continue
+            try:
+                entry["sha256"] = self._store_object(
+                    os.path.join(self.root, relative_path),
+                )
+                stored += 1
+            except FileNotFoundError:
+                # Deleted while scanning
+                entry["type"] = "deleted"
+        entries = {k: v for k, v in entries.items() if v["type"] != "deleted"}
+
+        snapshot_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        manifest = {
+            "id": snapshot_id,
+            "label": label,
+            "parent": parent,
+            "created": time.time(),
+            "exclude": exclude,
+            "files": sum(1 for e in entries.values() if e["type"] == "file"),
+            "size": sum(e.get("size", 0) for e in entries.values()),
+            "entries": entries,
+        }
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        tmp_path = self._manifest_path(snapshot_id) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path(snapshot_id))
+
+        manifest.pop("entries")
+        return {
+            **manifest,
+            "stored_files": stored,
+            "seconds": round(time.monotonic() - start, 3),
+        }
+
+    def restore(self, snapshot_id: str) -> dict:
+        """Bring the directory back to a snapshot.
+
+        Entries excluded from the snapshot are left alone, everything else
+        that is not in the snapshot is deleted.
+        """
+        start = time.monotonic()
+        manifest = self._load(snapshot_id)
+        wanted = manifest["entries"]
+        current = _scan(self.root, manifest["exclude"])
+        stats = {"restored": 0, "deleted": 0, "unchanged": 0}
+
+        # Deepest first, so that directories are empty when removed
+        for relative_path in sorted(current, reverse=True):
+            entry = current[relative_path]
+            target = wanted.get(relative_path)
+            if target is not None and target["type"] == entry["type"]:
+                continue
+            path = os.path.join(self.root, relative_path)
+            if entry["type"] == "directory":
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.lexists(path):
+                os.unlink(path)
+            stats["deleted"] += 1
+
+        # Parents first
+        for relative_path in sorted(wanted):
+            entry = wanted[relative_path]
+            path = os.path.join(self.root, relative_path)
+            existing = current.get(relative_path)
+            if entry["type"] == "directory":
+                os.makedirs(path, exist_ok=True)
+                os.chmod(path, entry["mode"])
+            elif entry["type"] == "symlink":
+                if existing is not None and existing == entry:
+                    stats["unchanged"] += 1
+                    continue
+                if os.path.lexists(path):
+                    os.unlink(path)
+                os.symlink(entry["target"], path)
+                stats["restored"] += 1
+            else:
+                if _unchanged(entry, existing):
+                    stats["unchanged"] += 1
+                    continue
+                tmp_path = os.path.join(
+                    os.path.dirname(path),
+                    f".{os.path.basename(path)}.restore",
+                )
+                clone_file(self._object_path(entry["sha256"]), tmp_path)
+                os.chmod(tmp_path, entry["mode"])
+                os.utime(tmp_path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+                os.replace(tmp_path, path)
+                stats["restored"] += 1
+
+        return {
+            "id": snapshot_id,
+            **stats,
+            "seconds": round(time.monotonic() - start, 3),
+        }
+
+    def delete(self, snapshot_id: str) -> dict:
+        """Delete a snapshot and the contents no other snapshot uses."""
+        self._load(snapshot_id)
+        os.remove(self._manifest_path(snapshot_id))
+
+        referenced = set()
+        for snapshot in self.snapshots():
+            entries = self._load(snapshot["id"])["entries"]
+            referenced.update(
+                e["sha256"] for e in entries.values() if e["type"] == "file"
+            )
+        removed = 0
+        for current, _, files in os.walk(self.objects_dir):
+            for name in files:
+                digest = os.path.basename(current) + name
+                if digest not in referenced:
+                    os.remove(os.path.join(current, name))
+                    removed += 1
+        return {"id": snapshot_id, "removed_objects": removed}
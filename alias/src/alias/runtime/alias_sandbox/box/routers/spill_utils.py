@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import re
+import uuid
+
+from .hints import LONG_TEXT_FILE_HINT
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SPILL_DIR = "/workspace/tmp_files"
+# Share of the threshold that the head/tail preview may take, what is left
+# is for the hint pointing to the spill file
+_PREVIEW_RATIO = 0.85
+_HEAD_RATIO = 2 / 3
+
+
+def _text_size(result: dict) -> int:
+    return sum(
+        len(block.get("text") or "")
+        for block in result.get("content") or []
+        if block.get("type") == "text"
+    )
+
+
+def _write_spill_file(tool_name: str, text: str) -> str:
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    prefix = re.sub(r"[^\w.-]", "_", tool_name) or "tool"
+    path = os.path.join(SPILL_DIR, f"{prefix}-{uuid.uuid4().hex[:8]}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def spill_result(result: dict, tool_name: str, threshold: int) -> dict:
+    """Move the text of a tool result into a file if it is too long.
+
+    If the text blocks of `result` hold more than `threshold` characters,
+    they are written (joined by blank lines) into a file under `SPILL_DIR`
+    and replaced by a head/tail preview and a hint naming the file. Other
+    blocks, e.g. images, are kept. The returned result gets a `spilled`
+    entry with the `path` and `size` of the file.
+    """
+    size = _text_size(result)
+    if size <= threshold:
+        return result
+
+    blocks = result.get("content") or []
+    text = "\n\n".join(
+        block.get("text") or "" for block in blocks if block["type"] == "text"
+    )
+    path = _write_spill_file(tool_name, text)
+
+    preview_size = int(threshold * _PREVIEW_RATIO)
+    head_size = int(preview_size * _HEAD_RATIO)
+    tail_size = preview_size - head_size
+    preview = (
+        f"{text[:head_size]}\n\n"
+        f"[... {len(text) - head_size - tail_size} characters omitted ...]"
+        f"\n\n{text[len(text) - tail_size:]}"
+    )
+    hint = (
+        f"The complete result ({len(text)} characters) is saved at {path}. "
+        + LONG_TEXT_FILE_HINT.format(path=path)
+    )
+    logger.info(f"Spilled {len(text)} characters of {tool_name} to {path}")
+
+    content = [block for block in blocks if block["type"] != "text"]
+    content[:0] = [
+        {"type": "text", "text": preview},
+        {"type": "text", "text": hint},
+    ]
+    return {
+        **result,
+        "content": content,
+        "spilled": {"path": path, "size": len(text)},
+    }
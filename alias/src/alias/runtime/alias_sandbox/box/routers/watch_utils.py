@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Optional
+
+try:
+    # Uses inotify on Linux
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+from .listing_utils import is_internal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORKSPACE_DIR = "/workspace"
+# Directory names whose content does not produce events
+WATCH_IGNORED_DIRS = set(
+    filter(None, os.getenv("WORKSPACE_WATCH_IGNORE", ".git").split(",")),
+)
+# Seconds between two scans when polling
+WATCH_POLL_INTERVAL = float(os.getenv("WORKSPACE_WATCH_POLL_INTERVAL", "2"))
+# Number of past events kept for clients resuming with `since`
+WATCH_HISTORY_SIZE = int(os.getenv("WORKSPACE_WATCH_HISTORY_SIZE", "10000"))
+
+
+def _is_ignored(relative_path: str) -> bool:
+    return any(
+        part in WATCH_IGNORED_DIRS or is_internal(part)
+        for part in relative_path.split("/")
+    )
+
+
+def _scan(root: str) -> dict[str, tuple]:
+    """Map the relative path of every entry under `root` to its state."""
+    snapshot = {}
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    relative_path = os.path.relpath(entry.path, root)
+                    if _is_ignored(relative_path):
+                        continue
+                    try:
+                        stat_result = entry.stat(follow_symlinks=False)
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    snapshot[relative_path] = (
+                        is_dir,
+                        stat_result.st_mtime_ns,
+                        stat_result.st_size,
+                    )
+                    if is_dir:
+                        stack.append(entry.path)
+        except OSError:
+            continue
+    return snapshot
+
+
+class WorkspaceWatcher:
+    """Publish create/modify/delete events of the files under a directory.
+
+    Every event gets the next value of a workspace version counter. The
+    counter restarts with the server, which is why events also carry the
+    `epoch` of the watcher: a client seeing another epoch must resync.
+    """
+
+    def __init__(self, root: str = WORKSPACE_DIR) -> None:
+        self.root = root
+        self.epoch = uuid.uuid4().hex
+        self.version = 0
+        self.backend = "inotify" if watchfiles is not None else "polling"
+        self._history: deque = deque(maxlen=WATCH_HISTORY_SIZE)
+        self._changed: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._changed = asyncio.Condition()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _publish(self, changes: list[tuple[str, str]]) -> None:
+        now = time.time()
+        for change, relative_path in changes:
+            self.version += 1
+            self._history.append(
+                {
+                    "type": change,
+                    "path": os.path.join(self.root, relative_path),
+                    "version": self.version,
+                    "epoch": self.epoch,
+                    "time": now,
+                },
+            )
+        if changes:
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _run(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            if self.backend == "inotify":
+                try:
+                    await self._watch_inotify()
+                except Exception as e:
+                    # E.g. out of inotify watches
+                    logger.warning(f"inotify failed, polling instead: {e}")
+                    self.backend = "polling"
+            await self._watch_polling()
+        except Exception as e:
+            logger.error(f"Workspace watcher stopped: {e}")
+
+    async def _watch_inotify(self) -> None:
+        kinds = {
+            watchfiles.Change.added: "created",
+            watchfiles.Change.modified: "modified",
+            watchfiles.Change.deleted: "deleted",
+        }
+        async for batch in watchfiles.awatch(
+            self.root,
+            watch_filter=lambda _, path: not _is_ignored(
+                os.path.relpath(path, self.root),
+            ),
+            debounce=200,
+            step=50,
+        ):
+            await self._publish(
+                sorted(
+                    (kinds[change], os.path.relpath(path, self.root))
+                    for change, path in batch
+                ),
+            )
+
+    async def _watch_polling(self) -> None:
+        previous = await asyncio.to_thread(_scan, self.root)
+        while True:
+            await asyncio.sleep(WATCH_POLL_INTERVAL)
+            current = await asyncio.to_thread(_scan, self.root)
+            changes = []
+            for relative_path, state in current.items():
+                old_state = previous.get(relative_path)
+                if old_state is None:
+                    changes.append(("created", relative_path))
+                elif old_state != state and not state[0]:
+                    # Directory mtimes only reflect changes of their content
+                    changes.append(("modified", relative_path))
+            changes.extend(
+                ("deleted", relative_path)
+                for relative_path in previous.keys() - current.keys()
+            )
+            previous = current
+            await self._publish(sorted(changes, key=lambda c: c[1]))
+
+    async def events(
+        self,
+        since: Optional[int] = None,
+        epoch: Optional[str] = None,
+        heartbeat: float = 15,
+    ) -> AsyncIterator[dict]:
+        """Yield the events after version `since`, then new ones as they
+        happen.
+
+        A `reset` event is yielded first if the events after `since` are no
+        longer all available (or `epoch` is not the current one), then the
+        client should resync fully. `heartbeat` events are yielded while
+        nothing happens.
+        """
+        self.ensure_started()
+        if (
+            since is None
+            or since > self.version
+            or (epoch is not None and epoch != self.epoch)
+        ):
+            if since is not None:
+                yield self._reset_event()
+            since = self.version
+
+        while True:
+            if self._history and self._history[0]["version"] > since + 1:
+                # Events after `since` were dropped from the history
+                yield self._reset_event()
+                since = self.version
+            for event in list(self._history):
+                if event["version"] > since:
+                    since = event["version"]
+                    yield event
+
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: self.version > since),
+                        heartbeat,
+                    )
+                    idle = False
+                except asyncio.TimeoutError:
+                    idle = True
+            if idle:
+                yield {
+                    "type": "heartbeat",
+                    "version": self.version,
+                    "epoch": self.epoch,
+                }
+
+    def _reset_event(self) -> dict:
+        return {
+            "type": "reset",
+            "version": self.version,
+            "epoch": self.epoch,
+        }
+
+    def status(self) -> dict:
+        return {
+            "version": self.version,
+            "epoch": self.epoch,
+            "backend": self.backend,
+        }
@@ -1,13 +1,41 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import errno
+import hashlib
+import json
+import re
 import shutil
 import os
+import tarfile
+import tempfile
+import time
 import logging
 import traceback
+from typing import Literal, Optional
 
 import aiofiles
 
-from fastapi import APIRouter, HTTPException, Query, Body
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Query, Body, Request
+from fastapi.responses import FileResponse, StreamingResponse
+
+from .archive_utils import (
+    ZSTD_MAGIC,
+    check_compression,
+    extract_archive,
+    iter_archive,
+)
+from .line_index_utils import parse_line_range, read_lines
+from .listing_utils import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    file_sha256,
+    iter_entries,
+    iter_entry_page,
+)
+from .reset_utils import leftover_trash, purge_trash, reset_directory
+from .search_utils import iter_search
+from .snapshot_utils import SnapshotStore, copy_path
+from .watch_utils import WorkspaceWatcher
 
 workspace_router = APIRouter()
 
@@ -15,6 +43,21 @@ workspace_router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+workspace_watcher = WorkspaceWatcher()
+snapshot_store = SnapshotStore()
+# Snapshots and restores of the workspace must not interleave
+_snapshot_lock = asyncio.Lock()
+# Background deletions of reset workspace content
+_purge_tasks: set[asyncio.Task] = set()
+# Unfinished uploads, kept outside of the workspace like the snapshots so
+# that they are neither listed, archived nor watched
+UPLOAD_DIR = os.getenv(
+    "WORKSPACE_UPLOAD_DIR",
+    "/var/lib/alias/workspace_uploads",
+)
+# Seconds after which an unfinished upload that was not resumed is dropped
+UPLOAD_PART_TTL = float(os.getenv("WORKSPACE_UPLOAD_PART_TTL", "86400"))
+
 
 def ensure_within_workspace(
     path: str,
@@ -51,9 +94,23 @@ async def get_workspace_file(
         ...,
         description="Path to the file within /workspace relative to its root",
     ),
+    lines: Optional[str] = Query(
+        None,
+        description="Return only the lines `offset:limit` (0-based offset, "
+        "limit may be omitted) of the file as text.",
+    ),
+    max_bytes: Optional[int] = Query(
+        None,
+        ge=0,
+        description="Respond with 413 instead of the file if it is larger.",
+    ),
 ):
     """
     Get a file within the /workspace directory.
+
+    Byte ranges can be requested with the HTTP `Range` header. With
+    `lines`, the requested lines are located through a newline index of
+    the file that is cached until the file changes.
     """
     try:
         # Ensure the file path is within the /workspace directory
@@ -63,13 +120,31 @@ async def get_workspace_file(
         if not os.path.isfile(full_path):
             raise HTTPException(status_code=404, detail="File not found.")
 
-        # Return the file using FileResponse
+        size = os.path.getsize(full_path)
+        if max_bytes is not None and size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File has {size} bytes, more than the {max_bytes} "
+                f"allowed.",
+            )
+
+        if lines is not None:
+            offset, limit = parse_line_range(lines)
+            return await asyncio.to_thread(
+                read_lines, full_path, offset, limit
+            )
+
+        # Return the file using FileResponse, which serves `Range` requests
         return FileResponse(
             full_path,
             media_type="application/octet-stream",
             filename=os.path.basename(full_path),
         )
 
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
         logger.error(f"{str(e)}:\n{traceback.format_exc()}")
         raise HTTPException(
@@ -105,6 +180,171 @@ async def create_or_edit_file(
         ) from e
 
 
+def _upload_part_path(full_path: str) -> str:
+    key = hashlib.sha256(full_path.encode("utf-8")).hexdigest()
+    return os.path.join(UPLOAD_DIR, f"{key}.upload")
+
+
+def _expire_upload_parts() -> None:
+    try:
+        with os.scandir(UPLOAD_DIR) as entries:
+            parts = list(entries)
+    except FileNotFoundError:
+        return
+    deadline = time.time() - UPLOAD_PART_TTL
+    for part in parts:
+        try:
+            if part.stat().st_mtime < deadline:
+                os.remove(part.path)
+        except FileNotFoundError:
+            continue
+
+
+def _complete_upload(part_path: str, full_path: str) -> None:
+    try:
+        os.replace(part_path, full_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # The uploads are on another filesystem, copy next to the file
+        # first so that it is still replaced at once
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(full_path),
+            prefix=f".{os.path.basename(full_path)}.",
+        )
+        os.close(fd)
+        try:
+            shutil.copyfile(part_path, tmp_path)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        os.remove(part_path)
+
+
+@workspace_router.get(
+    "/workspace/uploads",
+    summary="Get the offset to resume an upload to /workspace from",
+)
+async def get_upload_offset(
+    file_path: str = Query(
+        ...,
+        description="Path of the uploaded file within /workspace",
+    ),
+):
+    """
+    Return how many bytes of an unfinished upload were received, and
+    their SHA-256 digest to check them against the local file.
+    """
+    try:
+        part_path = _upload_part_path(ensure_within_workspace(file_path))
+        if not os.path.isfile(part_path):
+            return {"offset": 0, "sha256": hashlib.sha256().hexdigest()}
+        return {
+            "offset": os.path.getsize(part_path),
+            "sha256": await asyncio.to_thread(file_sha256, part_path),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(
+            f"Error reading upload: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reading upload: {str(e)}",
+        ) from e
+
+
+@workspace_router.put(
+    "/workspace/uploads",
+    summary="Upload (a chunk of) a binary file within /workspace",
+)
+async def upload_file(
+    request: Request,
+    file_path: str = Query(
+        ...,
+        description="Path of the uploaded file within /workspace",
+    ),
+    offset: int = Query(
+        0,
+        ge=0,
+        description="Position of the request body in the file, at most "
+        "the number of bytes received so far.",
+    ),
+    complete: bool = Query(
+        True,
+        description="Whether the body ends the file. Until then, the data "
+        "is kept aside and the upload can be resumed.",
+    ),
+    sha256: Optional[str] = Query(
+        None,
+        description="Expected SHA-256 hex digest of the complete file.",
+    ),
+):
+    """
+    Write the raw request body to disk as it is received. A file can be
+    sent in several requests with increasing `offset`, the last one with
+    `complete`; it only replaces `file_path` once complete and verified.
+    """
+    try:
+        full_path = ensure_within_workspace(file_path)
+        part_path = _upload_part_path(full_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+        received = (
+            os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+        )
+        if not received:
+            await asyncio.to_thread(_expire_upload_parts)
+        if offset > received:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Offset {offset} is beyond the {received} bytes "
+                f"received so far.",
+            )
+
+        # Hash on the fly when the whole file comes in one request
+        digest = hashlib.sha256() if offset == 0 else None
+        async with aiofiles.open(part_path, "r+b" if received else "wb") as f:
+            await f.seek(offset)
+            await f.truncate()
+            async for chunk in request.stream():
+                await f.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+                offset += len(chunk)
+
+        if not complete:
+            return {"offset": offset, "complete": False}
+
+        checksum = (
+            digest.hexdigest()
+            if digest is not None
+            else await asyncio.to_thread(file_sha256, part_path)
+        )
+        if sha256 is not None and checksum != sha256.lower():
+            os.remove(part_path)
+            raise HTTPException(
+                status_code=422,
+                detail=f"Checksum mismatch, expected {sha256} but got "
+                f"{checksum}. The upload was discarded.",
+            )
+        await asyncio.to_thread(_complete_upload, part_path, full_path)
+        return {"offset": offset, "complete": True, "sha256": checksum}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(
+            f"Error uploading file: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error uploading file: {str(e)}",
+        ) from e
+
+
 @workspace_router.get(
     "/workspace/list-directories",
     summary="List file items in the /workspace directory, including nested "
@@ -171,6 +411,159 @@ async def list_workspace_files(
         ) from e
 
 
+@workspace_router.get(
+    "/workspace/entries",
+    summary="List entries of a directory within /workspace page by page, "
+    "as NDJSON",
+)
+async def list_workspace_entries(
+    directory: str = Query(
+        "/workspace",
+        alias="dir",
+        description="Directory to list entries from, default is /workspace.",
+    ),
+    max_depth: Optional[int] = Query(
+        None,
+        ge=1,
+        description="How deep to descend, 1 lists only direct children.",
+    ),
+    include: Optional[list[str]] = Query(
+        None,
+        description="Only list entries whose relative path or name matches "
+        "one of these globs.",
+    ),
+    exclude: Optional[list[str]] = Query(
+        None,
+        description="Skip entries (and the content of directories) whose "
+        "relative path or name matches one of these globs.",
+    ),
+    stat: bool = Query(False, description="Include size and mtime."),
+    checksum: bool = Query(
+        False,
+        description="Include the SHA-256 of files, cached by the server "
+        "until they change.",
+    ),
+    cursor: Optional[str] = Query(
+        None,
+        description="`next_cursor` returned by the previous page.",
+    ),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Stream one page of entries, one JSON object per line, ending with a
+    line of type `end` that holds the cursor of the next page.
+    """
+    try:
+        target_directory = ensure_within_workspace(directory)
+        if not os.path.isdir(target_directory):
+            raise HTTPException(status_code=404, detail="Directory not found.")
+
+        entries = iter_entries(
+            target_directory,
+            max_depth=max_depth,
+            include=include,
+            exclude=exclude,
+            with_stat=stat,
+            cursor=cursor,
+            with_checksum=checksum,
+        )
+        return StreamingResponse(
+            iter_entry_page(entries, limit),
+            media_type="application/x-ndjson",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(
+            f"Error listing entries: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred while listing entries: {str(e)}",
+        ) from e
+
+
+@workspace_router.post(
+    "/workspace/search",
+    summary="Search the content of files within /workspace, as NDJSON",
+)
+async def search_workspace(
+    pattern: str = Body(..., embed=True, description="Text to search for"),
+    paths: list[str] = Body(
+        ["/workspace"],
+        embed=True,
+        description="Files and directories to search in.",
+    ),
+    regex: bool = Body(
+        False,
+        embed=True,
+        description="Whether `pattern` is a regular expression.",
+    ),
+    ignore_case: bool = Body(False, embed=True),
+    context: int = Body(
+        0,
+        embed=True,
+        ge=0,
+        le=50,
+        description="Number of lines to include before and after matches.",
+    ),
+    max_matches_per_file: int = Body(100, embed=True, ge=1),
+    max_matches: int = Body(1000, embed=True, ge=1),
+    include: Optional[list[str]] = Body(
+        None,
+        embed=True,
+        description="Only search files whose path or name matches one of "
+        "these globs.",
+    ),
+    exclude: Optional[list[str]] = Body(
+        None,
+        embed=True,
+        description="Skip files and directories whose path or name matches "
+        "one of these globs.",
+    ),
+):
+    """
+    Stream the matches, one JSON object per line with `path`,
+    `line_number`, `line` and the `before`/`after` context lines, ending
+    with a line of type `end` that holds statistics.
+    """
+    try:
+        full_paths = [ensure_within_workspace(path) for path in paths]
+        if regex:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid regular expression: {e}",
+                ) from e
+
+        return StreamingResponse(
+            iter_search(
+                pattern,
+                full_paths,
+                regex=regex,
+                ignore_case=ignore_case,
+                context=context,
+                max_matches_per_file=max_matches_per_file,
+                max_matches=max_matches,
+                include=include,
+                exclude=exclude,
+            ),
+            media_type="application/x-ndjson",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(
+            f"Error searching files: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching files: {str(e)}",
+        ) from e
+
+
 @workspace_router.post(
     "/workspace/directories",
     summary="Create a directory within the /workspace directory",
@@ -301,6 +694,12 @@ async def copy(
         ...,
         description="Destination path within /workspace",
     ),
+    mode: Literal["auto", "copy", "hardlink"] = Query(
+        "auto",
+        description="`auto` makes copy-on-write clones where the "
+        "filesystem supports them, `copy` always copies the data, "
+        "`hardlink` links the files: the copies then share their content.",
+    ),
 ):
     try:
         full_source_path = ensure_within_workspace(source_path)
@@ -311,10 +710,12 @@ async def copy(
                 detail="Source file or directory not found.",
             )
 
-        if os.path.isdir(full_source_path):
-            shutil.copytree(full_source_path, full_destination_path)
-        else:
-            shutil.copy2(full_source_path, full_destination_path)
+        await asyncio.to_thread(
+            copy_path,
+            full_source_path,
+            full_destination_path,
+            mode,
+        )
 
         return {"message": "Copy operation successful."}
     except Exception as e:
@@ -323,3 +724,390 @@ async def copy(
             status_code=500,
             detail=f"Error copying: " f"{str(e)}",
         ) from e
+
+
+@workspace_router.post(
+    "/workspace/snapshot",
+    summary="Take an incremental snapshot of the /workspace directory",
+)
+async def create_snapshot(
+    label: Optional[str] = Body(
+        None,
+        description="Free text to recognize the snapshot by.",
+        embed=True,
+    ),
+    exclude: Optional[list[str]] = Body(
+        None,
+        description="Glob patterns of relative paths (or names) to leave "
+        "out, restoring the snapshot leaves them alone as well.",
+        embed=True,
+    ),
+):
+    """
+    Snapshot the workspace into a content-addressed store. Only the files
+    changed since the previous snapshot are read and stored.
+    """
+    try:
+        async with _snapshot_lock:
+            return await asyncio.to_thread(
+                snapshot_store.create,
+                label,
+                exclude,
+            )
+    except Exception as e:
+        logger.error(
+            f"Error taking snapshot: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error taking snapshot: {str(e)}",
+        ) from e
+
+
+@workspace_router.post(
+    "/workspace/restore",
+    summary="Roll the /workspace directory back to a snapshot",
+)
+async def restore_snapshot(
+    snapshot_id: str = Body(
+        ...,
+        embed=True,
+    ),
+):
+    """
+    Restore a snapshot, only rewriting the files that differ from it and
+    deleting the ones created since.
+    """
+    try:
+        async with _snapshot_lock:
+            return await asyncio.to_thread(
+                snapshot_store.restore,
+                snapshot_id,
+            )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error restoring snapshot: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error restoring snapshot: {str(e)}",
+        ) from e
+
+
+@workspace_router.get(
+    "/workspace/snapshots",
+    summary="List the snapshots of the /workspace directory",
+)
+async def list_snapshots():
+    try:
+        return await asyncio.to_thread(snapshot_store.snapshots)
+    except Exception as e:
+        logger.error(
+            f"Error listing snapshots: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error listing snapshots: {str(e)}",
+        ) from e
+
+
+@workspace_router.delete(
+    "/workspace/snapshots",
+    summary="Delete a snapshot of the /workspace directory",
+)
+async def delete_snapshot(
+    snapshot_id: str = Query(
+        ...,
+        description="ID of the snapshot to delete",
+    ),
+):
+    try:
+        async with _snapshot_lock:
+            return await asyncio.to_thread(
+                snapshot_store.delete,
+                snapshot_id,
+            )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error deleting snapshot: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error deleting snapshot: {str(e)}",
+        ) from e
+
+
+def _purge_in_background(trash: str) -> None:
+    task = asyncio.create_task(asyncio.to_thread(purge_trash, trash))
+    _purge_tasks.add(task)
+    task.add_done_callback(_purge_tasks.discard)
+
+
+@workspace_router.on_event("startup")
+async def purge_leftover_trash():
+    # Resets interrupted by a restart left their trash behind
+    for trash in await asyncio.to_thread(leftover_trash):
+        logger.info(f"Purging leftover trash {trash}")
+        _purge_in_background(trash)
+
+
+@workspace_router.post(
+    "/workspace/reset",
+    summary="Empty the /workspace directory in one call",
+)
+async def reset_workspace(
+    preserve: Optional[list[str]] = Body(
+        None,
+        description="Relative paths to keep, such as caches. Every "
+        "component may be a glob pattern, e.g. `.cache/*`.",
+        embed=True,
+    ),
+):
+    """
+    Remove everything in the workspace except the preserved paths. The
+    entries are moved out of the workspace by renaming them and deleted
+    in the background, so this returns quickly however large they are.
+    """
+    try:
+        async with _snapshot_lock:
+            result = await asyncio.to_thread(
+                reset_directory,
+                "/workspace",
+                preserve,
+            )
+        trash = result.pop("trash")
+        if trash is not None:
+            _purge_in_background(trash)
+        return result
+    except Exception as e:
+        logger.error(
+            f"Error resetting workspace: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error resetting workspace: {str(e)}",
+        ) from e
+
+
+@workspace_router.get(
+    "/workspace/archive",
+    summary="Download a directory within /workspace as a tar archive",
+)
+async def download_archive(
+    directory: str = Query(
+        "/workspace",
+        alias="dir",
+        description="Directory to archive, default is /workspace.",
+    ),
+    compression: Literal["none", "gzip", "zstd"] = Query(
+        "none",
+        description="Compression of the archive.",
+    ),
+    exclude: Optional[list[str]] = Query(
+        None,
+        description="Glob patterns of relative paths to leave out.",
+    ),
+):
+    """
+    Stream a tar archive of a directory, without building it in memory.
+    """
+    try:
+        target_directory = ensure_within_workspace(directory)
+        if not os.path.isdir(target_directory):
+            raise HTTPException(status_code=404, detail="Directory not found.")
+        check_compression(compression)
+
+        suffix = {"none": ".tar", "gzip": ".tar.gz", "zstd": ".tar.zst"}
+        filename = (
+            os.path.basename(target_directory.rstrip("/")) or "workspace"
+        ) + suffix[compression]
+        return StreamingResponse(
+            iter_archive(target_directory, compression, exclude),
+            media_type="application/x-tar"
+            if compression == "none"
+            else "application/octet-stream",
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+            },
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error archiving directory: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error archiving directory: {str(e)}",
+        ) from e
+
+
+@workspace_router.post(
+    "/workspace/archive",
+    summary="Upload a tar archive and extract it within /workspace",
+)
+async def upload_archive(
+    request: Request,
+    directory: str = Query(
+        "/workspace",
+        alias="dir",
+        description="Directory to extract into, created if missing.",
+    ),
+    compression: Literal["auto", "none", "gzip", "zstd"] = Query(
+        "auto",
+        description="Compression of the uploaded archive.",
+    ),
+):
+    """
+    Extract a tar archive from the raw request body while it is received,
+    without buffering it in memory or on disk.
+    """
+    try:
+        target_directory = ensure_within_workspace(directory)
+        check_compression(compression)
+        os.makedirs(target_directory, exist_ok=True)
+
+        body = request.stream()
+        first_chunk = b""
+        async for chunk in body:
+            if chunk:
+                first_chunk = chunk
+                break
+        if compression == "auto" and first_chunk.startswith(ZSTD_MAGIC):
+            compression = "zstd"
+        check_compression(compression)
+
+        read_fd, write_fd = os.pipe()
+        reader = os.fdopen(read_fd, "rb")
+        writer = os.fdopen(write_fd, "wb")
+
+        stats = {}
+
+        def _extract() -> dict:
+            with reader:
+                return extract_archive(
+                    reader,
+                    target_directory,
+                    compression,
+                    stats,
+                )
+
+        extraction = asyncio.create_task(asyncio.to_thread(_extract))
+        upload_error = None
+        try:
+            with writer:
+                await asyncio.to_thread(writer.write, first_chunk)
+                async for chunk in body:
+                    await asyncio.to_thread(writer.write, chunk)
+        except BrokenPipeError:
+            # The extraction stopped early, its error is raised below
+            pass
+        except Exception as e:
+            upload_error = e
+        finally:
+            # The pipe is closed, which ends the extraction in any case
+            await asyncio.wait([extraction])
+
+        if upload_error is not None:
+            # The members extracted before are left in place
+            extraction.exception()
+            logger.warning(
+                f"Archive upload to {target_directory} interrupted after "
+                f"extracting {stats.get('files', 0)} files and "
+                f"{stats.get('directories', 0)} directories: {upload_error}",
+            )
+            raise HTTPException(
+                status_code=400,
+                detail=f"Archive upload interrupted: {upload_error}. "
+                f"{stats.get('files', 0)} files and "
+                f"{stats.get('directories', 0)} directories were already "
+                f"extracted into {target_directory}.",
+            ) from upload_error
+        stats = extraction.result()
+
+        return {"message": "Archive extracted successfully.", **stats}
+    except HTTPException:
+        raise
+    except (ValueError, tarfile.TarError) as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error extracting archive: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error extracting archive: {str(e)}",
+        ) from e
+
+
+@workspace_router.get(
+    "/workspace/events",
+    summary="Stream create/modify/delete events of files within /workspace",
+)
+async def workspace_events(
+    since: Optional[int] = Query(
+        None,
+        description="Workspace version of the last event seen, to resume "
+        "from. Only new events are streamed if not set.",
+    ),
+    epoch: Optional[str] = Query(
+        None,
+        description="Epoch of the last event seen; a `reset` event is sent "
+        "first if it is not the current one.",
+    ),
+):
+    """
+    Stream workspace changes as server-sent events. Each event holds the
+    `type` (created, modified, deleted, reset or heartbeat), the `path`,
+    and the workspace `version` and `epoch` after it.
+    """
+    try:
+
+        async def _format_events():
+            async for event in workspace_watcher.events(since, epoch):
+                yield (
+                    f"id: {event['version']}\n"
+                    f"event: {event['type']}\n"
+                    f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                )
+
+        return StreamingResponse(
+            _format_events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+    except Exception as e:
+        logger.error(
+            f"Error watching workspace: {str(e)}:\n{traceback.format_exc()}",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error watching workspace: {str(e)}",
+        ) from e
+
+
+@workspace_router.get(
+    "/workspace/version",
+    summary="Get the current version of the /workspace directory",
+)
+async def workspace_version():
+    """
+    Return the workspace `version`, its `epoch` and the watching backend.
+    """
+    workspace_watcher.ensure_started()
+    return workspace_watcher.status()
+
+
+@workspace_router.on_event("shutdown")
+async def shutdown_event():
+    await workspace_watcher.stop()
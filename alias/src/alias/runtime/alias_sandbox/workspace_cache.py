@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+import requests
+
+from alias.runtime.alias_sandbox.alias_sandbox_client import (
+    AliasSandboxHttpClient,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORKSPACE_DIR = "/workspace"
+_RECONNECT_DELAY = 1
+_MAX_RECONNECT_DELAY = 30
+
+# Cached listing of a directory that does not exist
+_MISSING = object()
+
+
+class WorkspaceMetadataCache:
+    """Client-side cache of the directory listings of a sandbox workspace.
+
+    Listings (with the type, size and mtime of every entry) are fetched
+    once per directory, after which existence checks, stats and listings
+    are answered in-process. The cache follows the `/workspace/events`
+    stream of the sandbox in a background thread and drops the listings
+    that events touch, so changes made by the tools, shell commands or
+    anything else in the sandbox are picked up shortly after they happen.
+    Changes made through the helpers of `sandbox_util` are applied right
+    away with `record_write`, `record_mkdir` and `record_delete`.
+
+    Until the event stream is set up, and whenever it breaks, nothing is
+    cached and every lookup asks the sandbox. The same holds without
+    `follow`, for sandboxes whose event stream cannot be reached.
+    """
+
+    def __init__(
+        self,
+        client: AliasSandboxHttpClient,
+        root: str = WORKSPACE_DIR,
+        follow: bool = True,
+    ) -> None:
+        self.client = client
+        self.root = root
+        self.follow = follow
+        self.hits = 0
+        self.misses = 0
+        # Directory path -> {name: entry}, `_MISSING` if it does not exist
+        self._listings: dict = {}
+        # Bumped by every invalidation, so that a listing fetched while
+        # an event arrived is not stored
+        self._generation = 0
+        self._synced = False
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._follower: Optional[threading.Thread] = None
+        self._listeners: list[Callable[[Optional[str]], None]] = []
+
+    def _normalize(self, path: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, path))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise ValueError(f"`{path}` is not under `{self.root}`")
+        return path
+
+    def _ensure_following(self) -> None:
+        if not self.follow or self._closed.is_set():
+            return
+        with self._lock:
+            if self._follower is not None and self._follower.is_alive():
+                return
+            self._follower = threading.Thread(
+                target=self._follow,
+                name="workspace-cache",
+                daemon=True,
+            )
+            self._follower.start()
+
+    def _follow(self) -> None:
+        delay = _RECONNECT_DELAY
+        while not self._closed.is_set():
+            try:
+                status = self.client.get_workspace_version()
+                if status.get("isError", False):
+                    raise requests.exceptions.ConnectionError(
+                        status["content"][0]["text"],
+                    )
+                with self._lock:
+                    self._synced = True
+                delay = _RECONNECT_DELAY
+                # Events after the version replayed first, none is missed
+                for event in self.client.iter_workspace_events(
+                    since=status["version"],
+                    epoch=status["epoch"],
+                ):
+                    if self._closed.is_set():
+                        return
+                    self._apply(event)
+            except Exception as e:
+                logger.warning(f"Workspace events unavailable: {e}")
+            with self._lock:
+                self._synced = False
+                self._listings.clear()
+                self._generation += 1
+            self._notify(None)
+            self._closed.wait(delay)
+            delay = min(delay * 2, _MAX_RECONNECT_DELAY)
+
+    def _apply(self, event: dict) -> None:
+        if event["type"] == "heartbeat":
+            return
+        if event["type"] == "reset":
+            self.invalidate()
+            self._notify(None)
+            return
+        path = event["path"]
+        self.invalidate(path)
+        self.invalidate(os.path.dirname(path), recursive=False)
+        self._notify(path)
+
+    def _notify(self, path: Optional[str]) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(path)
+            except Exception as e:
+                logger.warning(f"Workspace change listener failed: {e}")
+
+    @property
+    def following(self) -> bool:
+        """Whether the workspace events are being followed, so that the
+        changes in the workspace are known."""
+        with self._lock:
+            return self._synced
+
+    def add_listener(self, listener: Callable[[Optional[str]], None]) -> None:
+        """
+        Call `listener` from the follower thread with the path of every
+        change in the workspace, or with `None` when anything may have
+        changed (after a reset, or when events were missed).
+        """
+        with self._lock:
+            self._listeners.append(listener)
+        self._ensure_following()
+
+    def _fetch(self, directory: str, recursive: bool) -> dict:
+        """Fetch the listing of `directory` and, if `recursive`, of every
+        directory under it."""
+        listings = {directory: {}}
+        try:
+            for item in self.client.iter_workspace_entries(
+                directory,
+                max_depth=None if recursive else 1,
+                stat=True,
+            ):
+                path = os.path.join(directory, item["path"])
+                listings.setdefault(os.path.dirname(path), {})[
+                    os.path.basename(path)
+                ] = {
+                    "type": item["type"],
+                    "size": item.get("size"),
+                    "mtime": item.get("mtime"),
+                }
+                if item["type"] == "directory" and recursive:
+                    listings.setdefault(path, {})
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            return {directory: _MISSING}
+        return listings
+
+    def _cached(self, directory: str, recursive: bool) -> Optional[dict]:
+        """Copies of the cached listings `_fetch` would return, `None` if
+        any is missing."""
+        listings = {}
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            listing = self._listings.get(current)
+            if listing is None:
+                return None
+            if listing is _MISSING:
+                listings[current] = _MISSING
+                continue
+            listings[current] = dict(listing)
+            if recursive:
+                pending.extend(
+                    os.path.join(current, name)
+                    for name, item in listing.items()
+                    if item["type"] == "directory"
+                )
+        return listings
+
+    def _lookup(self, directory: str, recursive: bool = False) -> dict:
+        self._ensure_following()
+        with self._lock:
+            generation = self._generation
+            synced = self._synced
+            if synced:
+                listings = self._cached(directory, recursive)
+                if listings is not None:
+                    self.hits += 1
+                    return listings
+            self.misses += 1
+
+        listings = self._fetch(directory, recursive)
+        with self._lock:
+            if synced and self._synced and self._generation == generation:
+                self._listings.update(
+                    (path, listing if listing is _MISSING else dict(listing))
+                    for path, listing in listings.items()
+                )
+        return listings
+
+    def list_directory(
+        self,
+        directory: str = WORKSPACE_DIR,
+        recursive: bool = False,
+    ) -> dict:
+        """
+        List a directory like `sandbox_util.list_workspace_directories`:
+        the full paths of its `files` and `directories`.
+
+        Raises:
+            FileNotFoundError: If the directory does not exist.
+            `requests.exceptions.RequestException` if it cannot be listed.
+        """
+        directory = self._normalize(directory)
+        listings = self._lookup(directory, recursive=recursive)
+        if listings[directory] is _MISSING:
+            raise FileNotFoundError(f"{directory} not found")
+        result = {"files": [], "directories": []}
+        for current, listing in sorted(listings.items()):
+            if listing is _MISSING:
+                continue
+            for name, item in sorted(listing.items()):
+                key = "directories" if item["type"] == "directory" else "files"
+                result[key].append(os.path.join(current, name))
+        return result
+
+    def stat(self, path: str) -> Optional[dict]:
+        """The `type`, `size` and `mtime` of a path, `None` if it does not
+        exist. `size` and `mtime` may be `None` after our own writes, until
+        the directory is listed again."""
+        path = self._normalize(path)
+        if path == self.root:
+            return {"type": "directory", "size": None, "mtime": None}
+        parent = os.path.dirname(path)
+        listing = self._lookup(parent)[parent]
+        if listing is _MISSING:
+            return None
+        return listing.get(os.path.basename(path))
+
+    def exists(self, path: str) -> bool:
+        """Whether a file or directory exists in the workspace."""
+        return self.stat(path) is not None
+
+    def invalidate(
+        self,
+        path: Optional[str] = None,
+        recursive: bool = True,
+    ) -> None:
+        """Drop the cached listing of a directory and, if `recursive`, of
+        the directories under it; everything if `path` is not given."""
+        with self._lock:
+            self._generation += 1
+            if path is None:
+                self._listings.clear()
+                return
+            path = os.path.normpath(path)
+            self._listings.pop(path, None)
+            if recursive:
+                for directory in list(self._listings):
+                    if directory.startswith(path + os.sep):
+                        del self._listings[directory]
+
+    def _record(self, path: str, item: Optional[dict]) -> None:
+        path = self._normalize(path)
+        if path == self.root:
+            return
+        with self._lock:
+            self._generation += 1
+            parent = os.path.dirname(path)
+            listing = self._listings.get(parent)
+            if listing is _MISSING:
+                self._listings.pop(parent)
+            elif listing is not None and item is None:
+                listing.pop(os.path.basename(path), None)
+            elif listing is not None:
+                listing[os.path.basename(path)] = item
+            if item is None:
+                return
+            # The parent directories exist now
+            child = parent
+            while child != self.root:
+                up = os.path.dirname(child)
+                listing = self._listings.get(up)
+                if listing is _MISSING:
+                    self._listings.pop(up)
+                elif listing is not None:
+                    listing.setdefault(
+                        os.path.basename(child),
+                        {"type": "directory", "size": None, "mtime": None},
+                    )
+                child = up
+
+    def record_write(self, path: str, size: Optional[int] = None) -> None:
+        """Record that we created or overwrote a file."""
+        self._record(
+            path,
+            {"type": "file", "size": size, "mtime": None},
+        )
+
+    def record_mkdir(self, path: str) -> None:
+        """Record that we created a directory."""
+        self._record(
+            path,
+            {"type": "directory", "size": None, "mtime": None},
+        )
+
+    def record_delete(self, path: str) -> None:
+        """Record that we deleted a file or directory."""
+        self._record(path, None)
+        self.invalidate(self._normalize(path))
+
+    def close(self) -> None:
+        """Stop following the workspace events."""
+        self._closed.set()
+        self.invalidate()